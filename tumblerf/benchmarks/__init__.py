@@ -0,0 +1,4 @@
+"""
+Benchmarks measure how fast campaigns run, where the tests only check that they run correctly. They run without
+hardware, over the LoopbackInterface against an emulated target.
+"""
@@ -0,0 +1,415 @@
+"""
+Implements the end-to-end campaign benchmark suite. Each generator x case runner x harness combination is run as a
+campaign against the LoopbackInterface and a Dot15d4TargetEmulator, and the cases per second, memory high-water mark,
+startup time and per-stage latencies (from the case's StageTimer) are reported.
+
+Each combination runs in a fresh interpreter, so its startup time includes importing its components and its memory
+high-water mark is its own. Results can be saved as a baseline, and later runs compared against it so a change in
+cases/, generators/ or harnesses/ which slows campaigns down or grows them is caught:
+
+    python -m tumblerf.benchmarks.campaign --update_baseline
+    python -m tumblerf.benchmarks.campaign  # exits with 1 if any combination regressed or failed
+
+The metrics are absolute, so a baseline is only meaningful on the machine that saved it, which is recorded in it.
+The baseline.json kept here is from the machine named in its "machine" entry; on any other host, save a baseline
+there first (e.g. with --baseline pointing elsewhere) and refresh it whenever the host changes. Combinations which
+fail are never saved to a baseline, so one that can't run on the machine saving it has no baseline to compare
+against until it is saved from a machine where it runs (--update_baseline --only <name> adds it).
+
+The only harness that can drive the received-frame case runner without hardware is the ReceivedFrameHarness;
+SerialCheckHarness and SshProcessCheckHarness can't be armed with the expected frame, so they aren't combined here.
+
+The benchmark times the case runners rather than the target's tolerance, so the emulated target takes each frame
+whole, without synchronizing on its SFD or applying failure models, and echoes it back. Every frame then matches the
+harness's expectation, and the deadline is only paid for frames lost in the loopback. (Frames with an odd number of
+preamble nibbles, for one, have a PSDU that isn't byte aligned within the transmitted frame, so an echo of the PSDU
+alone never matches.)
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+# TODO: Clean up this import:
+try:
+    from ..cases.alternator import AlternatorCaseRxFrame
+    from ..cases.scheduler import FeedbackScheduler
+    from ..cases.timing import StageTimer
+    from ..generators.base import BaseTestCaseGenerator
+    from ..generators.prefetch import PrefetchGenerator
+    from ..harnesses.received_frame_check import ReceivedFrameHarness
+    from ..interfaces.interface_loopback import LoopbackInterface, LoopbackMedium
+    from ..targets.dot15d4_emulator import Dot15d4TargetEmulator
+except ValueError:
+    from cases.alternator import AlternatorCaseRxFrame
+    from cases.scheduler import FeedbackScheduler
+    from cases.timing import StageTimer
+    from generators.base import BaseTestCaseGenerator
+    from generators.prefetch import PrefetchGenerator
+    from harnesses.received_frame_check import ReceivedFrameHarness
+    from interfaces.interface_loopback import LoopbackInterface, LoopbackMedium
+    from targets.dot15d4_emulator import Dot15d4TargetEmulator
+from .generator_rate import make_generator
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+BASELINE_VERSION = 1
+
+# Metrics compared against the baseline: whether higher values are better, and the change too small to count as a
+# regression whatever the tolerance, as interpreter startup in particular varies by tens of milliseconds run to run.
+REGRESSION_METRICS = OrderedDict([
+    ("cases_per_second", (True, 0.0)),
+    ("max_rss_kb", (False, 1024)),
+    ("startup_seconds", (False, 0.1))
+])
+
+# Percentiles of the stages' latencies also compared against the baseline, all lower being better: the fraction of
+# samples at or below each, and the change in seconds too small to count as a regression. A percentile is only
+# compared when at least REGRESSION_TAIL_SAMPLES samples lie beyond it, as otherwise it is down to a few outliers
+# (e.g. the record stage when the adaptive control interval only checks a few dozen windows).
+REGRESSION_STAGES = ("generate", "tx", "record", "control")
+REGRESSION_STAGE_STATS = OrderedDict([
+    ("p50", (0.5, 0.00005)),
+    ("p99", (0.99, 0.0005))
+])
+REGRESSION_TAIL_SAMPLES = 20
+
+
+class CaseBudgetGenerator(BaseTestCaseGenerator):
+    """
+    Wraps another generator and yields at most `cases` of its test cases per iteration, so every generator (however
+    it counts its cases) gives a campaign of the same length.
+    """
+    def __init__(self, generator, cases):
+        BaseTestCaseGenerator.__init__(self, includes_phy=generator.includes_phy, includes_mac=generator.includes_mac)
+        self.__generator = generator
+        self.__cases = cases
+
+    def __repr__(self):
+        return "{}({}, {} cases)".format(self.__class__.__name__, self.__generator, self.__cases)
+
+    @property
+    def name(self):
+        return self.__generator.name
+
+    @property
+    def generator(self):
+        return self.__generator
+
+    def get_state(self):
+        return self.__generator.get_state()
+
+    def set_state(self, state):
+        self.__generator.set_state(state)
+
+    def get_frame_layout(self):
+        return self.__generator.get_frame_layout()
+
+    def describe_extra_case(self, test_case):
+        return self.__generator.describe_extra_case(test_case)
+
+    def record_outcome(self, test_case, test_result):
+        self.__generator.record_outcome(test_case, test_result)
+
+    def renumber_test_case(self, test_case):
+        return self.__generator.renumber_test_case(test_case)
+
+    def yield_control_case(self, count=1):
+        return self.__generator.yield_control_case(count)
+
+    def yield_test_case(self, count, constraints=None):
+        return self.yield_test_case_from(0, count, constraints=constraints)
+
+    def yield_test_case_from(self, start, count, constraints=None):
+        # Every generator yields at least `count` cases when asked for that many, so asking for the budget is enough.
+        cases = self.__generator.yield_test_case_from(start, count * self.__cases, constraints=constraints)
+        return itertools.islice(cases, max(count * self.__cases - start, 0))
+
+
+def make_rx_frame_case(interface, harness, generator, deadline):
+    return AlternatorCaseRxFrame(interface, harness, generator, deadline=deadline)
+
+
+def make_rx_frame_adaptive_case(interface, harness, generator, deadline):
+    case = AlternatorCaseRxFrame(interface, harness, generator, deadline=deadline)
+    case.set_control_interval(8, adaptive=True, max_interval=64)
+    return case
+
+
+def make_rx_frame_feedback_case(interface, harness, generator, deadline):
+    scheduler = FeedbackScheduler(generator, rng=random.Random(0))
+    return AlternatorCaseRxFrame(interface, harness, scheduler, deadline=deadline)
+
+
+def make_rx_frame_prefetch_case(interface, harness, generator, deadline):
+    return AlternatorCaseRxFrame(interface, harness, PrefetchGenerator(generator, depth=64), deadline=deadline)
+
+
+def make_received_frame_harness(medium):
+    harness = ReceivedFrameHarness()
+    harness.set_interface(LoopbackInterface(medium=medium))
+    harness.open()
+    return harness
+
+
+GENERATORS = OrderedDict([
+    ("preamble_length", functools.partial(make_generator, "Dot15d4PreambleLengthGenerator")),
+    ("franconian_notch", functools.partial(make_generator, "Dot15d4FranconianNotchGenerator")),
+    ("random_payload", functools.partial(make_generator, "Dot15d4RandomPayloadGenerator"))
+])
+
+RUNNERS = OrderedDict([
+    ("rx_frame", make_rx_frame_case),
+    ("rx_frame_adaptive", make_rx_frame_adaptive_case),
+    ("rx_frame_feedback", make_rx_frame_feedback_case),
+    ("rx_frame_prefetch", make_rx_frame_prefetch_case)
+])
+
+HARNESSES = OrderedDict([
+    ("received_frame", make_received_frame_harness)
+])
+
+
+def combinations(only=None):
+    """
+    :param only: Optional substring; only the combinations whose name contains it are returned.
+    :return: List of the names of each generator/runner/harness combination, in a stable order.
+    """
+    names = ["/".join(parts) for parts in itertools.product(GENERATORS, RUNNERS, HARNESSES)]
+    return [name for name in names if only is None or only in name]
+
+
+def run_combination(name, cases=2000, iterations=1, deadline=0.005, launched=None):
+    """
+    Runs one combination's campaign in this process.
+    :param name: Combination name, as returned by combinations().
+    :param cases: Test cases per iteration.
+    :param deadline: Seconds the runner waits for a frame before declaring it missed.
+    :param launched: Time this process was launched, to include its startup in the startup time; by default
+        startup is timed from when this is called.
+    :return: dict of the combination's metrics. Latencies are in seconds.
+    """
+    started = launched if launched is not None else time.time()
+    generator_name, runner_name, harness_name = name.split("/")
+    medium, response_medium = LoopbackMedium(name), LoopbackMedium(name + " responses")
+    generator = CaseBudgetGenerator(GENERATORS[generator_name](), cases)
+    interface = LoopbackInterface(medium=medium)
+    interface.open()
+    target = Dot15d4TargetEmulator([], medium=medium, response_medium=response_medium, phy=False)
+    target.start()
+    harness = HARNESSES[harness_name](response_medium)
+    try:
+        case = RUNNERS[runner_name](interface, harness, generator, deadline)
+        case.set_timer(StageTimer(report_interval=None))
+        startup = time.time() - started
+        case.run_test(iterations)
+        # Taken before tearing down, which waits on the harness's polling thread, so elapsed is the campaign's alone.
+        timing = case.timer.serializable()
+    finally:
+        harness.close()
+        target.stop()
+        interface.close()
+    stages = {}
+    for stage, histogram in timing["stages"].iteritems():
+        stages[stage] = dict((key, histogram[key]) for key in ("count", "mean", "p50", "p90", "p99", "max"))
+    return {
+        "cases": timing["cases"],
+        "elapsed_seconds": timing["elapsed"],
+        "cases_per_second": timing["cases_per_second"],
+        "startup_seconds": startup,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,  # kilobytes on Linux
+        "received": target.handled_count,
+        "stages": stages
+    }
+
+
+def run_isolated(name, cases=2000, iterations=1, deadline=0.005, verbose=False):
+    """
+    Runs one combination in a fresh interpreter, so its startup time and memory high-water mark are its own.
+    :param verbose: If True, the campaign's own output is shown rather than discarded.
+    :return: dict of the combination's metrics, or with only "error" if it failed.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output_fd, output_path = tempfile.mkstemp(prefix="tumblerf-benchmark-", suffix=".json")
+    os.close(output_fd)
+    command = [sys.executable, "-m", "tumblerf.benchmarks.campaign", "--worker", name, "--worker_output", output_path,
+               "--cases", str(cases), "--iterations", str(iterations), "--deadline", str(deadline),
+               "--launched", repr(time.time())]
+    try:
+        with open(os.devnull, 'w') as devnull:
+            returncode = subprocess.call(command, cwd=root, stdout=None if verbose else devnull,
+                                         stderr=None if verbose else devnull)
+        with open(output_path) as fh:
+            content = fh.read()
+        if returncode != 0 or not content:
+            return {"error": "Benchmark process exited with {}.".format(returncode)}
+        return json.loads(content)
+    finally:
+        os.remove(output_path)
+
+
+def run_suite(names, cases=2000, iterations=1, deadline=0.005, verbose=False, repeat=5):
+    """
+    :param repeat: Times to run each combination. The metrics of the fastest run are kept, as a busy host only ever
+        slows a run down.
+    :return: dict in the format of the baseline file, with the metrics of each combination named.
+    """
+    results = OrderedDict()
+    for name in names:
+        print("INFO: Benchmarking {}.".format(name))
+        runs = [run_isolated(name, cases, iterations, deadline, verbose) for i in range(repeat)]
+        failed = [run for run in runs if "error" in run]
+        if len(failed) > 0:
+            results[name] = failed[0]
+            print("WARN: {} failed: {}".format(name, results[name]["error"]))
+        else:
+            results[name] = max(runs, key=lambda run: run["cases_per_second"])
+    return {
+        "version": BASELINE_VERSION,
+        "machine": {"platform": platform.platform(), "python": platform.python_version()},
+        "settings": {"cases": cases, "iterations": iterations, "deadline": deadline, "repeat": repeat},
+        "results": results
+    }
+
+
+def compare(current, baseline, tolerance=0.25):
+    """
+    Compares the results of a run against a baseline.
+    :param current: dict returned by run_suite().
+    :param baseline: dict returned by run_suite() for the baseline run.
+    :param tolerance: Fraction by which a metric may be worse than its baseline before it counts as a regression.
+    :return: List of messages describing each regression, empty if there were none.
+    """
+    regressions = []
+    if current["settings"] != baseline["settings"]:
+        print("WARN: Settings {} differ from the baseline's {}, so comparisons may not be meaningful.".format(
+            current["settings"], baseline["settings"]))
+    if current["machine"] != baseline["machine"]:
+        print("WARN: The baseline was saved on {}, not this machine ({}), so comparisons may not be meaningful. "
+              "Save a baseline on this machine with --update_baseline.".format(baseline["machine"], current["machine"]))
+    for name, metrics in current["results"].iteritems():
+        if "error" in metrics:
+            regressions.append("{}: failed ({}).".format(name, metrics["error"]))
+            continue
+        base = baseline["results"].get(name)
+        if base is None or "error" in base:
+            print("WARN: {} has no baseline to compare against.".format(name))
+            continue
+        checks = [(metric, metrics.get(metric), base.get(metric), higher_is_better, slack)
+                  for metric, (higher_is_better, slack) in REGRESSION_METRICS.iteritems()]
+        for stage in REGRESSION_STAGES:
+            stage_metrics, base_stage = metrics.get("stages", {}).get(stage, {}), base.get("stages", {}).get(stage, {})
+            for stat, (fraction, slack) in REGRESSION_STAGE_STATS.iteritems():
+                count = min(stage_metrics.get("count", 0), base_stage.get("count", 0))
+                if int(round(count * (1 - fraction))) >= REGRESSION_TAIL_SAMPLES:
+                    checks.append(("{} {}".format(stage, stat), stage_metrics.get(stat), base_stage.get(stat), False,
+                                   slack))
+        for metric, value, base_value, higher_is_better, slack in checks:
+            if value is None or not base_value or abs(value - base_value) <= slack:
+                continue
+            change = (value - base_value) / float(base_value)
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append("{}: {} went from {:.4g} to {:.4g} ({:+.0%}).".format(name, metric, base_value,
+                                                                                      value, change))
+    return regressions
+
+
+def format_report(suite):
+    """
+    :return: Table of each combination's metrics, with the p50 of each stage in milliseconds.
+    """
+    lines = ["{:<52} {:>9} {:>9} {:>9}  {}".format("combination", "cases/s", "rss MB", "startup", "stage p50 (ms)")]
+    for name, metrics in suite["results"].iteritems():
+        if "error" in metrics:
+            lines.append("{:<52} {}".format(name, metrics["error"]))
+            continue
+        stages = " ".join("{}={:.3f}".format(stage, metrics["stages"][stage]["p50"] * 1000)
+                          for stage in sorted(metrics["stages"]))
+        lines.append("{:<52} {:>9.1f} {:>9.1f} {:>8.2f}s  {}".format(name, metrics["cases_per_second"] or 0.0,
+                                                                   metrics["max_rss_kb"] / 1024.0,
+                                                                   metrics["startup_seconds"], stages))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks end-to-end campaigns against an emulated target.")
+    parser.add_argument('--cases', action='store', type=int, default=2000, help='Test cases per iteration.')
+    parser.add_argument('--iterations', action='store', type=int, default=1)
+    parser.add_argument('--deadline', action='store', type=float, default=0.005,
+                        help='Seconds to wait for each frame before declaring it missed.')
+    parser.add_argument('--repeat', action='store', type=int, default=5,
+                        help='Times to run each combination, keeping the fastest run.')
+    parser.add_argument('--only', action='store', default=None,
+                        help='Only run the combinations whose name contains this.')
+    parser.add_argument('--baseline', action='store', default=BASELINE_PATH)
+    parser.add_argument('--update_baseline', action='store_true',
+                        help='Save the results as the baseline rather than comparing against it.')
+    parser.add_argument('--tolerance', action='store', type=float, default=0.25,
+                        help='Fraction by which a metric may be worse than the baseline before failing.')
+    parser.add_argument('-f', '--results_file', action='store', default=None,
+                        help='File to also write the results to, in the format of the baseline.')
+    parser.add_argument('-v', '--verbose', action='store_true', help="Show each campaign's output.")
+    parser.add_argument('--worker', action='store', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--worker_output', action='store', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--launched', action='store', type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        try:
+            metrics = run_combination(args.worker, args.cases, args.iterations, args.deadline, args.launched)
+        except Exception as e:
+            metrics = {"error": "{}: {}".format(e.__class__.__name__, e)}
+        with open(args.worker_output, 'w') as fh:
+            json.dump(metrics, fh)
+        return 0
+
+    names = combinations(args.only)
+    if len(names) == 0:
+        print("ERROR: No combinations match {}.".format(args.only))
+        return -1
+    suite = run_suite(names, args.cases, args.iterations, args.deadline, args.verbose, args.repeat)
+    print(format_report(suite))
+    if args.results_file is not None:
+        with open(args.results_file, 'w') as fh:
+            json.dump(suite, fh, indent=4)
+    if args.update_baseline:
+        # A failed combination has no metrics to compare against, so it is left out rather than saved as an error.
+        failed = [name for name, metrics in suite["results"].iteritems() if "error" in metrics]
+        for name in failed:
+            error = suite["results"].pop(name)["error"]
+            print("ERROR: Not saving {} to the baseline, as it failed: {}".format(name, error))
+        if args.only is not None and os.path.exists(args.baseline):
+            # Keep the baseline of the combinations that weren't run, or that failed this time.
+            with open(args.baseline) as fh:
+                previous = json.load(fh)
+            previous["results"].update(suite["results"])
+            suite["results"] = dict((name, metrics) for name, metrics in previous["results"].iteritems()
+                                    if "error" not in metrics)
+        with open(args.baseline, 'w') as fh:
+            json.dump(suite, fh, indent=4, separators=(',', ': '), sort_keys=True)
+        print("INFO: Saved baseline to {}.".format(args.baseline))
+        return 1 if len(failed) > 0 else 0
+    if not os.path.exists(args.baseline):
+        print("WARN: No baseline at {}, run with --update_baseline to save one.".format(args.baseline))
+        return 0
+    with open(args.baseline) as fh:
+        regressions = compare(suite, json.load(fh), args.tolerance)
+    for regression in regressions:
+        print("ERROR: Regression in {}".format(regression))
+    if len(regressions) > 0:
+        return 1
+    print("INFO: No regressions against {}.".format(args.baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Implements the generator micro-benchmarks, which measure how fast each generator produces frames, to show whether
+generation can keep up with transmitting in batches. For each generator this reports the frames per second of
+yield_test_case(), the allocations per frame, and the latency of get_control_case().
+
+CPython 2 can't count every allocation, so allocations per frame counts the objects tracked by the garbage collector
+which each frame leaves behind when automatic collection is off: those retained, and those only freed by the cyclic
+collector (such as scapy's packets, which refer to each other). Both are what drive collection pauses.
+
+Each generator is measured in a fresh interpreter, both with scapy and with it blocked from being imported, so
+generators which don't need scapy can be told apart from those which do:
+
+    python -m tumblerf.benchmarks.generator_rate [--frames 2000] [--mode both] [-f results.json]
+"""
+
+import argparse
+import gc
+import importlib
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+GENERATOR_MODULES = OrderedDict([
+    ("Dot15d4PreambleLengthGenerator", "dot15d4_isotope_preamblelength"),
+    ("Dot15d4FranconianNotchGenerator", "dot15d4_isotope_franconiannotch"),
+    ("Dot15d4RandomPayloadGenerator", "dot15d4_payload_random")
+])
+MODES = ["scapy", "no_scapy"]
+
+
+class ScapyBlocker(object):
+    """
+    Import hook which makes importing scapy fail, as it would where scapy isn't installed.
+    """
+    def find_module(self, fullname, path=None):
+        if fullname == "scapy" or fullname.startswith("scapy."):
+            return self
+        return None
+
+    def load_module(self, fullname):
+        raise ImportError("No module named {} (blocked for benchmarking)".format(fullname))
+
+
+def make_generator(class_name):
+    """
+    Creates one of the generators benchmarked, configured as for a campaign. The generators are only imported
+    here, so a ScapyBlocker installed beforehand takes effect.
+    :raises ImportError: If the generator can't be imported, e.g. as scapy is missing.
+    """
+    # TODO: Clean up this import:
+    try:
+        from .. import generators
+    except ValueError:
+        import generators
+    module = importlib.import_module("." + GENERATOR_MODULES[class_name], generators.__name__)
+    generator = getattr(module, class_name)()
+    if class_name == "Dot15d4PreambleLengthGenerator":
+        generator.set_default_constraint('preamb_len', 10)  # As the CLI defaults to
+    elif class_name == "Dot15d4RandomPayloadGenerator":
+        generator.set_target(0x1234, 0xffff)
+        generator.set_source(0x0001)
+    return generator
+
+
+def measure_generator(generator, frames=2000, control_cases=200, warmup=10):
+    """
+    Measures a generator in this process.
+    :param frames: Number of test cases to time yield_test_case() over, and count allocations over.
+    :param control_cases: Number of calls to time get_control_case() over.
+    :param warmup: Number of test cases generated first, untimed, so one-off setup (e.g. scapy building its field
+        caches) isn't counted.
+    :return: dict of the generator's metrics. Latencies are in microseconds.
+    """
+    # TODO: Clean up this import:
+    try:
+        from ..cases.timing import LatencyHistogram
+    except ValueError:
+        from cases.timing import LatencyHistogram
+
+    for _ in itertools.islice(generator.yield_test_case(warmup), warmup):
+        pass
+
+    start = time.time()
+    produced = 0
+    for _ in itertools.islice(generator.yield_test_case(frames), frames):
+        produced += 1
+    elapsed = time.time() - start
+
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.get_count()[0]
+        for _ in itertools.islice(generator.yield_test_case(frames), frames):
+            pass
+        left = gc.get_count()[0] - before
+    finally:
+        gc.enable()
+
+    latencies = LatencyHistogram()
+    for i in range(control_cases):
+        start = time.time()
+        generator.get_control_case()
+        latencies.record(time.time() - start)
+
+    return {
+        "frames": produced,
+        "frames_per_second": produced / elapsed if elapsed > 0 else None,
+        "allocations_per_frame": left / float(produced) if produced > 0 else None,
+        "control_case_us": {
+            "mean": latencies.mean() * 1e6,
+            "p50": latencies.percentile(50) * 1e6,
+            "p99": latencies.percentile(99) * 1e6
+        }
+    }
+
+
+def run_isolated(class_name, mode="scapy", frames=2000, control_cases=200):
+    """
+    Measures a generator in a fresh interpreter, with scapy blocked if the mode is "no_scapy".
+    :return: dict of the generator's metrics, or with only "error" if it couldn't be measured.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output_fd, output_path = tempfile.mkstemp(prefix="tumblerf-benchmark-", suffix=".json")
+    os.close(output_fd)
+    command = [sys.executable, "-m", "tumblerf.benchmarks.generator_rate", "--worker", class_name, "--mode", mode,
+               "--worker_output", output_path, "--frames", str(frames), "--control_cases", str(control_cases)]
+    try:
+        with open(os.devnull, 'w') as devnull:
+            returncode = subprocess.call(command, cwd=root, stdout=devnull, stderr=devnull)
+        with open(output_path) as fh:
+            content = fh.read()
+        if returncode != 0 or not content:
+            return {"error": "Benchmark process exited with {}.".format(returncode)}
+        return json.loads(content)
+    finally:
+        os.remove(output_path)
+
+
+def run_suite(class_names=None, modes=None, frames=2000, control_cases=200):
+    """
+    :return: dict of {generator class name: {mode: metrics}}.
+    """
+    results = OrderedDict()
+    for class_name in class_names if class_names is not None else GENERATOR_MODULES:
+        results[class_name] = OrderedDict()
+        for mode in modes if modes is not None else MODES:
+            print("INFO: Benchmarking {} with {}.".format(class_name, mode))
+            results[class_name][mode] = run_isolated(class_name, mode, frames, control_cases)
+    return results
+
+
+def format_report(results):
+    """
+    :return: One line per generator and mode, in a fixed order and with fixed precision, so reports can be diffed.
+    """
+    lines = ["{:<34} {:<9} {:>11} {:>13} {:>14} {:>14}".format("generator", "mode", "frames/s", "allocs/frame",
+                                                               "control p50us", "control p99us")]
+    for class_name in sorted(results):
+        for mode in MODES:
+            if mode not in results[class_name]:
+                continue
+            metrics = results[class_name][mode]
+            if "error" in metrics:
+                lines.append("{:<34} {:<9} {}".format(class_name, mode, metrics["error"]))
+                continue
+            lines.append("{:<34} {:<9} {:>11.1f} {:>13.1f} {:>14.1f} {:>14.1f}".format(
+                class_name, mode, metrics["frames_per_second"], metrics["allocations_per_frame"],
+                metrics["control_case_us"]["p50"], metrics["control_case_us"]["p99"]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks how fast generators produce frames.")
+    parser.add_argument('--frames', action='store', type=int, default=2000)
+    parser.add_argument('--control_cases', action='store', type=int, default=200)
+    parser.add_argument('--mode', action='store', default='both', choices=MODES + ['both'])
+    parser.add_argument('-g', '--gen', action='append', default=None, choices=list(GENERATOR_MODULES),
+                        help='Generator to benchmark; may be given more than once. By default all are.')
+    parser.add_argument('-f', '--results_file', action='store', default=None,
+                        help='File to also write the results to as JSON.')
+    parser.add_argument('--worker', action='store', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--worker_output', action='store', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        if args.mode == "no_scapy":
+            sys.meta_path.insert(0, ScapyBlocker())
+        try:
+            metrics = measure_generator(make_generator(args.worker), args.frames, args.control_cases)
+        except Exception as e:
+            metrics = {"error": "{}: {}".format(e.__class__.__name__, e)}
+        with open(args.worker_output, 'w') as fh:
+            json.dump(metrics, fh)
+        return 0
+
+    modes = MODES if args.mode == 'both' else [args.mode]
+    results = run_suite(args.gen, modes, args.frames, args.control_cases)
+    print(format_report(results))
+    if args.results_file is not None:
+        with open(args.results_file, 'w') as fh:
+            json.dump(results, fh, indent=4, separators=(',', ': '), sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
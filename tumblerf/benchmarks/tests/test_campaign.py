@@ -0,0 +1,88 @@
+import json
+
+from .. import campaign
+from ..campaign import BASELINE_PATH, CaseBudgetGenerator, combinations, compare, format_report, run_combination
+from ...cases.tests.helpers import MockGenerator
+
+
+def suite_of(results):
+    return {"version": 1, "machine": {}, "settings": {"cases": 200, "iterations": 1, "deadline": 0.005},
+            "results": results}
+
+
+def metrics(cases_per_second=100.0, max_rss_kb=20000, startup_seconds=0.25, tx_p99=0.0001):
+    return {"cases_per_second": cases_per_second, "max_rss_kb": max_rss_kb, "startup_seconds": startup_seconds,
+            "stages": {"throw": {"p50": 0.001}, "tx": {"count": 2000, "p50": 0.00002, "p99": tx_p99},
+                       "record": {"count": 30, "p50": 0.0001, "p99": tx_p99}}}
+
+
+class TestCaseBudgetGenerator(object):
+
+    def test_caps_cases(self):
+        generator = CaseBudgetGenerator(MockGenerator(["a", "b", "c"]), 4)
+        assert list(generator.yield_test_case_from(0, 1)) == ["a", "b", "c", "a"]
+        assert list(generator.yield_test_case_from(2, 1)) == ["c", "a"]
+        assert generator.get_control_case() == "control"
+
+
+class TestCampaignBenchmark(object):
+
+    def test_combinations(self):
+        names = combinations()
+        assert len(names) == len(set(names)) == 12
+        assert combinations("franconian_notch/rx_frame_adaptive") == [
+            "franconian_notch/rx_frame_adaptive/received_frame"]
+
+    def test_run_combination(self):
+        result = run_combination("preamble_length/rx_frame/received_frame", cases=20)
+        assert result["cases"] == 20
+        # The emulated target takes every frame whole, so all are received, as the control cases are:
+        assert result["received"] == 20 + 21  # A control case before each test case and one at the end
+        assert "evidence" not in result["stages"]
+        assert result["cases_per_second"] > 0
+        assert result["max_rss_kb"] > 0
+        assert set(["generate", "throw", "control", "tx", "wait"]) <= set(result["stages"])
+        assert "throw" in format_report(suite_of({"preamble_length/rx_frame/received_frame": result}))
+
+    def test_compare(self):
+        baseline = suite_of({"a": metrics(), "b": metrics(), "c": {"error": "Failed"}, "d": metrics()})
+        current = suite_of({
+            "a": metrics(cases_per_second=90.0, startup_seconds=0.34),  # Within tolerance, and slack for startup
+            "b": metrics(cases_per_second=50.0, max_rss_kb=40000),
+            "c": metrics(),
+            "d": {"error": "Failed"},
+            "e": metrics(),  # Not in the baseline
+            "f": {"error": "Failed"},
+            "g": metrics(tx_p99=0.0012)
+        })
+        baseline["results"]["g"] = metrics(tx_p99=0.0005)
+        baseline["results"]["h"] = metrics(tx_p99=0.0001)
+        current["results"]["h"] = metrics(tx_p99=0.0004)  # Within the slack for stage latencies
+        # Nor is "record" in g, with too few samples for its percentiles to be stable
+        regressions = sorted(compare(current, baseline, tolerance=0.25))
+        assert len(regressions) == 5
+        assert regressions[0].startswith("b: cases_per_second went from 100 to 50")
+        assert regressions[1].startswith("b: max_rss_kb")
+        assert regressions[2].startswith("d: failed")
+        # A failure is reported even with no baseline for the combination:
+        assert regressions[3].startswith("f: failed")
+        assert regressions[4].startswith("g: tx p99 went from 0.0005 to 0.0012")
+
+    def test_baseline_has_no_failures(self):
+        with open(BASELINE_PATH) as fh:
+            baseline = json.load(fh)
+        assert set(baseline["results"]) <= set(combinations())
+        assert [name for name, result in baseline["results"].iteritems() if "error" in result] == []
+
+    def test_update_baseline_leaves_out_failures(self, tmpdir, monkeypatch):
+        suite = suite_of({"a": metrics(), "b": {"error": "Failed"}})
+        monkeypatch.setattr(campaign, "combinations", lambda only=None: ["a", "b"])
+        monkeypatch.setattr(campaign, "run_suite", lambda *args: json.loads(json.dumps(suite)))
+        path = str(tmpdir.join("baseline.json"))
+        with open(path, 'w') as fh:
+            json.dump(suite_of({"b": metrics(), "c": {"error": "Failed"}}), fh)
+        assert campaign.main(["--update_baseline", "--only", "a", "--baseline", path]) == 1
+        with open(path) as fh:
+            saved = json.load(fh)
+        # The earlier baseline of b is kept, as b failed this time:
+        assert saved["results"] == {"a": metrics(), "b": metrics()}
@@ -0,0 +1,40 @@
+from ..generator_rate import format_report, make_generator, measure_generator, run_isolated
+from ...cases.tests.helpers import MockGenerator
+
+
+class TestGeneratorRate(object):
+
+    def test_measure_mock_generator(self):
+        result = measure_generator(MockGenerator(["a", "b"]), frames=100, control_cases=10)
+        assert result["frames"] == 100
+        assert result["frames_per_second"] > 0
+        assert result["allocations_per_frame"] < 1  # Nothing is left behind per frame
+        assert result["control_case_us"]["p50"] <= result["control_case_us"]["p99"]
+
+    def test_measure_franconian_notch(self):
+        result = measure_generator(make_generator("Dot15d4FranconianNotchGenerator"), frames=20, control_cases=5)
+        assert result["frames"] == 20
+        assert result["allocations_per_frame"] < 1  # Rendered from a template, so nothing is left behind
+
+    def test_without_scapy(self):
+        # The beacon request generators pack their frame without scapy:
+        for class_name in ["Dot15d4PreambleLengthGenerator", "Dot15d4FranconianNotchGenerator"]:
+            result = run_isolated(class_name, mode="no_scapy", frames=5, control_cases=1)
+            assert result["frames"] == 5
+        result = run_isolated("Dot15d4RandomPayloadGenerator", mode="no_scapy", frames=5, control_cases=1)
+        assert result == {"error": "ImportError: No module named scapy (blocked for benchmarking)"}
+
+    def test_report_is_stable(self):
+        results = {
+            "Dot15d4RandomPayloadGenerator": {"no_scapy": {"error": "ImportError: No module named scapy"}},
+            "Dot15d4FranconianNotchGenerator": {
+                "no_scapy": {"error": "ImportError: No module named scapy"},
+                "scapy": {"frames_per_second": 794.64, "allocations_per_frame": 65.0,
+                          "control_case_us": {"mean": 1500.0, "p50": 1419.0, "p99": 2775.04}}
+            }
+        }
+        assert format_report(results).split("\n")[1:] == [
+            "Dot15d4FranconianNotchGenerator    scapy           794.6          65.0         1419.0         2775.0",
+            "Dot15d4FranconianNotchGenerator    no_scapy  ImportError: No module named scapy",
+            "Dot15d4RandomPayloadGenerator      no_scapy  ImportError: No module named scapy"
+        ]
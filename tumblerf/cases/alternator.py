@@ -1,7 +1,9 @@
-from time import sleep
+import time
 
 from .base import BaseCase
+from .calibration import LatencyCalibrator
 from .result import TestResult, TestResultWrapper
+from .timing import StageTimer
 
 """
 Implements a simple test setup which alternates between test cases and control cases.
@@ -11,60 +13,412 @@ Between each test case that it runs from the given generator, it runs a check of
 
 
 class AlternatorCase(BaseCase):
+    """
+    By default a control case is run before every test case. With set_control_interval() a control case is
+    instead run only every N test cases. When such a control case fails, the window of test cases thrown since
+    the last passing control case is bisected, replaying halves of it after resetting the target, to find which
+    test case broke the target. That test case's result is marked with "broke_target".
+
+    With set_checkpoint(), progress is saved periodically (at points where every earlier test case has been
+    checked and recorded) so an interrupted run can be resumed from there.
+
+    With set_early_stopping(), each case's outcomes across iterations feed a SequentialTest, and a case is no longer
+    thrown in later iterations once it is confidently always received or always missed. Each case's confidence is
+    recorded in the results under "confidence".
+
+    Each stage of the hot path (generating a case, throwing it, gathering evidence, control cases, bisecting,
+    resets and recording) is timed into a histogram per stage by a StageTimer. Case rates and stage percentiles are
+    printed periodically and recorded in the results under "timing". Stages may nest (e.g. "tx" and "wait" inside
+    "throw"), so their times don't sum to the elapsed time.
+    """
+    def __init__(self, interface, harness, generator):
+        BaseCase.__init__(self, interface, harness, generator)
+        self.__control_interval = 1
+        self.__min_control_interval = 1
+        self.__max_control_interval = 1
+        self.__adaptive_interval = False
+        self.__checkpoint = None
+        self.__resume = False
+        self.__sink = None
+        self.__keep_results = True
+        self.__sequential = None
+        self.__timer = StageTimer()
+
+    @property
+    def control_interval(self):
+        return self.__control_interval
+
+    def set_control_interval(self, interval, adaptive=False, max_interval=64):
+        """
+        Run a control case only every `interval` test cases.
+        :param interval: Number of test cases between control cases, 1 to check before every test case.
+        :param adaptive: If True, the interval doubles after each passing control case (up to max_interval), and
+            drops back to `interval` after a failing one.
+        :param max_interval: Upper bound on the interval when adaptive.
+        """
+        if interval < 1:
+            raise ValueError("Control interval must be at least 1.")
+        if adaptive and max_interval < interval:
+            raise ValueError("Maximum control interval must not be less than the starting interval.")
+        self.__control_interval = interval
+        self.__min_control_interval = interval
+        self.__max_control_interval = max_interval if adaptive else interval
+        self.__adaptive_interval = adaptive
+
+    @property
+    def checkpoint(self):
+        return self.__checkpoint
+
+    def set_checkpoint(self, checkpoint, resume=False):
+        """
+        Save progress to the given Checkpoint as the test runs.
+        :param checkpoint: Checkpoint, or None to stop checkpointing.
+        :param resume: If True, the next run_test() continues from what was last saved to the checkpoint, if any.
+        """
+        self.__checkpoint = checkpoint
+        self.__resume = resume
+
+    @property
+    def result_sink(self):
+        return self.__sink
+
+    def set_result_sink(self, sink, keep_results=False):
+        """
+        Stream results to a sink (such as a JsonLinesResultSink) as they are recorded. See TestResultWrapper.set_sink.
+        :param sink: The sink, or None to stop streaming.
+        """
+        self.__sink = sink
+        self.__keep_results = keep_results
+
+    @property
+    def sequential_test(self):
+        return self.__sequential
+
+    def set_early_stopping(self, sequential_test):
+        """
+        Stop repeating cases across iterations once a sequential probability ratio test has decided them.
+        The test's state is reset at the start of each run_test(), unless resuming from a checkpoint.
+        :param sequential_test: SequentialTest, or None to throw every case in every iteration.
+        """
+        self.__sequential = sequential_test
+
+    @property
+    def timer(self):
+        return self.__timer
+
+    def set_timer(self, timer):
+        """
+        Replace the StageTimer, e.g. to change how often it reports. It is reset at the start of each run_test().
+        :param timer: StageTimer
+        """
+        self.__timer = timer
 
     def does_control_case_pass(self, tr):
         print("INFO: Running control case.")
-        control_case = self.__generator.get_control_case()
+        control_case = self.generator.get_control_case()
         tr.add_raw_data("control_case", control_case.encode('hex'))
-        self.__interface.tx(control_case)
-        return self.__harness.is_valid()
+        self.interface.tx(control_case)
+        return self.harness.is_valid()
 
     def throw_test_case(self, tc_str, tr):
         raise NotImplementedError
 
+    def restore_valid_state(self, tr):
+        """
+        Runs control cases, resetting the target via the harness if it can, until a control case passes.
+        """
+        while not self.does_control_case_pass(tr):
+            if self.harness.implements_reset():
+                print("WARN: Control case didn't pass, resetting device via harness.")
+                start = self.__timer.start()
+                reset_result = self.harness.do_reset()
+                self.__timer.stop("reset", start)
+                print("INFO: Reset succeeded = {}".format(reset_result))
+            else:
+                print("WARN: Control case didn't pass, check device state.")
+
+    def find_breaking_case(self, window):
+        """
+        Bisects a window of test cases, after which a control case failed, to find the one that broke the target.
+        Each step resets the target, replays one half of the remaining candidates and runs a control case.
+        This assumes a single test case is responsible. If the harness can't reset, no replay is possible.
+        Only the first half is replayed at each step, so the case found is replayed alone to confirm it, in case the
+        failure doesn't reproduce.
+        :param window: List of (test case string, TestResult) tuples in the order they were thrown.
+        :return: Index into window of the test case found, or None if it can't be determined.
+        """
+        if len(window) == 0:
+            return None
+        if len(window) == 1:
+            return 0
+        if not self.harness.implements_reset():
+            print("WARN: Harness can't reset the device, unable to bisect {} test cases.".format(len(window)))
+            return None
+        lo, hi = 0, len(window)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            print("INFO: Bisecting, replaying test cases {} to {} of {}.".format(lo, mid - 1, len(window)))
+            if self.replay_breaks_target([tc for tc, _ in window[lo:mid]]):
+                hi = mid
+            else:
+                lo = mid
+        print("INFO: Confirming test case {} of {} breaks the target.".format(lo, len(window)))
+        if not self.replay_breaks_target([window[lo][0]]):
+            print("WARN: Failure didn't reproduce when replaying the {} test cases.".format(len(window)))
+            return None
+        return lo
+
+    def replay_breaks_target(self, test_cases):
+        """
+        Resets the target, replays the test cases and runs a control case, to see if they break the target.
+        The harness must implement reset.
+        :param test_cases: List of test case strings.
+        :return: True if the control case failed after the replay.
+        """
+        scratch = TestResult(None)
+        start = self.__timer.start()
+        self.harness.do_reset()
+        self.__timer.stop("reset", start)
+        self.restore_valid_state(scratch)
+        for tc in test_cases:
+            self.throw_test_case(tc, scratch)
+        return not self.does_control_case_pass(scratch)
+
+    def check_window(self, tr, window, results):
+        """
+        Runs a control case and commits the window of test cases thrown since the last one to the results.
+        If the control case fails, the test case responsible is found and marked, and the target is restored.
+        """
+        start = self.__timer.start()
+        passed = self.does_control_case_pass(tr)
+        start = self.__timer.stop("control", start)
+        if passed:
+            if self.__adaptive_interval:
+                self.__control_interval = min(self.__control_interval * 2, self.__max_control_interval)
+        else:
+            print("WARN: Control case didn't pass after {} test cases.".format(len(window)))
+            control_evidence = self.harness.evidence()
+            culprit = self.find_breaking_case(window)
+            start = self.__timer.stop("bisect", start)
+            if culprit is not None:
+                window[culprit][1].add_raw_data("broke_target", True)
+                if control_evidence:
+                    window[culprit][1].add_raw_data("control_evidence", control_evidence)
+                print("INFO: Test case {} broke the target.".format(window[culprit][1].case_num))
+            self.__control_interval = self.__min_control_interval
+            self.restore_valid_state(tr)
+            start = self.__timer.start()
+        for tc, window_tr in window:
+            self.generator.record_outcome(tc, window_tr)
+            if self.__sequential is not None and window_tr.case_num is not None:
+                self.__sequential.add(window_tr.case_num, window_tr.valid)
+            results.add_test_result(window_tr)
+        del window[:]
+        self.__timer.stop("record", start)
+
+    def save_checkpoint(self, iteration, case_num, results, complete=False, generator_state=None):
+        """
+        :param generator_state: The generator's state to resume from case `case_num`, if not its current state.
+        """
+        print("INFO: Saving checkpoint at iteration {}, case {}.".format(iteration, case_num))
+        self.record_summaries(results)
+        if generator_state is None:
+            generator_state = self.generator.get_state()
+        self.__checkpoint.save(iteration, case_num, generator_state, results.serializable(), complete)
+
+    def record_summaries(self, results):
+        """
+        Records the per-case confidence of early stopping, if enabled, and the stage timings in the results.
+        """
+        if self.__sequential is not None:
+            results.set_summary("confidence", self.__sequential.serializable())
+        results.set_summary("timing", self.__timer.serializable())
+
     def run_test(self, iterations=5):
         results = TestResultWrapper(self.interface, self.harness, self.generator)
-        for iteration in range(iterations):
-            case_num = 0
-            for tc in self.generator.yield_test_case(1):
-                tr = TestResult(case_num)
-                while not self.does_control_case_pass(tr):
-                    if self.harness.implements_reset():
-                        print("WARN: Control case didn't pass, check device state.")
-                    else:
-                        print("WARN: Control case didn't pass, resetting device via harness.")
-                        reset_result = self.harness.do_reset()
-                        print("INFO: Reset succeeded = {}".format(reset_result))
+        if self.__sink is not None:
+            results.set_sink(self.__sink, self.__keep_results)
+        if self.__sequential is not None:
+            self.__sequential.reset()
+        self.__timer.reset()
+        start_iteration, start_case = 0, 0
+        saved = self.__checkpoint.load() if self.__checkpoint is not None and self.__resume else None
+        if saved is not None:
+            results.load_serializable(saved["results"])
+            if self.__sequential is not None:
+                self.__sequential.load_serializable(saved["results"].get("confidence", {}))
+            if saved["complete"]:
+                print("INFO: Checkpoint shows the test already completed, nothing to resume.")
+                self.record_summaries(results)
+                results.set_end_now()
+                results.close()
+                return results
+            start_iteration, start_case = saved["iteration"], saved["case"]
+            self.generator.set_state(saved["generator_state"])
+            print("INFO: Resuming from checkpoint at iteration {}, case {}.".format(start_iteration, start_case))
+        for iteration in range(start_iteration, iterations):
+            case_num = start_case if iteration == start_iteration else 0
+            window = []
+            since_control = self.__control_interval  # Always run a control case before the first test case
+            skipped = 0
+            mark = self.__timer.start()
+            cases = self.generator.yield_test_case_from(case_num, 1)
+            while True:
+                # Checkpoints taken while running this case resume by generating it again, so they need the state
+                # from before it was generated.
+                generator_state = self.generator.get_state() if self.__checkpoint is not None else None
+                tc = next(cases, None)
+                if tc is None:
+                    break
+                mark = self.__timer.stop("generate", mark)
+                # Extra cases, such as FeedbackScheduler's mutants, are recorded without a case number and don't
+                # take one from the generator's own cases.
+                extra = self.generator.describe_extra_case(tc)
+                if extra is None and self.__sequential is not None and self.__sequential.is_decided(case_num):
+                    skipped += 1
+                    case_num += 1
+                    continue
+                tr = TestResult(case_num if extra is None else None)
+                if extra is not None:
+                    for key, value in extra.iteritems():
+                        tr.add_raw_data(key, value)
+                if since_control >= self.__control_interval:
+                    self.check_window(tr, window, results)
+                    since_control = 0
+                    if self.__checkpoint is not None and self.__checkpoint.due():
+                        self.save_checkpoint(iteration, case_num, results, generator_state=generator_state)
                 print("INFO: Running test case.")
-                if self.throw_test_case(tc, tr):
+                mark = self.__timer.start()
+                received = self.throw_test_case(tc, tr)
+                mark = self.__timer.stop("throw", mark)
+                if received:
                     print("INFO: Test case received packet: {}".format(tc.encode('hex')))
                     tr.set_valid(True)
                 else:
                     print("INFO: Test case missed packet:   {}".format(tc.encode('hex')))
                     tr.set_valid(False)
-                results.add_test_result(tr)
-                case_num += 1
+                    evidence = self.harness.evidence()
+                    if evidence:
+                        tr.add_raw_data("evidence", evidence)
+                    self.__timer.stop("evidence", mark)
+                window.append((tc, tr))
+                since_control += 1
+                if extra is None:
+                    case_num += 1
+                self.__timer.case_done()
+                self.__timer.maybe_report()
+                mark = self.__timer.start()
+            if len(window) > 0:
+                # Check the test cases thrown since the last control case, so they are attributed too.
+                self.check_window(TestResult(None), window, results)
+            if skipped > 0:
+                print("INFO: Skipped {} cases already decided in iteration {}.".format(skipped, iteration))
+            if self.__checkpoint is not None and iteration + 1 < iterations:
+                self.save_checkpoint(iteration + 1, 0, results)
+        print("INFO: Timing: {}".format(self.__timer.report()))
+        self.record_summaries(results)
         results.set_end_now()
+        results.close()
+        if self.__checkpoint is not None:
+            self.save_checkpoint(iterations, 0, results, complete=True)
         return results
 
 
 class AlternatorCaseRxFrame(AlternatorCase):
     """
     This is a variant that expects the Harness be of type ReceivedFrameHarness to function properly.
+    Rather than sleeping a fixed time after each transmission, it arms the harness with the expected frame before
+    transmitting and then waits on the harness, which returns as soon as the frame is received. The deadline is
+    only paid in full when the frame is missed.
     """
+    def __init__(self, interface, harness, generator, deadline=0.5):
+        """
+        :param deadline: Seconds to wait for the expected frame before declaring it missed. When a calibrator is
+            in use this is the ceiling for the calibrated deadline, and is what control cases always wait for.
+        """
+        AlternatorCase.__init__(self, interface, harness, generator)
+        self.__deadline = None
+        self.__calibrator = None
+        self.set_deadline(deadline)
+
+    @property
+    def deadline(self):
+        """
+        The deadline test cases currently wait for, in seconds.
+        """
+        if self.__calibrator is not None:
+            return self.__calibrator.deadline()
+        return self.__deadline
+
+    def set_deadline(self, deadline):
+        if deadline <= 0:
+            raise ValueError("Deadline must be a positive number of seconds.")
+        self.__deadline = deadline
+
+    @property
+    def calibrator(self):
+        return self.__calibrator
+
+    def set_calibrator(self, calibrator):
+        """
+        Use a LatencyCalibrator to set the test case deadline from observed TX to RX-match latencies.
+        Every matched frame feeds the calibrator, so the deadline keeps tracking the interface/harness pair.
+        Set to None to go back to the fixed deadline.
+        :param calibrator: LatencyCalibrator or None
+        """
+        if calibrator is not None and not isinstance(calibrator, LatencyCalibrator):
+            raise ValueError("Calibrator given was of type {}.".format(type(calibrator)))
+        self.__calibrator = calibrator
+
+    def calibrate(self, count=20, calibrator=None):
+        """
+        Sends a burst of control cases to measure the latency distribution, then uses it for test case deadlines.
+        :param count: Number of control cases to send.
+        :param calibrator: Optional LatencyCalibrator to configure; by default one is made with this case's
+            deadline as its ceiling.
+        :return: The calibrated deadline, in seconds.
+        """
+        if calibrator is None:
+            calibrator = LatencyCalibrator(max_deadline=self.__deadline)
+        print("INFO: Calibrating deadline with {} control cases.".format(count))
+        for i in range(count):
+            control_case = self.generator.get_control_case()
+            self.__tx_and_wait(control_case, calibrator.max_deadline, calibrator)
+        if calibrator.sample_count == 0:
+            print("WARN: No control cases were received during calibration, keeping deadline of {}s.".format(
+                self.__deadline))
+            return self.__deadline
+        deadline = calibrator.update()
+        self.set_calibrator(calibrator)
+        print("INFO: Calibration received {}/{} control cases, deadline set to {:.4f}s.".format(
+            calibrator.sample_count, count, deadline))
+        return deadline
+
+    def __tx_and_wait(self, frame, deadline, calibrator=None):
+        self.harness.set_expected_packet(frame)
+        start = time.time()
+        tx_start = self.timer.start()
+        self.interface.tx(frame)
+        sent = self.timer.stop("tx", tx_start)
+        received = self.harness.wait_valid(deadline)
+        self.timer.stop("wait", sent)
+        if received and calibrator is not None:
+            calibrator.add_sample(time.time() - start)
+        return received
+
     def does_control_case_pass(self, tr):
         print("INFO: Running control case.")
         control_case = self.generator.get_control_case()
-        self.harness.set_expected_packet(control_case)
         tr.add_raw_data("control_case", control_case.encode('hex'))
-        self.interface.tx(control_case)
-        sleep(0.5) # TODO: Adjust down, set high to ensure packet RX to start.
-        return self.harness.is_valid()
+        # Control cases always get the full deadline, so that latency drifting above the calibrated deadline
+        # is still observed and fed back into the calibrator.
+        return self.__tx_and_wait(control_case, self.__deadline, self.__calibrator)
 
     def throw_test_case(self, tc_str, tr):
         print("INFO: Running test case: {}.".format(tc_str.encode('hex')))
-        self.harness.set_expected_packet(tc_str)
         tr.add_raw_data("test_case", tc_str.encode('hex'))
-        self.interface.tx(tc_str)
-        sleep(0.5)  # TODO: Adjust down, set high to ensure packet RX to start.
-        return self.harness.is_valid()
+        start = time.time()
+        received = self.__tx_and_wait(tc_str, self.deadline, self.__calibrator)
+        if received:
+            tr.set_latency(time.time() - start)
+        return received
@@ -0,0 +1,85 @@
+"""
+Implements the LatencyCalibrator class, which tracks how long it takes for a transmitted frame to be seen by
+the harness and derives a per-case deadline from that distribution.
+"""
+
+from collections import deque
+
+
+class LatencyCalibrator():
+    def __init__(self, percentile=99.0, margin=1.5, window=200, min_deadline=0.005, max_deadline=0.5,
+                 update_every=20):
+        """
+        :param percentile: Percentile of the observed TX to RX-match latencies to base the deadline on.
+        :param margin: Multiplier applied to that percentile to give some headroom.
+        :param window: Number of most recent latency samples kept, so the deadline follows drift in conditions.
+        :param min_deadline: Lower bound on the deadline, in seconds.
+        :param max_deadline: Upper bound on the deadline, in seconds.
+        :param update_every: Number of new samples between recomputations of the deadline.
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError("Percentile must be in the range (0, 100].")
+        if min_deadline <= 0 or max_deadline < min_deadline:
+            raise ValueError("Deadline bounds must be positive with min_deadline <= max_deadline.")
+        self.__percentile = percentile
+        self.__margin = margin
+        self.__min_deadline = min_deadline
+        self.__max_deadline = max_deadline
+        self.__update_every = update_every
+        self.__samples = deque(maxlen=window)
+        self.__since_update = 0
+        self.__deadline = max_deadline
+
+    def __repr__(self):
+        return "{}(p{}={}, deadline={}, samples={})".format(self.__class__.__name__, self.__percentile,
+                                                            self.percentile(), self.__deadline, self.sample_count)
+
+    @property
+    def sample_count(self):
+        return len(self.__samples)
+
+    @property
+    def max_deadline(self):
+        return self.__max_deadline
+
+    def add_sample(self, latency):
+        """
+        Record the time between a transmission and the harness matching it.
+        :param latency: Time in seconds.
+        """
+        self.__samples.append(latency)
+        self.__since_update += 1
+        if self.__since_update >= self.__update_every:
+            self.update()
+
+    def percentile(self, percentile=None):
+        """
+        Returns the given percentile (default is the one configured) of the current window, using the nearest-rank
+        method, or None if no samples have been recorded.
+        :return: float or None
+        """
+        if percentile is None:
+            percentile = self.__percentile
+        if len(self.__samples) == 0:
+            return None
+        ordered = sorted(self.__samples)
+        rank = int(-(-percentile * len(ordered) // 100))  # ceil without importing math
+        return ordered[max(rank, 1) - 1]
+
+    def update(self):
+        """
+        Recompute the deadline from the current window of samples.
+        :return: The deadline, in seconds.
+        """
+        self.__since_update = 0
+        latency = self.percentile()
+        if latency is not None:
+            self.__deadline = min(max(latency * self.__margin, self.__min_deadline), self.__max_deadline)
+        return self.__deadline
+
+    def deadline(self):
+        """
+        Returns the current deadline in seconds. Until samples are recorded this is max_deadline.
+        :return: float
+        """
+        return self.__deadline
@@ -0,0 +1,75 @@
+"""
+Implements the Checkpoint class, which periodically saves the progress of a campaign to disk so that it can be
+resumed after an interruption without re-sending the test cases already completed.
+"""
+
+import json
+import os
+import time
+
+
+class Checkpoint():
+    def __init__(self, path, interval=60.0):
+        """
+        :param path: File the checkpoint is kept in. It is replaced atomically on each save.
+        :param interval: Minimum number of seconds between saves made when due() is checked.
+        """
+        self.__path = path
+        self.__interval = interval
+        self.__last_save = time.time()
+
+    def __repr__(self):
+        return "{}({}, interval={})".format(self.__class__.__name__, self.__path, self.__interval)
+
+    @property
+    def path(self):
+        return self.__path
+
+    def derive(self, suffix):
+        """
+        Returns a new Checkpoint with the same interval in a file named after this one plus the given suffix,
+        for use by one part of a larger campaign (a radio pair, a channel, etc).
+        """
+        return Checkpoint("{}.{}".format(self.__path, suffix), self.__interval)
+
+    def due(self):
+        """
+        Returns True if at least the interval has passed since the last save.
+        :return: bool
+        """
+        return time.time() - self.__last_save >= self.__interval
+
+    def save(self, iteration, case_num, generator_state, results, complete=False):
+        """
+        Writes the checkpoint, first to a temporary file which is then renamed over the previous checkpoint, so a
+        crash while saving leaves the last good checkpoint in place.
+        :param iteration: Iteration to resume at.
+        :param case_num: Case number within that iteration to resume at; all earlier cases have been recorded.
+        :param generator_state: dict from the generator's get_state().
+        :param results: dict from TestResultWrapper.serializable().
+        :param complete: True once the campaign has finished, so resuming doesn't send anything.
+        """
+        tmp_path = self.__path + ".tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump({
+                "iteration": iteration,
+                "case": case_num,
+                "generator_state": generator_state,
+                "complete": complete,
+                "saved_time": time.time(),
+                "results": results
+            }, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.rename(tmp_path, self.__path)
+        self.__last_save = time.time()
+
+    def load(self):
+        """
+        Reads the checkpoint back.
+        :return: dict with the values given to save(), or None if no checkpoint has been saved.
+        """
+        if not os.path.isfile(self.__path):
+            return None
+        with open(self.__path, 'r') as fh:
+            return json.load(fh)
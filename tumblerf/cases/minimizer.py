@@ -0,0 +1,152 @@
+"""
+Implements the TestCaseMinimizer class, which shrinks a test case that breaks the target down to a smaller one
+that still does, by re-transmitting simpler variants of it: a shorter preamble, a payload with bytes removed
+(including truncation), and a payload with bytes zeroed. Each variant is checked by resetting the target, sending
+it, and seeing whether a control case still passes, as AlternatorCase.replay_breaks_target() does.
+
+Variants can be checked on several radio pairs at once, and every verdict is cached so no variant is sent twice.
+"""
+
+import threading
+
+
+def _remove(payload, start, end):
+    return payload[:start] + payload[end:]
+
+
+def _zero(payload, start, end):
+    if payload[start:end] == "\x00" * (end - start):
+        return None
+    return payload[:start] + "\x00" * (end - start) + payload[end:]
+
+
+class TestCaseMinimizer():
+    def __init__(self, oracles, layout, cache=None):
+        """
+        :param oracles: List of functions, one per radio pair, each taking a frame and returning True if sending it
+            still breaks the target. Variants are checked on all of them at once.
+        :param layout: Dot15d4FrameLayout of the frames being minimized.
+        :param cache: Optional dict of frame to verdict, e.g. shared between minimizations of several test cases.
+        """
+        if len(oracles) == 0:
+            raise ValueError("Must provide at least one oracle.")
+        self.__oracles = oracles
+        self.__layout = layout
+        self.__cache = cache if cache is not None else {}
+        self.__sent_count = 0
+
+    def __repr__(self):
+        return "{}({} oracles, {})".format(self.__class__.__name__, len(self.__oracles), self.__layout)
+
+    @property
+    def cache(self):
+        return self.__cache
+
+    @property
+    def sent_count(self):
+        """
+        Number of variants actually sent, i.e. not answered from the cache.
+        """
+        return self.__sent_count
+
+    def check(self, frames):
+        """
+        Finds out which frames break the target, sending each uncached one to one of the oracles, in parallel.
+        :return: List of verdicts in the order of frames.
+        """
+        pending = []
+        for frame in frames:
+            if frame not in self.__cache and frame not in pending:
+                pending.append(frame)
+        for start in range(0, len(pending), len(self.__oracles)):
+            batch = pending[start:start + len(self.__oracles)]
+            verdicts = [None] * len(batch)
+
+            def run(i, oracle):
+                verdicts[i] = bool(oracle(batch[i]))
+
+            if len(batch) == 1:
+                run(0, self.__oracles[0])
+            else:
+                threads = [threading.Thread(target=run, args=(i, self.__oracles[i])) for i in range(len(batch))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            self.__sent_count += len(batch)
+            for frame, verdict in zip(batch, verdicts):
+                self.__cache[frame] = verdict
+        return [self.__cache[frame] for frame in frames]
+
+    def __first_breaking(self, candidates):
+        """
+        Returns the first of the candidate frames, in order, which breaks the target, or None. Candidates are checked
+        a batch (one per oracle) at a time, so later ones are only sent if no earlier one breaks the target.
+        """
+        for start in range(0, len(candidates), len(self.__oracles)):
+            batch = candidates[start:start + len(self.__oracles)]
+            for frame, verdict in zip(batch, self.check(batch)):
+                if verdict:
+                    return frame
+        return None
+
+    def __shorten_preamble(self, parts):
+        """
+        Tries the preambles left after dropping leading nibbles, shortest first.
+        """
+        preamble, header, payload = parts
+        candidates = [self.__layout.join(preamble[drop:], header, payload) for drop in range(len(preamble), 0, -1)]
+        found = self.__first_breaking(candidates)
+        if found is None:
+            return parts
+        return self.__layout.split(found)
+
+    def __reduce_payload(self, parts, transform):
+        """
+        Delta debugging over the payload: transform(payload, start, end) is applied to each chunk, latest chunk
+        first so truncation is tried before removing from the middle, and the first variant that still breaks
+        the target is kept. The chunks are halved whenever no variant does, down to single bytes.
+        """
+        preamble, header, payload = parts
+        granularity = 1
+        while len(payload) > 0:
+            chunk = -(-len(payload) // granularity)
+            variants = []
+            for start in reversed(range(0, len(payload), chunk)):
+                variant = transform(payload, start, min(start + chunk, len(payload)))
+                if variant is not None:
+                    variants.append(variant)
+            found = self.__first_breaking([self.__layout.join(preamble, header, v) for v in variants])
+            if found is not None:
+                payload = self.__layout.split(found)[2]
+                granularity = max(granularity - 1, 1)
+            elif chunk == 1:
+                break
+            else:
+                granularity = min(granularity * 2, len(payload))
+        return preamble, header, payload
+
+    def minimize(self, frame):
+        """
+        Shrinks a frame that breaks the target. The passes are repeated until none of them makes progress.
+        :return: The smallest variant found that still breaks the target, or None if the frame itself doesn't
+            reproducibly break it.
+        """
+        if not self.check([frame])[0]:
+            print("WARN: Test case {} doesn't break the target when replayed, not minimizing.".format(
+                frame.encode('hex')))
+            return None
+        original = parts = self.__layout.split(frame)
+        while True:
+            before = parts
+            if self.__layout.includes_phy:
+                parts = self.__shorten_preamble(parts)
+            parts = self.__reduce_payload(parts, _remove)
+            parts = self.__reduce_payload(parts, _zero)
+            if parts == before:
+                break
+        # Any change to the parts came from a variant that was checked, but the frame itself is returned as given.
+        minimized = self.__layout.join(*parts) if parts != original else frame
+        print("INFO: Minimized test case from {} to {} bytes, sending {} variants.".format(
+            len(frame), len(minimized), self.__sent_count))
+        return minimized
@@ -0,0 +1,140 @@
+"""
+Implements the ParallelCampaign class, which runs one worker process per radio pair so that several interface and
+harness pairs plugged into the same host can be driven at once.
+"""
+
+import multiprocessing
+import traceback
+from Queue import Empty
+
+
+class ParallelCampaign():
+    def __init__(self, worker, specs, join_timeout=5.0, poll_interval=0.5):
+        """
+        :param worker: Function called in each worker process as worker(index, spec, claim), returning a picklable
+            result (typically the output of TestResultWrapper.serializable()). Once the worker has opened its
+            devices it must call claim(unique_ids) with the BaseInterface.unique_id of each, and only proceed if
+            that returns True; this lets the campaign refuse to start when two workers would share a radio.
+        :param specs: List with one entry per worker, describing what it should use (e.g. command line arguments).
+        :param join_timeout: Seconds to wait for workers to exit on shutdown before terminating them.
+        :param poll_interval: Seconds between checks for workers which exited without reporting back, e.g. as they
+            were killed. Waiting in short steps also lets an interrupt reach the main process promptly.
+        """
+        if len(specs) == 0:
+            raise ValueError("Must provide at least one worker spec.")
+        self.__worker = worker
+        self.__specs = specs
+        self.__join_timeout = join_timeout
+        self.__poll_interval = poll_interval
+
+    def __repr__(self):
+        return "{}({} workers)".format(self.__class__.__name__, len(self.__specs))
+
+    @staticmethod
+    def find_conflicts(claims):
+        """
+        Returns the unique IDs claimed by more than one worker.
+        :param claims: dict mapping worker index to a list of unique IDs.
+        :return: dict mapping each conflicting unique ID to the list of worker indexes claiming it.
+        """
+        owners = {}
+        for index, unique_ids in claims.iteritems():
+            for unique_id in set(unique_ids):
+                owners.setdefault(unique_id, []).append(index)
+        return dict((uid, sorted(idxs)) for uid, idxs in owners.iteritems() if len(idxs) > 1)
+
+    def __worker_main(self, index, spec, queue, go_event, abort_event):
+        state = {'claimed': False}
+
+        def claim(unique_ids):
+            queue.put(('claim', index, list(unique_ids)))
+            state['claimed'] = True
+            go_event.wait()
+            return not abort_event.is_set()
+
+        try:
+            result = self.__worker(index, spec, claim)
+            if not state['claimed']:
+                queue.put(('claim', index, []))
+            queue.put(('result', index, result))
+        except BaseException as e:
+            if not state['claimed']:
+                queue.put(('claim', index, None))
+            queue.put(('error', index, "{}: {}".format(e, traceback.format_exc())))
+
+    @staticmethod
+    def __handle(message, claims, unclaimed, results, awaiting):
+        kind, index, value = message
+        if kind == 'claim':
+            unclaimed.discard(index)
+            if value is not None:
+                claims[index] = value
+        elif kind == 'error':
+            awaiting.discard(index)
+            print("ERROR: Worker {} failed: {}".format(index, value))
+        else:
+            awaiting.discard(index)
+            results[index] = value
+
+    def __next_message(self, queue, processes, awaiting):
+        """
+        Waits for the next message from any worker. Workers yet to report back, in `awaiting`, which exit without
+        doing so (e.g. killed by a signal or the OOM killer) are reported as lost and removed from it.
+        :return: The (kind, index, value) message, or None if none arrived in time.
+        """
+        # A worker which had exited before the wait began has already flushed all it sent, so if the wait times out
+        # there is nothing more to come from it.
+        exited = [index for index in awaiting if not processes[index].is_alive()]
+        try:
+            return queue.get(timeout=self.__poll_interval)
+        except Empty:
+            pass
+        for index in exited:
+            print("ERROR: Worker {} exited with code {} without reporting back, its results are lost.".format(
+                index, processes[index].exitcode))
+            awaiting.discard(index)
+        return None
+
+    def run(self):
+        """
+        Starts all the workers and waits for them to finish.
+        :return: List with the result of each worker in spec order, or None for workers that failed or were lost.
+        """
+        queue = multiprocessing.Queue()
+        go_event = multiprocessing.Event()
+        abort_event = multiprocessing.Event()
+        processes = []
+        for index, spec in enumerate(self.__specs):
+            process = multiprocessing.Process(target=self.__worker_main,
+                                              args=(index, spec, queue, go_event, abort_event))
+            process.start()
+            processes.append(process)
+        results = [None] * len(processes)
+        awaiting = set(range(len(processes)))  # workers yet to report a result or error
+        try:
+            # First every worker reports which devices it has opened, so conflicts are caught before any airtime.
+            # Workers which don't claim any report their result straight after, possibly before others' claims.
+            claims = {}
+            unclaimed = set(range(len(processes)))
+            while len(unclaimed & awaiting) > 0:
+                message = self.__next_message(queue, processes, awaiting)
+                if message is not None:
+                    ParallelCampaign.__handle(message, claims, unclaimed, results, awaiting)
+            conflicts = ParallelCampaign.find_conflicts(claims)
+            for unique_id, indexes in conflicts.iteritems():
+                print("ERROR: Interface {} is used by more than one worker ({}).".format(unique_id, indexes))
+            if len(conflicts) > 0:
+                abort_event.set()
+            go_event.set()
+            while len(awaiting) > 0:
+                message = self.__next_message(queue, processes, awaiting)
+                if message is not None:
+                    ParallelCampaign.__handle(message, claims, unclaimed, results, awaiting)
+        finally:
+            go_event.set()
+            for process in processes:
+                process.join(self.__join_timeout)
+                if process.is_alive():
+                    print("WARN: Worker process {} did not exit, terminating it.".format(process.pid))
+                    process.terminate()
+        return results
@@ -0,0 +1,175 @@
+"""
+Implements profiling of a campaign: the SamplingProfiler class, a statistical profiler driven by SIGPROF, and
+profile_call(), which runs a campaign under either it or cProfile, either throughout or only while inside the
+methods of chosen components (e.g. just the generator) so the other components' time is left out.
+
+Both profilers only see the thread running the campaign, so work a harness does on its own threads (such as the
+ReceivedFrameHarness reader) shows up as the time spent waiting on it rather than as the work itself. Likewise, calls
+into a profiled component made from another thread are left out.
+"""
+
+import inspect
+import signal
+import threading
+import types
+from collections import Counter
+
+
+class SamplingProfiler():
+    def __init__(self, interval=0.005):
+        """
+        :param interval: Seconds of CPU time between samples. Only CPU time is sampled, so time blocked waiting on
+            the radio or the target doesn't show up; use cProfile to see that.
+        """
+        if interval <= 0:
+            raise ValueError("Sampling interval must be positive.")
+        self.__interval = interval
+        self.__stacks = Counter()
+        self.__previous_handler = None
+        self.__enabled = False
+
+    def __repr__(self):
+        return "{}(interval={}, samples={})".format(self.__class__.__name__, self.__interval, self.sample_count)
+
+    @property
+    def sample_count(self):
+        return sum(self.__stacks.itervalues())
+
+    @property
+    def stacks(self):
+        """
+        Counter of each sampled stack, as a tuple of "file:function" entries from outermost to innermost.
+        """
+        return self.__stacks
+
+    def __sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append("{}:{}".format(code.co_filename, code.co_name))
+            frame = frame.f_back
+        self.__stacks[tuple(reversed(stack))] += 1
+
+    def enable(self):
+        """
+        Starts sampling. Must be called from the main thread, as only it receives signals.
+        """
+        if self.__enabled:
+            return
+        self.__previous_handler = signal.signal(signal.SIGPROF, self.__sample)
+        signal.setitimer(signal.ITIMER_PROF, self.__interval, self.__interval)
+        self.__enabled = True
+
+    def disable(self):
+        if not self.__enabled:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.__previous_handler)
+        self.__enabled = False
+
+    def dump_stats(self, path):
+        """
+        Writes the samples as collapsed stacks, one "outer;...;inner count" line per stack, as read by flame graph
+        tools such as flamegraph.pl and speedscope.
+        """
+        with open(path, 'w') as fh:
+            for stack, count in sorted(self.__stacks.iteritems()):
+                fh.write("{} {}\n".format(";".join(stack), count))
+
+
+class ComponentProfiler():
+    def __init__(self, profiler):
+        """
+        Enables a profiler only while a call into one of the wrapped components is in progress, on the thread this
+        is created on. Both profilers only act on the thread enabling them (and SamplingProfiler can only be enabled
+        from the main thread), so calls made from other threads run unprofiled.
+        :param profiler: Object with enable() and disable(), such as a cProfile.Profile or SamplingProfiler.
+        """
+        self.__profiler = profiler
+        self.__thread = threading.current_thread()
+        self.__local = threading.local()  # holds the nesting depth of calls on each thread
+        self.__wrapped = []
+
+    def __enter(self):
+        """
+        :return: True if the call is profiled, in which case __exit() must be called after it.
+        """
+        if threading.current_thread() is not self.__thread:
+            return False
+        depth = getattr(self.__local, 'depth', 0)
+        if depth == 0:
+            self.__profiler.enable()
+        self.__local.depth = depth + 1
+        return True
+
+    def __exit(self):
+        self.__local.depth -= 1
+        if self.__local.depth == 0:
+            self.__profiler.disable()
+
+    def __wrap_method(self, method):
+        def wrapper(*args, **kwargs):
+            profiled = self.__enter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                if profiled:
+                    self.__exit()
+            if isinstance(result, types.GeneratorType):
+                # Generators do their work as they are iterated, so profile each step rather than the call.
+                return self.__wrap_iterator(result)
+            return result
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    def __wrap_iterator(self, iterator):
+        while True:
+            profiled = self.__enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                if profiled:
+                    self.__exit()
+            yield item
+
+    def wrap(self, component):
+        """
+        Wraps the public methods of a component (e.g. a generator, interface or harness instance) so the profiler is
+        enabled during calls to them, until unwrap_all() is called.
+        """
+        for name, _ in inspect.getmembers(component.__class__, inspect.ismethod):
+            if name.startswith('_') or name in component.__dict__:
+                continue
+            setattr(component, name, self.__wrap_method(getattr(component, name)))
+            self.__wrapped.append((component, name))
+
+    def unwrap_all(self):
+        for component, name in self.__wrapped:
+            delattr(component, name)
+        self.__wrapped = []
+
+
+def profile_call(func, profiler, components=None):
+    """
+    Calls func() under a profiler.
+    :param profiler: Object with enable() and disable(), such as a cProfile.Profile or SamplingProfiler.
+    :param components: Optional list of objects to profile only the methods of; by default everything func() does
+        is profiled.
+    :return: Whatever func() returns.
+    """
+    if components is None:
+        profiler.enable()
+        try:
+            return func()
+        finally:
+            profiler.disable()
+    component_profiler = ComponentProfiler(profiler)
+    for component in components:
+        component_profiler.wrap(component)
+    try:
+        return func()
+    finally:
+        component_profiler.unwrap_all()
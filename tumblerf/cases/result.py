@@ -4,17 +4,39 @@ Implements the TestResult class which cases use to record their results.
 
 import time
 
+from .result_store import CompactResultStore
+
 
 class TestResult():
     def __init__(self, case_num):
         self.__case_num = case_num
         self.__valid = None
         self.__raw = {}
+        self.__latency = None
 
     @property
     def case_num(self):
         return self.__case_num
 
+    @property
+    def valid(self):
+        return self.__valid
+
+    @property
+    def raw(self):
+        return self.__raw
+
+    @property
+    def latency(self):
+        """
+        Seconds from sending the test case to the harness seeing the expected response, if measured. This is used
+        for feedback while running and isn't part of serializable().
+        """
+        return self.__latency
+
+    def set_latency(self, latency):
+        self.__latency = latency
+
     def set_valid(self, res):
         self.__valid = res
 
@@ -24,6 +46,16 @@ class TestResult():
     def add_raw_data(self, key, value):
         self.__raw[key] = value
 
+    @staticmethod
+    def from_serializable(data):
+        """
+        Rebuilds a TestResult from the output of serializable().
+        """
+        tr = TestResult(data["case"])
+        tr.set_valid(data["valid"])
+        tr.set_raw_data(dict(data["raw"]))
+        return tr
+
     def serializable(self):
         return {
             "case": self.__case_num,
@@ -39,13 +71,50 @@ class TestResultWrapper():
         self.__interface = interface
         self.__harness = harness
         self.__generator = generator
-        self.__results = {}
+        self.__results = CompactResultStore()
+        self.__sink = None
+        self.__keep_results = True
+        self.__summary = {}
         self.set_start_now()
 
+    def set_sink(self, sink, keep_results=False):
+        """
+        Stream each TestResult to a sink (such as a JsonLinesResultSink) as it is added.
+        The sink is opened with metadata() now, and closed by close().
+        :param sink: Object implementing open(metadata), write(test_result) and close(end_time, summary).
+        :param keep_results: If False, results are only written to the sink and not kept in memory, so
+            serializable() will only list results restored with load_serializable().
+        """
+        self.__sink = sink
+        self.__keep_results = keep_results
+        self.__sink.open(self.metadata())
+
     def add_test_result(self, test_result):
-        if test_result.case_num not in self.__results:
-            self.__results[test_result.case_num] = []
-        self.__results[test_result.case_num].append(test_result)
+        if self.__sink is not None:
+            self.__sink.write(test_result)
+            if not self.__keep_results:
+                return
+        self.__store(test_result)
+
+    def __store(self, test_result):
+        self.__results.add(test_result)
+
+    def load_serializable(self, data):
+        """
+        Restores the start time and results from the output of serializable(), e.g. to resume from a checkpoint.
+        Any results already held are kept.
+        """
+        self.__start_time = data.get("start_time", self.__start_time)
+        for trs in data["results"].itervalues():
+            for tr in trs:
+                self.__store(TestResult.from_serializable(tr))
+
+    def set_summary(self, key, value):
+        """
+        Records a summary of the run under a key of serializable(), such as the per-case "confidence" of early
+        stopping. Summaries are only known at the end of the run, so they go in a sink's footer rather than header.
+        """
+        self.__summary[key] = value
 
     def set_start_now(self):
         self.__start_time = time.time()
@@ -53,10 +122,19 @@ class TestResultWrapper():
     def set_end_now(self):
         self.__end_time = time.time()
 
-    def serializable(self):
-        serializable_results = {}
-        for k, trs in self.__results.iteritems():
-            serializable_results[k] = map(lambda tr: tr.serializable(), trs)
+    def close(self):
+        """
+        Closes the sink, if one is set, once all results have been added.
+        """
+        if self.__sink is not None:
+            self.__sink.close(self.__end_time, self.__summary)
+            self.__sink = None
+
+    def metadata(self):
+        """
+        Returns the details of the run, which is serializable() without the results.
+        :return: dict
+        """
         return {
             "interface": self.__interface.status()[1],
             "harness": {
@@ -68,6 +146,61 @@ class TestResultWrapper():
                 "includes_mac": self.__generator.includes_mac
             },
             "start_time": self.__start_time,
-            "end_time": self.__end_time,
-            "results": serializable_results
+            "end_time": self.__end_time
         }
+
+    def serializable(self):
+        serialized = self.metadata()
+        serialized.update(self.__summary)
+        serialized["results"] = self.__results.serializable()
+        return serialized
+
+
+def remap_case_numbers(serialized, case_map):
+    """
+    Renumbers the cases in the output of TestResultWrapper.serializable(), e.g. from a shard's local numbering to
+    the numbering of the full generator.
+    :param serialized: dict from TestResultWrapper.serializable(), which is modified in place.
+    :param case_map: Function taking a case number and returning the new one.
+    :return: The updated dict.
+    """
+    remapped = {}
+    for case_num, trs in serialized["results"].iteritems():
+        new_num = case_map(case_num)
+        for tr in trs:
+            tr["case"] = new_num
+        remapped.setdefault(new_num, []).extend(trs)
+    serialized["results"] = remapped
+    if "confidence" in serialized:
+        serialized["confidence"] = dict((case_map(case_num), entry)
+                                        for case_num, entry in serialized["confidence"].iteritems())
+    return serialized
+
+
+def merge_serializable(serialized_list):
+    """
+    Merges the outputs of several TestResultWrapper.serializable() calls, e.g. from campaigns run in parallel on
+    different radio pairs, into one dict of the same layout. The "interface" entry is that of the first, and all of
+    them are listed under "interfaces". Per-case "confidence" entries are combined, keeping the first for a case.
+    :param serialized_list: List of dicts from TestResultWrapper.serializable().
+    :return: dict
+    """
+    if len(serialized_list) == 0:
+        raise ValueError("Must provide at least one set of results to merge.")
+    merged = dict(serialized_list[0])
+    merged["interfaces"] = [s["interface"] for s in serialized_list]
+    start_times = [s["start_time"] for s in serialized_list if s.get("start_time") is not None]
+    end_times = [s["end_time"] for s in serialized_list if s.get("end_time") is not None]
+    merged["start_time"] = min(start_times) if start_times else None
+    merged["end_time"] = max(end_times) if end_times else None
+    merged_results = {}
+    for s in serialized_list:
+        for case_num, trs in s["results"].iteritems():
+            merged_results.setdefault(case_num, []).extend(trs)
+    merged["results"] = merged_results
+    confidence = {}
+    for s in reversed(serialized_list):
+        confidence.update(s.get("confidence", {}))
+    if confidence:
+        merged["confidence"] = confidence
+    return merged
@@ -0,0 +1,138 @@
+"""
+Implements the CaseCounts reducer, which tallies the valid and invalid results of each case, and functions to fold
+a results file of any supported format into one. CaseCounts from different files (or different processes) merge
+into one, so many files can be counted in parallel while holding only one entry per distinct case.
+
+Results of a channel sweep, whether in the "channels" layout of merge_channel_results() or streamed with each record
+marked with its channel, are counted separately for each channel, as each channel numbers its cases from zero.
+"""
+
+import json
+
+from .result_columnar import ColumnarResults, is_columnar, numpy
+from .result_stream import is_json_lines, read_json_lines
+from .sweep import split_channels
+
+
+class CaseCounts():
+    def __init__(self):
+        # case number: [valid count, invalid count, example test case]
+        self.__counts = {}
+
+    def __repr__(self):
+        return "{}({} cases)".format(self.__class__.__name__, len(self.__counts))
+
+    def __len__(self):
+        return len(self.__counts)
+
+    def add(self, case_num, valid, example=None, count=1):
+        """
+        Tallies results of a case.
+        :param valid: True if the results were valid.
+        :param example: The case's test case, kept if the case doesn't have an example yet.
+        :param count: Number of results being tallied.
+        """
+        entry = self.__counts.get(case_num)
+        if entry is None:
+            entry = self.__counts[case_num] = [0, 0, example]
+        elif entry[2] is None:
+            entry[2] = example
+        entry[0 if valid else 1] += count
+
+    def merge(self, other):
+        """
+        Folds the counts of another CaseCounts into this one.
+        :return: This CaseCounts.
+        """
+        for case_num, count_valid, count_invalid, example in other.rows():
+            self.add(case_num, True, example, count_valid)
+            self.add(case_num, False, example, count_invalid)
+        return self
+
+    def rows(self):
+        """
+        :return: List of (case number, valid count, invalid count, example test case) tuples, ordered by case.
+        """
+        return [(case_num, entry[0], entry[1], entry[2]) for case_num, entry in sorted(self.__counts.iteritems())]
+
+
+def iter_results(filename, invalid_only=False):
+    """
+    Yields the serializable() output of each result in a columnar, JSON-lines or JSON results file, in a single
+    pass. Columnar and JSON-lines files are read one result at a time; a JSON file has to be loaded in full.
+    Results of a channel sweep also give the "channel" they were run on.
+    :param invalid_only: If True, only results which aren't valid are yielded.
+    """
+    with open(filename, 'rb') as fh:
+        columnar = is_columnar(fh)
+    if columnar:
+        results = ColumnarResults(filename)
+        channel = results.metadata.get("channel")
+        try:
+            if invalid_only and numpy is not None:
+                indexes = numpy.flatnonzero(results.column("valid") != 1)
+            else:
+                indexes = xrange(len(results))
+            for index in indexes:
+                result = results.result(int(index))
+                if not invalid_only or result["valid"] is not True:
+                    if channel is not None:
+                        result["channel"] = channel
+                    yield result
+        finally:
+            results.close()
+        return
+    with open(filename, 'r') as fh:
+        if is_json_lines(fh):
+            for record in read_json_lines(fh):
+                if record.pop("type", None) == "result" and (not invalid_only or record.get("valid") is not True):
+                    yield record
+            return
+        data = json.load(fh)
+    for channel, run in split_channels(data):
+        for case in run.get("results").itervalues():
+            for result in case:
+                if not invalid_only or result.get("valid") is not True:
+                    yield result if channel is None else dict(result, channel=channel)
+
+
+def count_file(filename):
+    """
+    Counts the results of each case in a columnar, JSON-lines or JSON results file. Columnar and JSON-lines files
+    are read without loading their results into memory; a JSON file has to be loaded in full.
+    :return: Tuple of the filename and a list of (channel, generator name, CaseCounts) tuples, one per channel of a
+        sweep in channel order, or a single one with a channel of None for any other run.
+    """
+    with open(filename, 'rb') as fh:
+        columnar = is_columnar(fh)
+    if columnar:
+        results = ColumnarResults(filename)
+        counts = CaseCounts()
+        try:
+            for case_num, (count_valid, count_invalid, first) in results.case_counts().iteritems():
+                example = results.frame(first, "test_case")
+                example = example.encode('hex') if example is not None else None
+                counts.add(case_num, True, example, count_valid)
+                counts.add(case_num, False, example, count_invalid)
+            return filename, [(results.metadata.get("channel"), results.metadata.get("generator").get("name"), counts)]
+        finally:
+            results.close()
+    with open(filename, 'r') as fh:
+        if is_json_lines(fh):
+            runs = {}  # channel: [generator name, CaseCounts]
+            for record in read_json_lines(fh):
+                run = runs.setdefault(record.get("channel"), [None, CaseCounts()])
+                if record.get("type") == "header" and run[0] is None:
+                    run[0] = record.get("generator").get("name")
+                elif record.get("type") == "result":
+                    run[1].add(record["case"], record.get("valid"), record.get("raw", {}).get("test_case"))
+            return filename, [(channel, run[0], run[1]) for channel, run in sorted(runs.iteritems())]
+        data = json.load(fh)
+    runs = []
+    for channel, run in split_channels(data):
+        counts = CaseCounts()
+        for case in run.get("results").itervalues():
+            for result in case:
+                counts.add(result["case"], result.get("valid"), result.get("raw", {}).get("test_case"))
+        runs.append((channel, run.get("generator").get("name"), counts))
+    return filename, runs
@@ -0,0 +1,251 @@
+"""
+Implements a binary columnar file format for campaign results, with a writer that converts from the JSON layout of
+TestResultWrapper.serializable() and the ColumnarResults reader, which memory maps a file so results can be
+aggregated over its columns without parsing each one.
+
+A file is laid out as:
+    magic
+    case column         int64 per result
+    valid column        int8 per result (-1 for no result, 0 invalid, 1 valid)
+    offset column       uint64 per result, where its frames start in the frame section
+    control length      int32 per result, -1 if the result has no control_case frame
+    test length         int32 per result, -1 if the result has no test_case frame
+    frame section       the control and test frames of each result, one after the other, as raw bytes
+    metadata            JSON of the run details, plus any other raw data under "extras" keyed by result index
+    footer              fixed size index giving the count and the offset of each section above
+All integers are little endian, and each column starts on an 8 byte boundary.
+"""
+
+import json
+import mmap
+import os.path
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .result_store import FRAME_KEYS
+from .result_stream import is_json_lines, load_json_lines
+from .sweep import split_channels
+
+MAGIC = "TRFCOL01"
+# magic, count, case, valid, offset, control length, test length, frames, frames length, metadata, metadata length
+_FOOTER = struct.Struct("<8s10Q")
+
+_VALID_CODES = {None: -1, False: 0, True: 1}
+_VALID_VALUES = {-1: None, 0: False, 1: True}
+_NO_FRAME = -1
+_LENGTH_COLUMNS = {"control_case": "control_length", "test_case": "test_length"}
+
+# Column name: (struct format, numpy dtype), in the order they are written.
+_COLUMNS = [
+    ("case", ('q', '<i8')),
+    ("valid", ('b', 'i1')),
+    ("offset", ('Q', '<u8')),
+    ("control_length", ('i', '<i4')),
+    ("test_length", ('i', '<i4'))
+]
+
+
+def is_columnar(fh):
+    """
+    Returns True if the file starts with the columnar format's magic. The file position is restored.
+    """
+    position = fh.tell()
+    try:
+        return fh.read(len(MAGIC)) == MAGIC
+    finally:
+        fh.seek(position)
+
+
+def _pad(fh):
+    remainder = fh.tell() % 8
+    if remainder:
+        fh.write("\0" * (8 - remainder))
+
+
+def write_columnar(fh, serialized):
+    """
+    Writes results to a file in the columnar format.
+    :param fh: File object opened for writing in binary mode.
+    :param serialized: dict in the layout of TestResultWrapper.serializable(), e.g. loaded from a JSON results file.
+    :return: Number of results written.
+    """
+    columns = dict((name, []) for name, _ in _COLUMNS)
+    frames = bytearray()
+    extras = {}
+    for trs in serialized["results"].itervalues():
+        for tr in trs:
+            raw = dict(tr.get("raw", {}))
+            columns["offset"].append(len(frames))
+            for key in FRAME_KEYS:
+                frame = None
+                if isinstance(raw.get(key), basestring):
+                    try:
+                        frame = raw[key].decode('hex')
+                    except (TypeError, ValueError):
+                        pass
+                if frame is None:
+                    columns[_LENGTH_COLUMNS[key]].append(_NO_FRAME)
+                else:
+                    del raw[key]
+                    columns[_LENGTH_COLUMNS[key]].append(len(frame))
+                    frames.extend(frame)
+            if len(raw) > 0:
+                extras[str(len(columns["case"]))] = raw
+            columns["case"].append(tr["case"] if tr["case"] is not None else -1)
+            columns["valid"].append(_VALID_CODES[tr["valid"]])
+    metadata = dict((k, v) for k, v in serialized.iteritems() if k != "results")
+    metadata["extras"] = extras
+
+    fh.write(MAGIC)
+    offsets = []
+    for name, (fmt, _) in _COLUMNS:
+        _pad(fh)
+        offsets.append(fh.tell())
+        fh.write(struct.pack("<{}{}".format(len(columns[name]), fmt), *columns[name]))
+    frames_offset = fh.tell()
+    fh.write(frames)
+    metadata_offset = fh.tell()
+    metadata_json = json.dumps(metadata)
+    fh.write(metadata_json)
+    fh.write(_FOOTER.pack(MAGIC, len(columns["case"]), *(offsets + [
+        frames_offset, len(frames), metadata_offset, len(metadata_json)
+    ])))
+    return len(columns["case"])
+
+
+def convert_to_columnar(in_path, out_path):
+    """
+    Converts a JSON or JSON-lines results file to the columnar format. The results of a channel sweep are written
+    to a file per channel, named after out_path with the channel before its extension (e.g. "results.ch11.trfc"),
+    with the channel kept in its metadata.
+    :return: List of (path written, number of results converted) tuples.
+    """
+    with open(in_path, 'r') as fh:
+        serialized = load_json_lines(fh) if is_json_lines(fh) else json.load(fh)
+    converted = []
+    for channel, run in split_channels(serialized):
+        path = out_path
+        if channel is not None:
+            root, extension = os.path.splitext(out_path)
+            path = "{}.ch{}{}".format(root, channel, extension)
+            run = dict(run, channel=channel)
+        with open(path, 'wb') as fh:
+            converted.append((path, write_columnar(fh, run)))
+    return converted
+
+
+class ColumnarResults():
+    def __init__(self, path):
+        """
+        Memory maps a columnar results file. Columns are read straight from the mapping, as numpy arrays if numpy
+        is available, so only the pages touched are read from disk.
+        :param path: File written by write_columnar().
+        """
+        self.__path = path
+        self.__fh = open(path, 'rb')
+        self.__mm = mmap.mmap(self.__fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.__mm) < len(MAGIC) + _FOOTER.size or self.__mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError("{} is not a columnar results file.".format(path))
+        footer = _FOOTER.unpack_from(self.__mm, len(self.__mm) - _FOOTER.size)
+        if footer[0] != MAGIC:
+            self.close()
+            raise ValueError("{} is truncated, it has no footer.".format(path))
+        self.__count = footer[1]
+        self.__column_offsets = dict(zip([name for name, _ in _COLUMNS], footer[2:7]))
+        self.__frames_offset = footer[7]
+        self.__metadata_offset, metadata_length = footer[9], footer[10]
+        self.__metadata = json.loads(self.__mm[self.__metadata_offset:self.__metadata_offset + metadata_length])
+        self.__extras = self.__metadata.pop("extras", {})
+        self.__columns = {}
+
+    def __repr__(self):
+        return "{}({}, {} results)".format(self.__class__.__name__, self.__path, self.__count)
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def metadata(self):
+        """
+        The run details (interface, harness, generator, start and end times) as in TestResultWrapper.metadata().
+        """
+        return self.__metadata
+
+    def close(self):
+        """
+        Unmaps the file. Columns returned by column() must not be used afterwards.
+        """
+        if self.__mm is not None:
+            self.__columns = {}
+            self.__mm.close()
+            self.__mm = None
+        self.__fh.close()
+
+    def column(self, name):
+        """
+        Returns a column ("case", "valid", "offset", "control_length" or "test_length"), as a numpy array backed by
+        the mapping if numpy is available, otherwise as a tuple.
+        """
+        if name not in self.__columns:
+            fmt, dtype = dict(_COLUMNS)[name]
+            offset = self.__column_offsets[name]
+            if numpy is not None:
+                self.__columns[name] = numpy.frombuffer(self.__mm, dtype=dtype, count=self.__count, offset=offset)
+            else:
+                self.__columns[name] = struct.unpack_from("<{}{}".format(self.__count, fmt), self.__mm, offset)
+        return self.__columns[name]
+
+    def frame(self, index, key):
+        """
+        Returns the raw bytes of a frame of the result at an index, or None if it has none under that key.
+        """
+        lengths = [int(self.column(_LENGTH_COLUMNS[k])[index]) for k in FRAME_KEYS]
+        length = lengths[FRAME_KEYS.index(key)]
+        if length == _NO_FRAME:
+            return None
+        start = self.__frames_offset + int(self.column("offset")[index]) + \
+            sum(max(l, 0) for l in lengths[:FRAME_KEYS.index(key)])
+        return self.__mm[start:start + length]
+
+    def result(self, index):
+        """
+        Rebuilds the serializable() output of the TestResult at an index.
+        :return: dict
+        """
+        raw = dict(self.__extras.get(str(index), {}))
+        for key in FRAME_KEYS:
+            frame = self.frame(index, key)
+            if frame is not None:
+                raw[key] = frame.encode('hex')
+        case_num = int(self.column("case")[index])
+        return {
+            "case": None if case_num == -1 else case_num,
+            "valid": _VALID_VALUES[int(self.column("valid")[index])],
+            "raw": raw
+        }
+
+    def case_counts(self):
+        """
+        Counts the valid and invalid results of each case, working over the columns.
+        :return: dict mapping case number to (valid count, invalid count, index of the case's first result).
+        """
+        cases = self.column("case")
+        valid = self.column("valid")
+        if numpy is not None:
+            unique, first, inverse = numpy.unique(cases, return_index=True, return_inverse=True)
+            valid_counts = numpy.bincount(inverse, weights=(valid == 1), minlength=len(unique))
+            totals = numpy.bincount(inverse, minlength=len(unique))
+            return dict((int(case_num), (int(v), int(t - v), int(i)))
+                        for case_num, v, t, i in zip(unique, valid_counts, totals, first))
+        counts = {}
+        for index in xrange(self.__count):
+            entry = counts.get(cases[index])
+            if entry is None:
+                entry = counts[cases[index]] = [0, 0, index]
+            entry[0 if valid[index] == 1 else 1] += 1
+        return dict((case_num, tuple(entry)) for case_num, entry in counts.iteritems())
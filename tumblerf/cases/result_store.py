@@ -0,0 +1,123 @@
+"""
+Implements the CompactResultStore class, which TestResultWrapper uses to hold results in memory.
+
+Rather than keeping each TestResult object with its own dict of hex strings, the store appends each result to a set of
+parallel arrays (case number, validity, timestamp, arena offset and the length of each frame) and copies its frames, as
+raw bytes and one after the other, into one shared arena. A result costs a few dozen bytes plus its frames, instead of
+the several hundred bytes of objects and dicts per result it would otherwise take.
+"""
+
+import time
+from array import array
+
+FRAME_KEYS = ("control_case", "test_case")
+
+_VALID_CODES = {None: -1, False: 0, True: 1}
+_VALID_VALUES = {-1: None, 0: False, 1: True}
+_NO_CASE = -1
+_NO_FRAME = -1
+_MAX_FRAME = 0x7fff
+
+
+class CompactResultStore():
+    def __init__(self):
+        self.__cases = array('l')
+        self.__valid = array('b')
+        self.__times = array('d')
+        self.__offsets = array('L')
+        self.__frame_lengths = dict((key, array('h')) for key in FRAME_KEYS)
+        self.__arena = bytearray()
+        # Raw entries other than well-formed frames are rare (e.g. "broke_target"), so are kept per index.
+        self.__extras = {}
+
+    def __repr__(self):
+        return "{}({} results, {} bytes)".format(self.__class__.__name__, len(self), self.nbytes)
+
+    def __len__(self):
+        return len(self.__cases)
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by the stored results, not counting the extras.
+        :return: int
+        """
+        columns = [self.__cases, self.__valid, self.__times, self.__offsets] + self.__frame_lengths.values()
+        return sum(len(column) * column.itemsize for column in columns) + len(self.__arena)
+
+    def add(self, test_result, timestamp=None):
+        """
+        Copies a TestResult into the store. Later changes to the TestResult are not reflected.
+        :param timestamp: Time the result was recorded, defaulting to now.
+        :return: Index of the stored result.
+        """
+        index = len(self.__cases)
+        raw = dict(test_result.raw)
+        self.__offsets.append(len(self.__arena))
+        for key in FRAME_KEYS:
+            frame = None
+            if isinstance(raw.get(key), basestring):
+                try:
+                    frame = raw[key].decode('hex')
+                except (TypeError, ValueError):
+                    pass
+            if frame is None or len(frame) > _MAX_FRAME:
+                self.__frame_lengths[key].append(_NO_FRAME)
+            else:
+                del raw[key]
+                self.__frame_lengths[key].append(len(frame))
+                self.__arena.extend(frame)
+        if len(raw) > 0:
+            self.__extras[index] = raw
+        self.__cases.append(_NO_CASE if test_result.case_num is None else test_result.case_num)
+        self.__valid.append(_VALID_CODES[test_result.valid])
+        self.__times.append(timestamp if timestamp is not None else time.time())
+        return index
+
+    def case_num(self, index):
+        case_num = self.__cases[index]
+        return None if case_num == _NO_CASE else case_num
+
+    def valid(self, index):
+        return _VALID_VALUES[self.__valid[index]]
+
+    def timestamp(self, index):
+        return self.__times[index]
+
+    def frame(self, index, key):
+        """
+        Returns the raw bytes of a frame of a stored result, or None if it has none under that key.
+        """
+        length = self.__frame_lengths[key][index]
+        if length == _NO_FRAME:
+            return None
+        offset = self.__offsets[index]
+        for prior in FRAME_KEYS[:FRAME_KEYS.index(key)]:
+            offset += max(self.__frame_lengths[prior][index], 0)
+        return str(self.__arena[offset:offset + length])
+
+    def raw(self, index):
+        """
+        Rebuilds the raw data dict of a stored result, with frames hex encoded as TestResult holds them.
+        """
+        raw = dict(self.__extras.get(index, {}))
+        for key in FRAME_KEYS:
+            frame = self.frame(index, key)
+            if frame is not None:
+                raw[key] = frame.encode('hex')
+        return raw
+
+    def serializable(self):
+        """
+        Returns the stored results in the layout of the "results" entry of TestResultWrapper.serializable(): a dict
+        mapping each case number to the list of its results' serializable() output, in the order they were added.
+        """
+        serializable_results = {}
+        for index in xrange(len(self.__cases)):
+            case_num = self.case_num(index)
+            serializable_results.setdefault(case_num, []).append({
+                "case": case_num,
+                "valid": self.valid(index),
+                "raw": self.raw(index)
+            })
+        return serializable_results
@@ -0,0 +1,210 @@
+"""
+Implements the JsonLinesResultSink class, which streams TestResult records to a file as they complete rather than
+holding them all in memory until the end of the run, and functions to read such files back.
+
+The file is a sequence of JSON objects, one per line. Each run writes a "header" record with the interface, harness and
+generator metadata, a "result" record per TestResult, and a "footer" record with any summary of the run when it ends. A
+file may hold several runs back to back (e.g. one per swept channel, or a resumed run appended to an interrupted one).
+"""
+
+import json
+import threading
+import time
+from Queue import Queue
+
+from .sweep import merge_channel_results
+
+_STOP = object()
+
+
+class JsonLinesResultSink():
+    def __init__(self, fh, queue_size=10000, flush_every=100, case_map=None):
+        """
+        :param fh: File object opened for writing (or appending) text.
+        :param queue_size: Maximum number of records waiting to be written before write() blocks.
+        :param flush_every: The file is flushed after this many records, or sooner if the queue runs dry.
+        :param case_map: Optional function to renumber each case as it is written, such as
+            ShardedGenerator.global_case_num.
+        """
+        self.__fh = fh
+        self.__flush_every = flush_every
+        self.__case_map = case_map
+        self.__channel = None
+        self.__queue = Queue(maxsize=queue_size)
+        self.__count = 0
+        self.__thread = None
+        self.__error = None
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, getattr(self.__fh, 'name', self.__fh))
+
+    @property
+    def count(self):
+        """
+        Number of results written since the last open().
+        """
+        return self.__count
+
+    @property
+    def channel(self):
+        return self.__channel
+
+    def set_channel(self, channel):
+        """
+        Marks the header, results and footer of the runs which follow with a channel, e.g. for each channel of a
+        ChannelSweep, so the runs on each channel can be told apart when the file is read back.
+        :param channel: The channel, or None to stop marking records.
+        """
+        self.__channel = channel
+
+    def open(self, metadata):
+        """
+        Starts the writer thread and writes the header record.
+        :param metadata: dict from TestResultWrapper.metadata().
+        """
+        if self.__thread is not None:
+            raise ValueError("Sink is already open.")
+        self.__count = 0
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__writer_thread)
+        self.__thread.daemon = True
+        self.__thread.start()
+        header = dict(metadata)
+        header["type"] = "header"
+        if self.__channel is not None:
+            header["channel"] = self.__channel
+        self.__queue.put(header)
+
+    def write(self, test_result):
+        """
+        Queues a TestResult to be written. Blocks if the writer has fallen queue_size records behind.
+        Raises the error the writer thread hit, if writing to the file failed.
+        """
+        if self.__error is not None:
+            raise self.__error
+        record = test_result.serializable()
+        record["type"] = "result"
+        if self.__case_map is not None:
+            record["case"] = self.__case_map(record["case"])
+        if self.__channel is not None:
+            record["channel"] = self.__channel
+        self.__count += 1
+        self.__queue.put(record)
+
+    def close(self, end_time=None, summary=None):
+        """
+        Writes the footer record and waits for everything queued to reach the file.
+        Raises the error the writer thread hit, if writing to the file failed.
+        :param summary: Optional dict of run summaries from TestResultWrapper.set_summary(), kept in the footer.
+        """
+        if self.__thread is None:
+            return
+        footer = {
+            "type": "footer",
+            "end_time": end_time if end_time is not None else time.time(),
+            "count": self.__count
+        }
+        if self.__channel is not None:
+            footer["channel"] = self.__channel
+        if summary:
+            footer["summary"] = dict(summary)
+            if self.__case_map is not None and "confidence" in summary:
+                footer["summary"]["confidence"] = dict((self.__case_map(case_num), entry)
+                                                       for case_num, entry in summary["confidence"].iteritems())
+        self.__queue.put(footer)
+        self.__queue.put(_STOP)
+        self.__thread.join()
+        self.__thread = None
+        if self.__error is not None:
+            raise self.__error
+
+    def __writer_thread(self):
+        since_flush = 0
+        while True:
+            record = self.__queue.get()
+            if record is _STOP:
+                break
+            if self.__error is not None:
+                continue  # Keep draining the queue so write() and close() don't block
+            try:
+                self.__fh.write(json.dumps(record))
+                self.__fh.write("\n")
+                since_flush += 1
+                if since_flush >= self.__flush_every or self.__queue.empty():
+                    self.__fh.flush()
+                    since_flush = 0
+            except Exception as e:
+                print("ERROR: Writing results to {} failed: {}".format(getattr(self.__fh, 'name', self.__fh), e))
+                self.__error = e
+        if self.__error is None:
+            try:
+                self.__fh.flush()
+            except Exception as e:
+                self.__error = e
+
+
+def is_json_lines(fh):
+    """
+    Returns True if the file starts with a result stream header record. The file position is restored.
+    """
+    position = fh.tell()
+    try:
+        line = fh.readline()
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return False
+        return isinstance(record, dict) and record.get("type") == "header"
+    finally:
+        fh.seek(position)
+
+
+def read_json_lines(fh):
+    """
+    Yields each record of a result stream in turn, skipping a truncated final line from an interrupted run.
+    """
+    for line in fh:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            print("WARN: Skipping unreadable line in result stream: {}".format(line[:80]))
+
+
+def load_json_lines(fh):
+    """
+    Reads a whole result stream into the layout of TestResultWrapper.serializable() as loaded back from JSON (so
+    keyed by case number as a string). The metadata is that of the first header; the results of every run in the
+    file are combined, as are the footers' summaries.
+    The stream of a channel sweep, whose records are marked with their channel, is read into the layout of
+    merge_channel_results() instead, combining the runs on each channel separately.
+    :return: dict
+    """
+    runs = {}  # channel, or None if the records have none: serializable() layout of its runs
+    for record in read_json_lines(fh):
+        kind = record.pop("type", None)
+        channel = record.pop("channel", None)
+        if kind == "header":
+            if channel not in runs:
+                record.setdefault("end_time", None)
+                record["results"] = {}
+                runs[channel] = record
+            continue
+        loaded = runs.get(channel)
+        if loaded is None:
+            continue
+        if kind == "result":
+            loaded["results"].setdefault(str(record["case"]), []).append(record)
+        elif kind == "footer":
+            loaded["end_time"] = record["end_time"]
+            for key, value in record.get("summary", {}).iteritems():
+                if isinstance(value, dict):
+                    loaded.setdefault(key, {}).update(value)
+                else:
+                    loaded[key] = value
+    if len(runs) == 0:
+        raise ValueError("Result stream has no header record.")
+    if None in runs:
+        if len(runs) > 1:
+            raise ValueError("Result stream mixes runs with and without a channel.")
+        return runs[None]
+    return merge_channel_results([dict((str(channel), loaded) for channel, loaded in runs.iteritems())])
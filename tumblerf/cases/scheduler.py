@@ -0,0 +1,233 @@
+"""
+Implements the FeedbackScheduler class, which sits between a generator and the case running it and steers airtime
+towards inputs that provoke the target.
+
+Each test case's outcome is fed back through record_outcome(). A case the target missed, one found to break it
+(needing a reset), or one answered unusually slowly becomes a seed with energy in proportion to how interesting
+it was. The scheduler then spends extra slots, between the wrapped generator's cases, on mutants of seeds chosen by
+energy. Mutants change one region of the frame (the preamble, or one chunk of the payload), and each region's own
+hit rate scales the energy of its mutants, so regions that keep producing interesting outcomes get proportionally
+more airtime. The generator's own cases are all still sent, so their case numbers and per-case results are kept,
+and describe_extra_case() marks mutants so the case records them apart.
+"""
+
+import random
+
+try:
+    from ..dot15d4.layout import Dot15d4FrameLayout
+    from ..generators.base import BaseTestCaseGenerator
+except ValueError:
+    from dot15d4.layout import Dot15d4FrameLayout
+    from generators.base import BaseTestCaseGenerator
+
+PREAMBLE_REGION = "preamble"
+_INTERESTING_BYTES = [0x00, 0x01, 0x7f, 0x80, 0xff]
+
+
+class FeedbackScheduler(BaseTestCaseGenerator):
+    def __init__(self, generator, exploration=1.0, miss_energy=1.0, reset_energy=4.0, slow_energy=2.0,
+                 slow_factor=3.0, chunk_size=4, max_seeds=256, rng=None):
+        """
+        :param generator: The generator to schedule the output of.
+        :param exploration: Energy given to the wrapped generator's own next case, against which the total seed
+            energy is weighed when choosing whether a mutant takes the next slot. Higher values explore more.
+        :param miss_energy: Energy of a case the target missed.
+        :param reset_energy: Energy of a case found to break the target.
+        :param slow_energy: Energy of a case received more than slow_factor times the typical latency.
+        :param chunk_size: Size in bytes of the payload regions mutated independently.
+        :param max_seeds: Seeds kept at most; the lowest energy seed is dropped to make room.
+        :param rng: Optional random.Random, to make the schedule reproducible.
+        """
+        BaseTestCaseGenerator.__init__(self, includes_phy=generator.includes_phy, includes_mac=generator.includes_mac)
+        self.__generator = generator
+        layout = generator.get_frame_layout()
+        self.__layout = Dot15d4FrameLayout(includes_phy=generator.includes_phy, **layout) \
+            if layout is not None else None
+        self.__exploration = exploration
+        self.__miss_energy = miss_energy
+        self.__reset_energy = reset_energy
+        self.__slow_energy = slow_energy
+        self.__slow_factor = slow_factor
+        self.__chunk_size = chunk_size
+        self.__max_seeds = max_seeds
+        self.__rng = rng if rng is not None else random.Random()
+        self.__seeds = {}  # test case: energy
+        self.__regions = {}  # region: [mutants sent, interesting outcomes]
+        self.__mutants = {}  # mutant test case: (seed, region), for mutants awaiting an outcome
+        self.__typical_latency = None
+
+    def __repr__(self):
+        return "{}({}, {} seeds)".format(self.__class__.__name__, self.__generator, len(self.__seeds))
+
+    @property
+    def name(self):
+        return self.__generator.name
+
+    @property
+    def generator(self):
+        return self.__generator
+
+    @property
+    def seeds(self):
+        """
+        dict of each seed test case to its remaining energy.
+        """
+        return self.__seeds
+
+    def region_stats(self, region):
+        """
+        :return: Tuple of the number of mutants of a region sent and how many of them were interesting.
+        """
+        return tuple(self.__regions.get(region, (0, 0)))
+
+    def get_state(self):
+        return self.__generator.get_state()
+
+    def set_state(self, state):
+        self.__generator.set_state(state)
+
+    def get_frame_layout(self):
+        return self.__generator.get_frame_layout()
+
+    def yield_control_case(self, count=1):
+        return self.__generator.yield_control_case(count)
+
+    def renumber_test_case(self, test_case):
+        """
+        Renumbers through the wrapped generator, keeping track of the renumbered case if it is a mutant.
+        """
+        renumbered = self.__generator.renumber_test_case(test_case)
+        if test_case in self.__mutants:
+            self.__mutants[renumbered] = self.__mutants.pop(test_case)
+        return renumbered
+
+    def describe_extra_case(self, test_case):
+        """
+        Marks mutants with the seed they were made from (hex encoded) and the region changed.
+        """
+        mutant = self.__mutants.get(test_case)
+        if mutant is None:
+            return None
+        seed, region = mutant
+        return {"mutant_of": seed.encode('hex'), "region": region}
+
+    def interest(self, test_result):
+        """
+        Scores how interesting the outcome of a test case was.
+        :param test_result: TestResult of the case, after any breaking case was marked.
+        :return: Energy for the case as a seed, 0 if it wasn't interesting.
+        """
+        energy = 0.0
+        if test_result.raw.get("broke_target", False):
+            energy += self.__reset_energy
+        if test_result.valid is False:
+            energy += self.__miss_energy
+        latency = test_result.latency
+        if latency is not None:
+            if self.__typical_latency is not None and latency > self.__slow_factor * self.__typical_latency:
+                energy += self.__slow_energy
+            else:
+                # Only latencies within the usual range move the baseline, so slow outliers stay noticeable.
+                self.__typical_latency = latency if self.__typical_latency is None else \
+                    0.9 * self.__typical_latency + 0.1 * latency
+        return energy
+
+    def record_outcome(self, test_case, test_result):
+        energy = self.interest(test_result)
+        mutant = self.__mutants.pop(test_case, None)
+        if mutant is not None:
+            region = mutant[1]
+            stats = self.__regions.setdefault(region, [0, 0])
+            stats[0] += 1
+            if energy > 0:
+                stats[1] += 1
+        if energy > 0:
+            self.__seeds[test_case] = self.__seeds.get(test_case, 0.0) + energy
+            if len(self.__seeds) > self.__max_seeds:
+                del self.__seeds[min(self.__seeds, key=self.__seeds.get)]
+
+    def __region_weight(self, region):
+        sent, hits = self.__regions.get(region, (0, 0))
+        return (hits + 1.0) / (sent + 2.0)
+
+    def __regions_of(self, seed):
+        preamble, header, payload = self.__layout.split(seed)
+        regions = []
+        if preamble is not None:
+            regions.append(PREAMBLE_REGION)
+        regions.extend(range(0, len(payload), self.__chunk_size))
+        return regions
+
+    def __mutate(self, seed, region):
+        preamble, header, payload = self.__layout.split(seed)
+        if region == PREAMBLE_REGION:
+            # Nibbles are added or dropped at the start, so any fill just before the SFD is kept.
+            change = self.__rng.choice([-2, -1, 1, 2])
+            if change > 0:
+                preamble = [preamble[0] if len(preamble) > 0 else 0] * change + preamble
+            else:
+                preamble = preamble[min(-change, len(preamble)):]
+        else:
+            payload = bytearray(payload)
+            for i in range(self.__rng.randint(1, min(self.__chunk_size, len(payload) - region))):
+                position = region + self.__rng.randrange(min(self.__chunk_size, len(payload) - region))
+                if self.__rng.random() < 0.5:
+                    payload[position] = self.__rng.choice(_INTERESTING_BYTES)
+                else:
+                    payload[position] = self.__rng.randrange(256)
+            payload = str(payload)
+        return self.__layout.join(preamble, header, payload)
+
+    def next_mutant(self):
+        """
+        Picks a seed by energy and a region of it by hit rate, spending one unit of the seed's energy, and mutates it.
+        :return: The mutant, or None if there are no seeds or the frames can't be mutated.
+        """
+        if self.__layout is None or len(self.__seeds) == 0:
+            return None
+        seed = self.__weighted_choice(self.__seeds.items())
+        self.__seeds[seed] -= 1.0
+        if self.__seeds[seed] <= 0:
+            del self.__seeds[seed]
+        regions = self.__regions_of(seed)
+        if len(regions) == 0:
+            return None
+        region = self.__weighted_choice([(r, self.__region_weight(r)) for r in regions])
+        mutant = self.__mutate(seed, region)
+        if len(self.__mutants) >= self.__max_seeds * 16:
+            self.__mutants.clear()  # Outcomes aren't being recorded, so don't keep waiting for them
+        self.__mutants[mutant] = (seed, region)
+        return mutant
+
+    def __weighted_choice(self, weighted):
+        total = sum(weight for _, weight in weighted)
+        point = self.__rng.random() * total
+        for item, weight in weighted:
+            point -= weight
+            if point < 0:
+                return item
+        return weighted[-1][0]
+
+    def __schedule(self, cases):
+        for tc in cases:
+            # Each slot goes to a mutant with the seeds' share of the total energy, so mutants take that share of the
+            # airtime, until the generator's own case wins a slot.
+            while True:
+                seed_energy = sum(self.__seeds.itervalues()) if self.__layout is not None else 0.0
+                if self.__rng.random() * (seed_energy + self.__exploration) >= seed_energy:
+                    break
+                mutant = self.next_mutant()
+                if mutant is None:
+                    break
+                yield mutant
+            yield tc
+
+    def yield_test_case(self, count, constraints=None):
+        """
+        Yields all of the wrapped generator's cases, with mutants of seeds in extra slots before them, in proportion
+        to the seeds' share of the total energy.
+        """
+        return self.__schedule(self.__generator.yield_test_case(count, constraints=constraints))
+
+    def yield_test_case_from(self, start, count, constraints=None):
+        return self.__schedule(self.__generator.yield_test_case_from(start, count, constraints=constraints))
@@ -0,0 +1,96 @@
+"""
+Implements the SequentialTest class, which runs Wald's sequential probability ratio test on each case's outcomes
+across iterations, so a case can stop being repeated once it is clearly always received or always missed.
+
+Each case is treated as a Bernoulli trial with some probability of the frame being received. The test weighs the
+hypothesis that the probability is at least p1 (the case is received) against it being at most p0 (the case is
+missed), adding each outcome's log likelihood ratio to a running total and deciding once it crosses a threshold
+set by the acceptable error rates. A case near the threshold of reception keeps a total that wanders between the
+thresholds, so only such ambiguous cases keep getting airtime.
+"""
+
+import math
+
+RECEIVED = "received"
+MISSED = "missed"
+
+
+class SequentialTest():
+    def __init__(self, p0=0.1, p1=0.9, alpha=0.05, beta=0.05):
+        """
+        :param p0: Reception probability at or below which a case counts as missed.
+        :param p1: Reception probability at or above which a case counts as received.
+        :param alpha: Acceptable probability of deciding received when the case is really missed.
+        :param beta: Acceptable probability of deciding missed when the case is really received.
+        """
+        if not 0 < p0 < p1 < 1:
+            raise ValueError("Must have 0 < p0 < p1 < 1.")
+        if not (0 < alpha < 1 and 0 < beta < 1):
+            raise ValueError("Error rates must be between 0 and 1.")
+        self.__received_step = math.log(p1 / p0)
+        self.__missed_step = math.log((1 - p1) / (1 - p0))
+        self.__upper = math.log((1 - beta) / alpha)
+        self.__lower = math.log(beta / (1 - alpha))
+        self.__cases = {}  # case number: [log likelihood ratio, trials, decision]
+
+    def __repr__(self):
+        return "{}({} cases, {} decided)".format(self.__class__.__name__, len(self.__cases),
+                                                 sum(1 for entry in self.__cases.itervalues() if entry[2]))
+
+    def reset(self):
+        self.__cases = {}
+
+    def add(self, case_num, received):
+        """
+        Adds an outcome of a case. Outcomes that couldn't be determined (None) are ignored, as are any after the
+        case was decided.
+        :param received: True if the case was received (its TestResult is valid), False if missed.
+        :return: The case's decision, RECEIVED, MISSED or None if still undecided.
+        """
+        if received is None:
+            return self.decision(case_num)
+        entry = self.__cases.setdefault(case_num, [0.0, 0, None])
+        if entry[2] is not None:
+            return entry[2]
+        entry[0] += self.__received_step if received else self.__missed_step
+        entry[1] += 1
+        if entry[0] >= self.__upper:
+            entry[2] = RECEIVED
+        elif entry[0] <= self.__lower:
+            entry[2] = MISSED
+        return entry[2]
+
+    def decision(self, case_num):
+        entry = self.__cases.get(case_num)
+        return entry[2] if entry is not None else None
+
+    def is_decided(self, case_num):
+        return self.decision(case_num) is not None
+
+    def confidence(self, case_num):
+        """
+        Probability that the case is received rather than missed, given its outcomes so far and even prior odds.
+        :return: float, 0.5 for a case with no outcomes.
+        """
+        entry = self.__cases.get(case_num)
+        llr = entry[0] if entry is not None else 0.0
+        return 1.0 / (1.0 + math.exp(-llr))
+
+    def serializable(self):
+        """
+        :return: dict mapping each case number to its "decision", "confidence", "trials" and "llr".
+        """
+        return dict((case_num, {
+            "decision": entry[2],
+            "confidence": self.confidence(case_num),
+            "trials": entry[1],
+            "llr": entry[0]
+        }) for case_num, entry in self.__cases.iteritems())
+
+    def load_serializable(self, data):
+        """
+        Restores the state from the output of serializable(), e.g. to resume from a checkpoint.
+        """
+        self.__cases = {}
+        for case_num, entry in data.iteritems():
+            self.__cases[int(case_num)] = [entry["llr"], entry["trials"], entry["decision"]]
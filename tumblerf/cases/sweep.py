@@ -0,0 +1,112 @@
+"""
+Implements the ChannelSweep class, which runs a case on each of a list of channels with one radio pair, and helpers
+to spread a sweep across several pairs and combine the per-channel results into one report.
+"""
+
+DOT15D4_CHANNELS = range(11, 27)
+
+
+class ChannelSweep():
+    def __init__(self, case, channels=DOT15D4_CHANNELS, checkpoint=None, resume=False):
+        """
+        :param case: A subclass of BaseCase, properly setup and ready for use.
+        :param channels: List of channels to run the case on, in order.
+        :param checkpoint: Optional Checkpoint, from which one is derived for each channel and given to the case.
+        :param resume: If True, each channel resumes from its checkpoint.
+        """
+        if len(channels) == 0:
+            raise ValueError("Must provide at least one channel to sweep.")
+        self.__case = case
+        self.__channels = list(channels)
+        self.__checkpoint = checkpoint
+        self.__resume = resume
+
+    def __repr__(self):
+        return "{}({}, channels={})".format(self.__class__.__name__, self.__case, self.__channels)
+
+    @property
+    def case(self):
+        return self.__case
+
+    @property
+    def channels(self):
+        return self.__channels
+
+    def retune(self, channel):
+        """
+        Moves both the interface and the harness to the given channel.
+        :return: bool
+        """
+        if self.__case.interface.set_channel(channel) != channel:
+            print("ERROR: Unable to tune interface {} to channel {}.".format(self.__case.interface, channel))
+            return False
+        if not self.__case.harness.set_channel(channel):
+            print("ERROR: Unable to tune harness {} to channel {}.".format(self.__case.harness, channel))
+            return False
+        return True
+
+    def run_test(self, iterations=1):
+        """
+        Runs all the iterations of the case on one channel before moving to the next, so the radios are only retuned
+        once per channel. If the case streams its results, each record is marked with the channel it was run on.
+        :return: dict mapping each channel to the serializable() output of the case's results on it.
+        """
+        results = {}
+        for channel in self.__channels:
+            print("INFO: Sweeping channel {}.".format(channel))
+            if not self.retune(channel):
+                continue
+            if self.__checkpoint is not None:
+                self.__case.set_checkpoint(self.__checkpoint.derive("ch{}".format(channel)), self.__resume)
+            if self.__case.result_sink is not None:
+                self.__case.result_sink.set_channel(channel)
+            results[channel] = self.__case.run_test(iterations).serializable()
+        return results
+
+
+def assign_channels(channels, pair_count):
+    """
+    Splits the channels into contiguous groups, one per radio pair, as evenly as possible.
+    With as many pairs as channels, each pair stays on a single channel and never retunes.
+    :return: List of lists of channels; pairs beyond the number of channels get none.
+    """
+    if pair_count < 1:
+        raise ValueError("Must have at least one radio pair.")
+    channels = list(channels)
+    groups = []
+    start = 0
+    for i in range(pair_count):
+        size = len(channels) // pair_count + (1 if i < len(channels) % pair_count else 0)
+        groups.append(channels[start:start + size])
+        start += size
+    return groups
+
+
+def merge_channel_results(channel_results_list):
+    """
+    Combines the output of ChannelSweep.run_test() from one or more pairs into a single report.
+    :param channel_results_list: List of dicts mapping channel to TestResultWrapper.serializable() output.
+    :return: dict with overall "start_time" and "end_time", and the per-channel results under "channels".
+    """
+    channels = {}
+    for channel_results in channel_results_list:
+        channels.update(channel_results)
+    start_times = [res["start_time"] for res in channels.itervalues() if res.get("start_time") is not None]
+    end_times = [res["end_time"] for res in channels.itervalues() if res.get("end_time") is not None]
+    return {
+        "start_time": min(start_times) if start_times else None,
+        "end_time": max(end_times) if end_times else None,
+        "channels": channels
+    }
+
+
+def split_channels(serialized):
+    """
+    Splits results in the layout of merge_channel_results() back into the results of each channel. Results of a
+    single run, in the layout of TestResultWrapper.serializable(), are returned as they are with no channel.
+    :return: List of (channel or None, TestResultWrapper.serializable() output) tuples, ordered by channel.
+    """
+    if "channels" not in serialized:
+        return [(None, serialized)]
+    return sorted(((int(channel), results) for channel, results in serialized["channels"].iteritems()),
+                  key=lambda (channel, results): channel)
@@ -0,0 +1,94 @@
+"""
+Helpers shared by the tests of the cases: a mock target, with the interface, harness and generator to drive it, and
+builders for cases and results.
+"""
+
+from ..alternator import AlternatorCase
+from ..result import TestResult as Result
+from ...generators.base import BaseTestCaseGenerator
+from ...harnesses.base import BaseHarness
+from ...interfaces.base import BaseInterface
+
+
+def make_result(case_num=0, valid=True, latency=None, **raw):
+    """
+    Builds a TestResult for the tests, with the given raw data (e.g. test_case="a0b1" or broke_target=True).
+    """
+    tr = Result(case_num)
+    tr.set_valid(valid)
+    tr.set_raw_data(raw)
+    if latency is not None:
+        tr.set_latency(latency)
+    return tr
+
+
+class MockTarget(object):
+    """
+    A target which breaks when it receives a frame in break_on, and stays broken until reset.
+    """
+    def __init__(self, break_on):
+        self.break_on = break_on
+        self.broken = False
+        self.resets = 0
+
+    def receive(self, frame):
+        if frame in self.break_on:
+            self.broken = True
+
+
+class MockInterface(BaseInterface):
+    def __init__(self, target):
+        BaseInterface.__init__(self, log_name="Mock Interface")
+        self.target = target
+        self.sent = []
+
+    def tx(self, packet, channel=None, count=1, delay=0):
+        self.sent.append(packet)
+        self.target.receive(packet)
+        return True
+
+
+class MockHarness(BaseHarness):
+    def __init__(self, target):
+        BaseHarness.__init__(self)
+        self.target = target
+
+    def do_reset(self):
+        self.target.broken = False
+        self.target.resets += 1
+        return True
+
+    def is_valid(self):
+        return not self.target.broken
+
+
+class MockGenerator(BaseTestCaseGenerator):
+    def __init__(self, cases):
+        BaseTestCaseGenerator.__init__(self)
+        self.cases = cases
+
+    def yield_control_case(self, count=1):
+        for i in range(count):
+            yield "control"
+
+    def yield_test_case(self, count, constraints=None):
+        for i in range(count):
+            for case in self.cases:
+                yield case
+
+
+class MockAlternatorCase(AlternatorCase):
+    def throw_test_case(self, tc_str, tr):
+        tr.add_raw_data("test_case", tc_str.encode('hex'))
+        self.interface.tx(tc_str)
+        return True
+
+
+def make_case(cases, break_on=()):
+    """
+    Builds a MockAlternatorCase throwing the given test cases at a MockTarget which breaks on those in break_on.
+    :return: Tuple of the case and the target.
+    """
+    target = MockTarget(break_on)
+    case = MockAlternatorCase(MockInterface(target), MockHarness(target), MockGenerator(cases))
+    return case, target
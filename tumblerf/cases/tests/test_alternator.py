@@ -0,0 +1,79 @@
+import pytest
+
+from .helpers import make_case
+
+
+class TestAlternatorCase(object):
+
+    @staticmethod
+    def broken_cases(results):
+        broken = []
+        for case_num, trs in results.serializable()["results"].items():
+            for tr in trs:
+                if tr["raw"].get("broke_target"):
+                    broken.append(case_num)
+        return broken
+
+    def test_control_every_case(self):
+        cases = ["case{}".format(i) for i in range(4)]
+        case, target = make_case(cases)
+        results = case.run_test(1)
+        assert case.interface.sent.count("control") == 5  # One before each test case, and one after the last
+        assert len(results.serializable()["results"]) == 4
+
+    def test_control_interval(self):
+        cases = ["case{}".format(i) for i in range(8)]
+        case, target = make_case(cases)
+        case.set_control_interval(4)
+        case.run_test(1)
+        assert case.interface.sent.count("control") == 3
+
+    def test_adaptive_interval(self):
+        cases = ["case{}".format(i) for i in range(15)]
+        case, target = make_case(cases)
+        case.set_control_interval(1, adaptive=True, max_interval=8)
+        case.run_test(1)
+        # Controls before cases 0, 1, 3, 7 and after the last case as the interval grows 1, 2, 4, 8
+        assert case.interface.sent.count("control") == 5
+        assert case.control_interval == 8
+
+    def test_bisect_finds_culprit(self):
+        cases = ["case{}".format(i) for i in range(16)]
+        case, target = make_case(cases, break_on=("case11",))
+        case.set_control_interval(16)
+        results = case.run_test(1)
+        assert self.broken_cases(results) == [11]
+        assert len(results.serializable()["results"]) == 16
+        assert target.resets > 0
+
+    def test_bisect_not_reproducible(self):
+        cases = ["case{}".format(i) for i in range(8)]
+        case, target = make_case(cases, break_on=("case5",))
+        case.set_control_interval(8)
+        # The target only breaks the first time case5 is thrown, so replays never reproduce it
+        receive = target.receive
+        target.receive = lambda frame: receive(frame) if case.interface.sent.count(frame) == 1 else None
+        results = case.run_test(1)
+        assert self.broken_cases(results) == []
+        assert len(results.serializable()["results"]) == 8
+
+    def test_culprit_each_case(self):
+        cases = ["case{}".format(i) for i in range(5)]
+        case, target = make_case(cases, break_on=("case2",))
+        results = case.run_test(1)
+        assert self.broken_cases(results) == [2]
+
+    def test_invalid_interval(self):
+        case, target = make_case([])
+        with pytest.raises(ValueError):
+            case.set_control_interval(0)
+
+    def test_records_outcomes(self):
+        cases = ["case{}".format(i) for i in range(6)]
+        case, target = make_case(cases, break_on=["case4"])
+        outcomes = []
+        case.generator.record_outcome = lambda tc, tr: outcomes.append((tc, tr.raw.get("broke_target", False)))
+        case.set_control_interval(3)
+        case.run_test(1)
+        assert [tc for tc, _ in outcomes] == cases
+        assert [tc for tc, broke in outcomes if broke] == ["case4"]
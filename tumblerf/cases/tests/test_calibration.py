@@ -0,0 +1,44 @@
+import pytest
+
+from ..calibration import LatencyCalibrator
+
+
+class TestLatencyCalibrator(object):
+
+    @pytest.fixture
+    def calibrator(self):
+        return LatencyCalibrator(percentile=90, margin=2.0, window=10, min_deadline=0.001, max_deadline=1.0,
+                                 update_every=5)
+
+    def test_default_deadline(self, calibrator):
+        assert calibrator.percentile() is None
+        assert calibrator.deadline() == 1.0
+
+    def test_percentile(self, calibrator):
+        for i in range(1, 11):
+            calibrator.add_sample(i / 100.0)
+        assert calibrator.percentile(50) == 0.05
+        assert calibrator.percentile() == 0.09
+        assert calibrator.deadline() == pytest.approx(0.18)
+
+    def test_bounds(self, calibrator):
+        for i in range(5):
+            calibrator.add_sample(0.0001)
+        assert calibrator.deadline() == 0.001
+        for i in range(10):
+            calibrator.add_sample(5.0)
+        assert calibrator.deadline() == 1.0
+
+    def test_window_tracks_drift(self, calibrator):
+        for i in range(10):
+            calibrator.add_sample(0.2)
+        assert calibrator.deadline() == pytest.approx(0.4)
+        for i in range(10):
+            calibrator.add_sample(0.01)
+        assert calibrator.deadline() == pytest.approx(0.02)
+
+    def test_invalid_args(self):
+        with pytest.raises(ValueError):
+            LatencyCalibrator(percentile=0)
+        with pytest.raises(ValueError):
+            LatencyCalibrator(min_deadline=1.0, max_deadline=0.5)
@@ -0,0 +1,115 @@
+import os
+import pytest
+
+from ..checkpoint import Checkpoint
+from .helpers import MockAlternatorCase, MockGenerator, MockHarness, MockInterface, MockTarget
+
+
+class CrashingAlternatorCase(MockAlternatorCase):
+    """
+    Raises when throwing the given test case, as if the run was interrupted.
+    """
+    crash_on = None
+
+    def throw_test_case(self, tc_str, tr):
+        if tc_str == self.crash_on:
+            raise KeyboardInterrupt
+        return MockAlternatorCase.throw_test_case(self, tc_str, tr)
+
+
+class NumberingGenerator(MockGenerator):
+    """
+    Numbers its test cases and control cases from a shared counter, like the sequence numbers of the dot15d4
+    generators.
+    """
+    def __init__(self, cases):
+        MockGenerator.__init__(self, cases)
+        self.num = 0
+
+    def get_state(self):
+        return {'num': self.num}
+
+    def set_state(self, state):
+        self.num = state['num']
+
+    def yield_control_case(self, count=1):
+        for i in range(count):
+            self.num += 1
+            yield "control"
+
+    def yield_test_case(self, count, constraints=None):
+        for tc in MockGenerator.yield_test_case(self, count, constraints):
+            self.num += 1
+            yield "{}-{}".format(tc, self.num)
+
+
+class TestCheckpoint(object):
+
+    @pytest.fixture
+    def checkpoint(self, tmpdir):
+        return Checkpoint(str(tmpdir.join("campaign.ckpt")), interval=0)
+
+    def test_missing(self, checkpoint):
+        assert checkpoint.load() is None
+
+    def test_save_load(self, checkpoint):
+        checkpoint.save(2, 7, {'seqnum': 9}, {"results": {}}, complete=False)
+        saved = checkpoint.load()
+        assert saved["iteration"] == 2
+        assert saved["case"] == 7
+        assert saved["generator_state"] == {'seqnum': 9}
+        assert saved["complete"] is False
+        assert not os.path.exists(checkpoint.path + ".tmp")
+
+    def test_derive(self, checkpoint):
+        derived = checkpoint.derive("ch11")
+        assert derived.path == checkpoint.path + ".ch11"
+
+    def test_resume(self, checkpoint):
+        cases = ["case{}".format(i) for i in range(6)]
+        target = MockTarget(())
+        interface = MockInterface(target)
+        case = CrashingAlternatorCase(interface, MockHarness(target), MockGenerator(cases))
+        case.crash_on = "case4"
+        case.set_checkpoint(checkpoint)
+        with pytest.raises(KeyboardInterrupt):
+            case.run_test(1)
+        assert checkpoint.load()["case"] == 4
+
+        interface.sent = []
+        case.crash_on = None
+        case.set_checkpoint(checkpoint, resume=True)
+        results = case.run_test(1).serializable()
+        # Only the cases which weren't recorded before the interruption are sent again:
+        assert [tc for tc in interface.sent if tc != "control"] == ["case4", "case5"]
+        assert sorted(results["results"].keys()) == range(6)
+        assert checkpoint.load()["complete"] is True
+
+        # Resuming a completed run sends nothing:
+        interface.sent = []
+        results = case.run_test(1).serializable()
+        assert interface.sent == []
+        assert len(results["results"]) == 6
+
+    def test_resume_numbering(self, checkpoint):
+        cases = ["case{}".format(i) for i in range(6)]
+        target = MockTarget(())
+        interface = MockInterface(target)
+        case = MockAlternatorCase(interface, MockHarness(target), NumberingGenerator(cases))
+        case.run_test(1)
+        uninterrupted = [tc for tc in interface.sent if tc != "control"]
+
+        interface = MockInterface(target)
+        case = CrashingAlternatorCase(interface, MockHarness(target), NumberingGenerator(cases))
+        case.crash_on = uninterrupted[4]
+        case.set_checkpoint(checkpoint)
+        with pytest.raises(KeyboardInterrupt):
+            case.run_test(1)
+
+        interface.sent = []
+        case.crash_on = None
+        case.generator.num = 0
+        case.set_checkpoint(checkpoint, resume=True)
+        case.run_test(1)
+        # The interrupted case is generated again with the same number:
+        assert [tc for tc in interface.sent if tc != "control"] == uninterrupted[4:]
@@ -0,0 +1,63 @@
+import threading
+
+from ..minimizer import TestCaseMinimizer as Minimizer
+from ...dot15d4.layout import Dot15d4FrameLayout
+from .helpers import MockTarget, MockInterface, MockHarness, MockGenerator, MockAlternatorCase
+
+HEADER = "\x41\x88\x01\x34\x12\xff\xff\x00\x00"
+
+
+class TestCaseMinimization(object):
+
+    def test_payload(self):
+        layout = Dot15d4FrameLayout(header_length=len(HEADER))
+        breaks = lambda frame: "\x42" in layout.split(frame)[2]
+        minimizer = Minimizer([breaks], layout)
+        frame = layout.join(None, HEADER, "\x10\x20\x42\x30\x40\x50\x60")
+        assert minimizer.minimize(frame) == layout.join(None, HEADER, "\x42")
+
+    def test_zeroing(self):
+        layout = Dot15d4FrameLayout(header_length=len(HEADER))
+        # Needs the length to stay at 4 bytes with the last one set, so only zeroing helps
+        breaks = lambda frame: len(frame) == len(HEADER) + 6 and frame[-3] != "\x00"
+        minimizer = Minimizer([breaks], layout)
+        frame = layout.join(None, HEADER, "\x11\x22\x33\x44")
+        assert minimizer.minimize(frame) == layout.join(None, HEADER, "\x00\x00\x00\x44")
+
+    def test_preamble(self):
+        layout = Dot15d4FrameLayout(includes_phy=True, header_length=len(HEADER))
+        breaks = lambda frame: len(layout.split(frame)[0]) >= 3
+        minimizer = Minimizer([breaks], layout)
+        minimized = minimizer.minimize(layout.join([0] * 10, HEADER, ""))
+        assert layout.split(minimized)[0] == [0] * 3
+
+    def test_not_reproducible(self):
+        layout = Dot15d4FrameLayout(header_length=len(HEADER))
+        minimizer = Minimizer([lambda frame: False], layout)
+        assert minimizer.minimize(layout.join(None, HEADER, "\x01")) is None
+
+    def test_cache_and_parallel(self):
+        layout = Dot15d4FrameLayout(header_length=len(HEADER))
+        sent = []
+        lock = threading.Lock()
+
+        def breaks(frame):
+            with lock:
+                sent.append(frame)
+            return "\x42" in layout.split(frame)[2]
+
+        cache = {}
+        minimizer = Minimizer([breaks, breaks, breaks], layout, cache=cache)
+        frame = layout.join(None, HEADER, "\x10\x42\x20\x30\x40")
+        minimized = minimizer.minimize(frame)
+        assert minimized == layout.join(None, HEADER, "\x42")
+        assert len(sent) == len(set(sent)) == minimizer.sent_count
+        again = Minimizer([breaks], layout, cache=cache)
+        assert again.minimize(frame) == minimized
+        assert again.sent_count == 0
+
+    def test_replay_oracle(self):
+        target = MockTarget(["bad"])
+        case = MockAlternatorCase(MockInterface(target), MockHarness(target), MockGenerator([]))
+        assert case.replay_breaks_target(["ok", "bad"])
+        assert not case.replay_breaks_target(["ok"])
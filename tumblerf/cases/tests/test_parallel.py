@@ -0,0 +1,59 @@
+import os
+
+from ..parallel import ParallelCampaign
+
+
+def square_worker(index, spec, claim):
+    if not claim(["device{}".format(index)]):
+        return None
+    return (os.getpid(), spec * spec)
+
+
+def conflicting_worker(index, spec, claim):
+    if not claim(["shared-device"]):
+        return None
+    return spec
+
+
+def failing_worker(index, spec, claim):
+    claim([])
+    if spec == 1:
+        raise RuntimeError("Radio fell off the bus")
+    return spec
+
+
+def dying_worker(index, spec, claim):
+    if spec == "before_claim":
+        os._exit(3)
+    claim([])
+    if spec == "after_claim":
+        os._exit(3)
+    return spec
+
+
+class TestParallelCampaign(object):
+
+    def test_results_in_order(self):
+        results = ParallelCampaign(square_worker, [1, 2, 3]).run()
+        assert [res[1] for res in results] == [1, 4, 9]
+        # Each worker should have run in its own process:
+        assert len(set(res[0] for res in results)) == 3
+        assert os.getpid() not in [res[0] for res in results]
+
+    def test_conflict_aborts(self):
+        results = ParallelCampaign(conflicting_worker, [1, 2]).run()
+        assert results == [None, None]
+
+    def test_failed_worker(self):
+        results = ParallelCampaign(failing_worker, [0, 1, 2]).run()
+        assert results == [0, None, 2]
+
+    def test_lost_worker(self):
+        # Workers killed without reporting back are given up on, rather than waited for forever:
+        specs = ["ok", "before_claim", "after_claim"]
+        results = ParallelCampaign(dying_worker, specs, poll_interval=0.05).run()
+        assert results == ["ok", None, None]
+
+    def test_find_conflicts(self):
+        conflicts = ParallelCampaign.find_conflicts({0: ["a", "b"], 1: ["c"], 2: ["b"]})
+        assert conflicts == {"b": [0, 2]}
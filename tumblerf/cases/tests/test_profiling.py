@@ -0,0 +1,117 @@
+import cProfile
+import pstats
+import threading
+import time
+
+from ..profiling import ComponentProfiler, SamplingProfiler, profile_call
+from .helpers import make_case
+
+
+def busy(seconds):
+    end = time.clock() + seconds
+    while time.clock() < end:
+        pass
+
+
+class CountingProfiler(object):
+    def __init__(self):
+        self.enabled = False
+        self.enables = 0
+
+    def enable(self):
+        assert not self.enabled
+        self.enabled = True
+        self.enables += 1
+
+    def disable(self):
+        assert self.enabled
+        self.enabled = False
+
+
+class TestComponentProfiler(object):
+
+    def test_enabled_only_inside_component(self):
+        case, target = make_case(["case0", "case1"])
+        profiler = CountingProfiler()
+        seen = []
+        original_tx = case.interface.tx
+
+        def checking_tx(packet, *args, **kwargs):
+            seen.append(profiler.enabled)
+            return original_tx(packet, *args, **kwargs)
+
+        case.interface.tx = checking_tx
+        profile_call(lambda: case.run_test(1), profiler, [case.generator])
+        assert not profiler.enabled
+        assert profiler.enables > 0
+        assert seen and not any(seen)
+
+    def test_generator_steps_profiled(self):
+        case, target = make_case(["case0", "case1", "case2"])
+        profiler = CountingProfiler()
+        component_profiler = ComponentProfiler(profiler)
+        component_profiler.wrap(case.generator)
+        items = []
+        for tc in case.generator.yield_test_case(1):
+            items.append(tc)
+            assert not profiler.enabled
+        assert items == ["case0", "case1", "case2"]
+        assert profiler.enables == 5  # The call, then one step per case and one to finish
+        component_profiler.unwrap_all()
+        assert "yield_test_case" not in case.generator.__dict__
+
+    def test_other_threads_unprofiled(self):
+        case, target = make_case(["case0", "case1"])
+        profiler = CountingProfiler()
+        component_profiler = ComponentProfiler(profiler)
+        component_profiler.wrap(case.generator)
+        items = []
+        worker = threading.Thread(target=lambda: items.extend(case.generator.yield_test_case(1)))
+        worker.start()
+        worker.join()
+        assert items == ["case0", "case1"]
+        assert profiler.enables == 0
+        # Calls on the profiling thread are still profiled, and the depth other threads left is unaffected:
+        case.generator.get_test_cases(1)
+        assert profiler.enables > 0
+        assert not profiler.enabled
+        component_profiler.unwrap_all()
+
+    def test_sampling_from_other_thread(self):
+        case, target = make_case(["case0", "case1"])
+        profiler = SamplingProfiler(interval=0.001)
+        component_profiler = ComponentProfiler(profiler)
+        component_profiler.wrap(case.generator)
+        errors = []
+
+        def run():
+            try:
+                list(case.generator.yield_test_case(1))
+            except Exception as e:
+                errors.append(e)
+        worker = threading.Thread(target=run)
+        worker.start()
+        worker.join()
+        component_profiler.unwrap_all()
+        assert errors == []
+
+    def test_cprofile_component(self):
+        case, target = make_case(["case0", "case1"])
+        profiler = cProfile.Profile()
+        profile_call(lambda: case.run_test(1), profiler, [case.harness])
+        functions = [func for _, _, func in pstats.Stats(profiler).stats]
+        assert "is_valid" in functions
+        assert "tx" not in functions
+
+
+class TestSamplingProfiler(object):
+
+    def test_samples_stacks(self, tmpdir):
+        profiler = SamplingProfiler(interval=0.001)
+        profile_call(lambda: busy(0.1), profiler)
+        assert profiler.sample_count > 10
+        assert any(stack[-1].endswith(":busy") for stack in profiler.stacks)
+        path = str(tmpdir.join("out.folded"))
+        profiler.dump_stats(path)
+        lines = open(path).read().splitlines()
+        assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profiler.sample_count
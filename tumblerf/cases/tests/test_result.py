@@ -0,0 +1,35 @@
+from ..result import TestResult as Result, merge_serializable, remap_case_numbers
+
+
+def make_serialized(interface_name, start, end, results):
+    return {
+        "interface": {"name": interface_name},
+        "harness": {"name": "MockHarness"},
+        "generator": {"name": "MockGenerator", "includes_phy": False, "includes_mac": True},
+        "start_time": start,
+        "end_time": end,
+        "results": results
+    }
+
+
+class TestResultHelpers(object):
+
+    def test_remap(self):
+        tr = Result(1)
+        tr.set_valid(True)
+        serialized = make_serialized("a", 0, 1, {1: [tr.serializable()]})
+        remap_case_numbers(serialized, lambda n: n * 2 + 1)
+        assert serialized["results"].keys() == [3]
+        assert serialized["results"][3][0]["case"] == 3
+
+    def test_merge(self):
+        first = make_serialized("a", 10, 20, {0: [{"case": 0, "valid": True, "raw": {}}]})
+        second = make_serialized("b", 5, 30, {0: [{"case": 0, "valid": False, "raw": {}}],
+                                              1: [{"case": 1, "valid": True, "raw": {}}]})
+        merged = merge_serializable([first, second])
+        assert merged["interface"] == {"name": "a"}
+        assert merged["interfaces"] == [{"name": "a"}, {"name": "b"}]
+        assert merged["start_time"] == 5
+        assert merged["end_time"] == 30
+        assert len(merged["results"][0]) == 2
+        assert len(merged["results"][1]) == 1
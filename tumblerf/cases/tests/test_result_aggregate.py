@@ -0,0 +1,63 @@
+import json
+
+from ..result_aggregate import CaseCounts, count_file
+from ..result_columnar import write_columnar
+from .test_result_columnar import make_serialized
+
+EXPECTED_ROWS = [(0, 1, 1, "a0b1"), (1, 0, 1, "ff"), (2, 1, 0, None)]
+
+
+class TestCaseCounts(object):
+
+    def test_add(self):
+        counts = CaseCounts()
+        counts.add(1, True)
+        counts.add(1, False, "aa")
+        counts.add(0, None, "bb", count=3)
+        counts.add(1, True, "cc")
+        assert counts.rows() == [(0, 0, 3, "bb"), (1, 2, 1, "aa")]
+
+    def test_merge(self):
+        first = CaseCounts()
+        first.add(0, True, "aa")
+        second = CaseCounts()
+        second.add(0, False, "bb")
+        second.add(5, True, "cc", count=2)
+        assert first.merge(second) is first
+        assert first.rows() == [(0, 1, 1, "aa"), (5, 2, 0, "cc")]
+        assert len(first) == 2
+
+
+class TestCountFile(object):
+
+    def test_json(self, tmpdir):
+        path = str(tmpdir.join("results.json"))
+        with open(path, 'w') as fh:
+            json.dump(make_serialized(), fh)
+        filename, [(channel, generator_name, counts)] = count_file(path)
+        assert filename == path
+        assert channel is None
+        assert generator_name == "MockGenerator"
+        assert counts.rows() == EXPECTED_ROWS
+
+    def test_json_lines(self, tmpdir):
+        path = str(tmpdir.join("results.jsonl"))
+        serialized = make_serialized()
+        with open(path, 'w') as fh:
+            header = dict((k, v) for k, v in serialized.iteritems() if k != "results")
+            header["type"] = "header"
+            fh.write(json.dumps(header) + "\n")
+            for case_num in sorted(serialized["results"]):
+                for tr in serialized["results"][case_num]:
+                    fh.write(json.dumps(dict(tr, type="result")) + "\n")
+        _, [(_, generator_name, counts)] = count_file(path)
+        assert generator_name == "MockGenerator"
+        assert counts.rows() == EXPECTED_ROWS
+
+    def test_columnar(self, tmpdir):
+        path = str(tmpdir.join("results.trfc"))
+        with open(path, 'wb') as fh:
+            write_columnar(fh, make_serialized())
+        _, [(_, generator_name, counts)] = count_file(path)
+        assert generator_name == "MockGenerator"
+        assert counts.rows() == EXPECTED_ROWS
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from .. import result_columnar
+from ..result_columnar import ColumnarResults, convert_to_columnar, is_columnar, write_columnar
+
+
+def make_serialized():
+    return {
+        "interface": {"name": "a"},
+        "harness": {"name": "MockHarness"},
+        "generator": {"name": "MockGenerator", "includes_phy": False, "includes_mac": True},
+        "start_time": 1.0,
+        "end_time": 2.0,
+        "results": {
+            "0": [{"case": 0, "valid": True, "raw": {"control_case": "0102", "test_case": "a0b1"}},
+                  {"case": 0, "valid": False, "raw": {"test_case": "a0b1", "broke_target": True}}],
+            "1": [{"case": 1, "valid": None, "raw": {"test_case": "ff"}}],
+            "2": [{"case": 2, "valid": True, "raw": {}}]
+        }
+    }
+
+
+@pytest.fixture
+def columnar_path(tmpdir):
+    path = str(tmpdir.join("results.trfc"))
+    with open(path, 'wb') as fh:
+        assert write_columnar(fh, make_serialized()) == 4
+    return path
+
+
+class TestColumnarResults(object):
+
+    def test_round_trip(self, columnar_path):
+        results = ColumnarResults(columnar_path)
+        assert len(results) == 4
+        assert results.metadata["generator"]["name"] == "MockGenerator"
+        rebuilt = {}
+        for index in range(len(results)):
+            tr = results.result(index)
+            rebuilt.setdefault(str(tr["case"]), []).append(tr)
+        assert rebuilt == make_serialized()["results"]
+        results.close()
+
+    def test_case_counts(self, columnar_path):
+        results = ColumnarResults(columnar_path)
+        counts = results.case_counts()
+        assert sorted(counts.keys()) == [0, 1, 2]
+        assert counts[0][:2] == (1, 1)
+        assert counts[1][:2] == (0, 1)
+        assert counts[2][:2] == (1, 0)
+        assert results.frame(counts[0][2], "test_case") == "\xa0\xb1"
+        results.close()
+
+    def test_case_counts_without_numpy(self, columnar_path, monkeypatch):
+        monkeypatch.setattr(result_columnar, "numpy", None)
+        results = ColumnarResults(columnar_path)
+        counts = results.case_counts()
+        assert counts[0][:2] == (1, 1)
+        assert results.frame(counts[1][2], "test_case") == "\xff"
+        results.close()
+
+    def test_convert(self, tmpdir):
+        json_path = str(tmpdir.join("results.json"))
+        with open(json_path, 'w') as fh:
+            json.dump(make_serialized(), fh)
+        assert convert_to_columnar(json_path, json_path + ".trfc") == [(json_path + ".trfc", 4)]
+        with open(json_path + ".trfc", 'rb') as fh:
+            assert is_columnar(fh)
+        with open(json_path, 'rb') as fh:
+            assert not is_columnar(fh)
+
+    def test_not_columnar(self, tmpdir):
+        path = str(tmpdir.join("results.json"))
+        with open(path, 'w') as fh:
+            json.dump(make_serialized(), fh)
+        with pytest.raises(ValueError):
+            ColumnarResults(path)
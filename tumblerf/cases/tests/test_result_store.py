@@ -0,0 +1,54 @@
+import sys
+
+from ..result_store import CompactResultStore
+from .helpers import make_result
+
+
+class TestCompactResultStore(object):
+
+    def test_round_trip(self):
+        store = CompactResultStore()
+        results = [
+            make_result(0, True, control_case="0102", test_case="a0b1c2"),
+            make_result(0, False, test_case=""),
+            make_result(1, None, test_case="ff", broke_target=True),
+            make_result(None, True)
+        ]
+        for tr in results:
+            store.add(tr)
+        assert len(store) == 4
+        serialized = store.serializable()
+        assert serialized[0] == [results[0].serializable(), results[1].serializable()]
+        assert serialized[1] == [results[2].serializable()]
+        assert serialized[None] == [results[3].serializable()]
+
+    def test_frames(self):
+        store = CompactResultStore()
+        index = store.add(make_result(3, True, test_case="deadbeef"), timestamp=12.5)
+        assert store.case_num(index) == 3
+        assert store.valid(index) is True
+        assert store.timestamp(index) == 12.5
+        assert store.frame(index, "test_case") == "\xde\xad\xbe\xef"
+        assert store.frame(index, "control_case") is None
+
+    def test_not_hex(self):
+        store = CompactResultStore()
+        store.add(make_result(0, True, test_case="not hex"))
+        assert store.raw(0) == {"test_case": "not hex"}
+
+    def test_copies_result(self):
+        store = CompactResultStore()
+        tr = make_result(0, True, test_case="00")
+        store.add(tr)
+        tr.add_raw_data("broke_target", True)
+        assert store.raw(0) == {"test_case": "00"}
+
+    def test_compact(self):
+        store = CompactResultStore()
+        objects = 0
+        for i in range(1000):
+            tr = make_result(i, True, control_case="00" * 20, test_case="11" * 20)
+            store.add(tr)
+            objects += sys.getsizeof(tr) + sys.getsizeof(tr.__dict__) + sys.getsizeof(tr.raw) + \
+                sum(sys.getsizeof(v) for v in tr.raw.itervalues())
+        assert store.nbytes * 10 < objects
@@ -0,0 +1,101 @@
+import json
+from StringIO import StringIO
+
+import pytest
+
+from ..result import TestResultWrapper as ResultWrapper
+from ..result_stream import JsonLinesResultSink, is_json_lines, load_json_lines
+from .helpers import MockTarget, MockInterface, MockHarness, MockGenerator, make_result
+
+
+class FailingFile(object):
+    name = "failing"
+
+    def write(self, data):
+        raise IOError("No space left on device")
+
+    def flush(self):
+        pass
+
+
+class TestJsonLinesResultSink:
+    def make_wrapper(self):
+        target = MockTarget([])
+        return ResultWrapper(MockInterface(target), MockHarness(target), MockGenerator([]))
+
+    def test_header_results_footer(self):
+        fh = StringIO()
+        wrapper = self.make_wrapper()
+        wrapper.set_sink(JsonLinesResultSink(fh))
+        for i in range(3):
+            wrapper.add_test_result(make_result(i, (i != 1)))
+        wrapper.close()
+        records = [json.loads(line) for line in fh.getvalue().splitlines()]
+        assert [r["type"] for r in records] == ["header", "result", "result", "result", "footer"]
+        assert [r["case"] for r in records[1:4]] == [0, 1, 2]
+        assert records[-1]["count"] == 3
+
+    def test_does_not_keep_results(self):
+        wrapper = self.make_wrapper()
+        wrapper.set_sink(JsonLinesResultSink(StringIO()))
+        wrapper.add_test_result(make_result(0, True))
+        wrapper.close()
+        assert wrapper.serializable()["results"] == {}
+
+    def test_write_error(self):
+        sink = JsonLinesResultSink(FailingFile(), queue_size=2)
+        sink.open({})
+        # The writer thread keeps draining the queue after the error, so this raises rather than blocking
+        with pytest.raises(IOError):
+            for i in range(10):
+                sink.write(make_result(i, True))
+        with pytest.raises(IOError):
+            sink.close()
+
+    def test_case_map(self):
+        fh = StringIO()
+        wrapper = self.make_wrapper()
+        wrapper.set_sink(JsonLinesResultSink(fh, case_map=lambda case_num: case_num * 4 + 1))
+        wrapper.add_test_result(make_result(2, True))
+        wrapper.close()
+        assert json.loads(fh.getvalue().splitlines()[1])["case"] == 9
+
+    def test_summary_in_footer(self):
+        fh = StringIO()
+        wrapper = self.make_wrapper()
+        wrapper.set_sink(JsonLinesResultSink(fh, case_map=lambda case_num: case_num * 4 + 1))
+        wrapper.add_test_result(make_result(2, True))
+        wrapper.set_summary("confidence", {2: {"decision": None}})
+        wrapper.close()
+        fh.seek(0)
+        assert load_json_lines(fh)["confidence"] == {"9": {"decision": None}}
+
+    def test_load_round_trip(self):
+        fh = StringIO()
+        wrapper = self.make_wrapper()
+        wrapper.set_sink(JsonLinesResultSink(fh), keep_results=True)
+        for i in range(4):
+            wrapper.add_test_result(make_result(i % 2, True))
+        wrapper.close()
+        fh.seek(0)
+        assert is_json_lines(fh)
+        loaded = load_json_lines(fh)
+        expected = json.loads(json.dumps(wrapper.serializable()))
+        assert loaded["results"] == expected["results"]
+        assert loaded["generator"] == expected["generator"]
+
+    def test_truncated_line(self):
+        fh = StringIO()
+        wrapper = self.make_wrapper()
+        wrapper.set_sink(JsonLinesResultSink(fh))
+        wrapper.add_test_result(make_result(0, True))
+        wrapper.close()
+        fh = StringIO(fh.getvalue().rsplit("\n", 2)[0] + '\n{"type": "res')
+        loaded = load_json_lines(fh)
+        assert len(loaded["results"]) == 1
+        assert loaded["end_time"] is None
+
+    def test_not_json_lines(self):
+        fh = StringIO(json.dumps({"results": {}}, indent=4))
+        assert not is_json_lines(fh)
+        assert fh.tell() == 0
@@ -0,0 +1,137 @@
+import random
+
+from ...dot15d4.layout import Dot15d4FrameLayout
+from ...generators.base import BaseTestCaseGenerator
+from ..scheduler import FeedbackScheduler, PREAMBLE_REGION
+from ..sequential import SequentialTest, RECEIVED, MISSED
+from .helpers import MockAlternatorCase, MockGenerator, MockHarness, MockInterface, MockTarget, make_result
+
+HEADER = "\x41\x88"
+LAYOUT = Dot15d4FrameLayout(header_length=len(HEADER))
+
+
+class FrameGenerator(MockGenerator):
+    def get_frame_layout(self):
+        return {"header_length": len(HEADER), "has_fcs": True}
+
+
+def make_frames(count):
+    return [LAYOUT.join(None, HEADER, chr(i) * 8) for i in range(count)]
+
+
+class MissingAlternatorCase(MockAlternatorCase):
+    """
+    Misses the test cases in `missed` and every mutant, and receives the rest.
+    """
+    missed = ()
+
+    def throw_test_case(self, tc_str, tr):
+        MockAlternatorCase.throw_test_case(self, tc_str, tr)
+        return tc_str not in self.missed and self.generator.describe_extra_case(tc_str) is None
+
+
+class TestFeedbackScheduler(object):
+
+    def test_passthrough_without_seeds(self):
+        frames = make_frames(10)
+        scheduler = FeedbackScheduler(FrameGenerator(frames), rng=random.Random(1))
+        assert list(scheduler.yield_test_case(1)) == frames
+        assert scheduler.name == "FrameGenerator"
+
+    def test_interest(self):
+        scheduler = FeedbackScheduler(FrameGenerator([]))
+        assert scheduler.interest(make_result(0, True)) == 0
+        assert scheduler.interest(make_result(0, False)) == 1.0
+        assert scheduler.interest(make_result(0, False, broke_target=True)) == 5.0
+        for i in range(10):
+            assert scheduler.interest(make_result(0, True, latency=0.01)) == 0
+        assert scheduler.interest(make_result(0, True, latency=0.1)) == 2.0
+
+    def test_seeds_take_airtime(self):
+        frames = make_frames(200)
+        scheduler = FeedbackScheduler(FrameGenerator(frames), exploration=1.0, rng=random.Random(2))
+        scheduler.record_outcome(frames[0], make_result(0, False, broke_target=True))
+        assert scheduler.seeds == {frames[0]: 5.0}
+        scheduled = list(scheduler.yield_test_case(1))
+        mutants = [tc for tc in scheduled if tc not in frames]
+        # Mutants go in extra slots, so all of the generator's own cases are still sent, in order
+        assert [tc for tc in scheduled if tc in frames] == frames
+        # The seed's energy is spent on mutants, then the generator's own cases take over
+        assert 1 <= len(mutants) <= 5
+        assert len(scheduler.seeds) == 0
+        for mutant in mutants:
+            assert LAYOUT.split(mutant)[1] == HEADER
+            assert LAYOUT.join(*LAYOUT.split(mutant)) == mutant
+
+    def test_region_feedback(self):
+        frames = make_frames(4)
+        scheduler = FeedbackScheduler(FrameGenerator(frames), rng=random.Random(3))
+        scheduler.record_outcome(frames[1], make_result(0, False))
+        mutant = scheduler.next_mutant()
+        assert mutant is not None
+        scheduler.record_outcome(mutant, make_result(0, False))
+        hit_regions = [r for r in (0, 4) if scheduler.region_stats(r) == (1, 1)]
+        assert len(hit_regions) == 1
+        assert mutant in scheduler.seeds
+
+    def test_renumbered_mutant(self):
+        frames = make_frames(4)
+        generator = FrameGenerator(frames)
+        generator.renumber_test_case = lambda tc: tc + "!"
+        scheduler = FeedbackScheduler(generator, rng=random.Random(3))
+        scheduler.record_outcome(frames[1], make_result(0, False))
+        mutant = scheduler.renumber_test_case(scheduler.next_mutant())
+        assert mutant.endswith("!")
+        scheduler.record_outcome(mutant, make_result(0, False))
+        assert sum(scheduler.region_stats(r)[0] for r in (0, 4)) == 1
+
+    def test_preamble_region(self):
+        layout = Dot15d4FrameLayout(includes_phy=True, header_length=len(HEADER))
+        frame = layout.join([0] * 8, HEADER, "")
+        generator = FrameGenerator([frame])
+        BaseTestCaseGenerator.__init__(generator, includes_phy=True)
+        scheduler = FeedbackScheduler(generator, rng=random.Random(4))
+        scheduler.record_outcome(frame, make_result(0, False))
+        mutant = scheduler.next_mutant()
+        preamble, header, payload = layout.split(mutant)
+        assert header == HEADER and payload == ""
+        assert len(preamble) in (6, 7, 9, 10)
+        scheduler.record_outcome(mutant, make_result(0, True))
+        assert scheduler.region_stats(PREAMBLE_REGION) == (1, 0)
+
+    def test_max_seeds(self):
+        frames = make_frames(10)
+        scheduler = FeedbackScheduler(FrameGenerator(frames), max_seeds=3)
+        for i, frame in enumerate(frames):
+            scheduler.record_outcome(frame, make_result(0, False, broke_target=(i % 2 == 0)))
+        assert len(scheduler.seeds) == 3
+        assert all(energy == 5.0 for energy in scheduler.seeds.values())
+
+    def test_describe_extra_case(self):
+        frames = make_frames(4)
+        scheduler = FeedbackScheduler(FrameGenerator(frames), rng=random.Random(3))
+        scheduler.record_outcome(frames[1], make_result(0, False))
+        mutant = scheduler.next_mutant()
+        assert scheduler.describe_extra_case(frames[1]) is None
+        extra = scheduler.describe_extra_case(mutant)
+        assert extra["mutant_of"] == frames[1].encode('hex')
+        assert extra["region"] in (0, 4)
+
+    def test_feedback_with_early_stopping(self):
+        frames = make_frames(4)
+        scheduler = FeedbackScheduler(FrameGenerator(frames), rng=random.Random(5))
+        target = MockTarget(())
+        case = MissingAlternatorCase(MockInterface(target), MockHarness(target), scheduler)
+        case.missed = (frames[0],)
+        case.set_early_stopping(SequentialTest())
+        serialized = case.run_test(10).serializable()["results"]
+        # Mutants, all missed, are recorded apart and don't count towards the decisions of the cases they follow
+        assert len(serialized[None]) > 0
+        for tr in serialized[None]:
+            assert tr["valid"] is False
+            assert "mutant_of" in tr["raw"] and "region" in tr["raw"]
+        for case_num, frame in enumerate(frames):
+            assert all(tr["raw"]["test_case"] == frame.encode('hex') for tr in serialized[case_num])
+            assert all(tr["valid"] is (case_num != 0) for tr in serialized[case_num])
+        assert case.sequential_test.decision(0) == MISSED
+        assert all(case.sequential_test.decision(n) == RECEIVED for n in (1, 2, 3))
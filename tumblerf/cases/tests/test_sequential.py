@@ -0,0 +1,100 @@
+import pytest
+
+from ..sequential import SequentialTest, RECEIVED, MISSED
+from .helpers import MockAlternatorCase, MockGenerator, MockHarness, MockInterface, MockTarget
+
+
+class FlakyAlternatorCase(MockAlternatorCase):
+    """
+    Receives "good" cases, misses "bad" ones, and alternates for any others.
+    """
+    def __init__(self, *args):
+        MockAlternatorCase.__init__(self, *args)
+        self.thrown = []
+
+    def throw_test_case(self, tc_str, tr):
+        MockAlternatorCase.throw_test_case(self, tc_str, tr)
+        self.thrown.append(tc_str)
+        if tc_str.startswith("good"):
+            return True
+        if tc_str.startswith("bad"):
+            return False
+        return self.thrown.count(tc_str) % 2 == 0
+
+
+class TestSequentialTest(object):
+
+    def test_decides_consistent_cases(self):
+        test = SequentialTest()
+        assert test.add(0, True) is None
+        assert test.add(0, True) == RECEIVED
+        assert test.add(1, False) is None
+        assert test.add(1, False) == MISSED
+        assert test.confidence(0) > 0.95
+        assert test.confidence(1) < 0.05
+
+    def test_alternating_stays_undecided(self):
+        test = SequentialTest()
+        for i in range(20):
+            test.add(0, i % 2 == 0)
+        assert not test.is_decided(0)
+        assert test.confidence(0) == pytest.approx(0.5)
+
+    def test_stricter_error_rates_need_more_trials(self):
+        test = SequentialTest(alpha=0.001, beta=0.001)
+        for i in range(3):
+            test.add(0, True)
+        assert not test.is_decided(0)
+        test.add(0, True)
+        assert test.decision(0) == RECEIVED
+
+    def test_unknown_outcomes_ignored(self):
+        test = SequentialTest()
+        test.add(0, None)
+        assert test.serializable() == {}
+
+    def test_serializable_round_trip(self):
+        test = SequentialTest()
+        test.add(3, True)
+        test.add(3, True)
+        test.add(4, False)
+        # Keys come back as strings after a trip through JSON.
+        data = dict((str(k), v) for k, v in test.serializable().items())
+        restored = SequentialTest()
+        restored.load_serializable(data)
+        assert restored.decision(3) == RECEIVED
+        assert restored.serializable() == test.serializable()
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            SequentialTest(p0=0.9, p1=0.1)
+        with pytest.raises(ValueError):
+            SequentialTest(alpha=0)
+
+
+class TestEarlyStopping(object):
+
+    @staticmethod
+    def make_case(cases):
+        target = MockTarget([])
+        case = FlakyAlternatorCase(MockInterface(target), MockHarness(target), MockGenerator(cases))
+        case.set_early_stopping(SequentialTest())
+        return case
+
+    def test_stops_repeating_decided_cases(self):
+        case = self.make_case(["good", "bad", "flaky"])
+        results = case.run_test(6)
+        assert case.thrown.count("good") == 2
+        assert case.thrown.count("bad") == 2
+        assert case.thrown.count("flaky") == 6
+        confidence = results.serializable()["confidence"]
+        assert confidence[0]["decision"] == RECEIVED
+        assert confidence[1]["decision"] == MISSED
+        assert confidence[2]["decision"] is None
+        assert confidence[2]["trials"] == 6
+
+    def test_reset_between_runs(self):
+        case = self.make_case(["good"])
+        case.run_test(3)
+        case.run_test(3)
+        assert case.thrown.count("good") == 4
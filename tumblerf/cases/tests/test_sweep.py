@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+from ..result_aggregate import count_file, iter_results
+from ..result_columnar import convert_to_columnar
+from ..result_stream import JsonLinesResultSink, load_json_lines
+from ..sweep import ChannelSweep, DOT15D4_CHANNELS, assign_channels, merge_channel_results, split_channels
+from ..triage import bucket_file
+from .helpers import MockAlternatorCase, MockGenerator, MockHarness, MockInterface, MockTarget
+
+
+class TunableMockInterface(MockInterface):
+    def __init__(self, target):
+        MockInterface.__init__(self, target)
+        self.retunes = []
+
+    def set_channel(self, channel):
+        if channel < 11 or channel > 26:
+            return False
+        self.retunes.append(channel)
+        self.channel = channel
+        return channel
+
+
+class TestChannelSweep(object):
+
+    @pytest.fixture
+    def case(self):
+        target = MockTarget(())
+        return MockAlternatorCase(TunableMockInterface(target), MockHarness(target), MockGenerator(["a", "b"]))
+
+    def test_sweep_all(self, case):
+        results = ChannelSweep(case).run_test(3)
+        assert sorted(results.keys()) == DOT15D4_CHANNELS
+        # Only one retune per channel, regardless of the number of iterations:
+        assert case.interface.retunes == DOT15D4_CHANNELS
+        for channel, res in results.iteritems():
+            assert len(res["results"][0]) == 3
+
+    def test_bad_channel_skipped(self, case):
+        results = ChannelSweep(case, [11, 40]).run_test(1)
+        assert results.keys() == [11]
+
+    def test_assign_channels(self):
+        assert assign_channels(DOT15D4_CHANNELS, 16) == [[c] for c in DOT15D4_CHANNELS]
+        groups = assign_channels(DOT15D4_CHANNELS, 3)
+        assert [len(g) for g in groups] == [6, 5, 5]
+        assert sum(groups, []) == DOT15D4_CHANNELS
+        assert assign_channels([11, 12], 3) == [[11], [12], []]
+
+    def test_merge(self, case):
+        first = ChannelSweep(case, [11]).run_test(1)
+        second = ChannelSweep(case, [12, 13]).run_test(1)
+        merged = merge_channel_results([first, second])
+        assert sorted(merged["channels"].keys()) == [11, 12, 13]
+        assert merged["start_time"] <= merged["end_time"]
+
+    def test_split(self, case):
+        merged = json.loads(json.dumps(merge_channel_results([ChannelSweep(case, [12, 11]).run_test(1)])))
+        assert [channel for channel, _ in split_channels(merged)] == [11, 12]
+        single = case.run_test(1).serializable()
+        assert split_channels(single) == [(None, single)]
+
+
+class ChannelMissAlternatorCase(MockAlternatorCase):
+    """
+    Misses test case "b" on channel 12 only, so the results of each channel differ.
+    """
+    def throw_test_case(self, tc_str, tr):
+        MockAlternatorCase.throw_test_case(self, tc_str, tr)
+        return not (tc_str == "b" and self.interface.channel == 12)
+
+
+class TestSweepAnalysis(object):
+    """
+    Analyzes the output of real sweeps, as written by cli.py with and without streaming, as parse_results does.
+    """
+
+    @staticmethod
+    def run_sweep(sink=None):
+        target = MockTarget(())
+        case = ChannelMissAlternatorCase(TunableMockInterface(target), MockHarness(target),
+                                         MockGenerator(["a", "b", "c"]))
+        if sink is not None:
+            case.set_result_sink(sink)
+        return ChannelSweep(case, [11, 12]).run_test(2)
+
+    @pytest.fixture(params=["json", "jsonl"])
+    def sweep_path(self, request, tmpdir):
+        path = str(tmpdir.join("sweep." + request.param))
+        with open(path, 'w') as fh:
+            if request.param == "json":
+                json.dump(merge_channel_results([self.run_sweep()]), fh)
+            else:
+                self.run_sweep(JsonLinesResultSink(fh))
+        return path
+
+    @staticmethod
+    def check_counts(runs):
+        assert [(channel, generator_name) for channel, generator_name, _ in runs] == \
+            [(11, "MockGenerator"), (12, "MockGenerator")]
+        assert runs[0][2].rows() == [(0, 2, 0, "61"), (1, 2, 0, "62"), (2, 2, 0, "63")]
+        assert runs[1][2].rows() == [(0, 2, 0, "61"), (1, 0, 2, "62"), (2, 2, 0, "63")]
+
+    def test_count_file(self, sweep_path):
+        filename, runs = count_file(sweep_path)
+        self.check_counts(runs)
+
+    def test_iter_results(self, sweep_path):
+        results = list(iter_results(sweep_path))
+        assert len(results) == 12
+        assert sorted(set(result["channel"] for result in results)) == [11, 12]
+        assert [(result["channel"], result["case"]) for result in iter_results(sweep_path, invalid_only=True)] == \
+            [(12, 1), (12, 1)]
+
+    def test_bucket_file(self, sweep_path):
+        filename, index = bucket_file(sweep_path)
+        [(sig, bucket)] = index.buckets()
+        assert bucket["count"] == 2
+        assert bucket["representative"] == {"case": 1, "test_case": "62", "channel": 12}
+
+    def test_convert(self, sweep_path):
+        converted = convert_to_columnar(sweep_path, sweep_path + ".trfc")
+        assert converted == [(sweep_path + ".ch11.trfc", 6), (sweep_path + ".ch12.trfc", 6)]
+        runs = [run for path, _ in converted for run in count_file(path)[1]]
+        self.check_counts(runs)
+
+    def test_load_json_lines(self, tmpdir):
+        path = str(tmpdir.join("sweep.jsonl"))
+        with open(path, 'w') as fh:
+            self.run_sweep(JsonLinesResultSink(fh))
+        with open(path, 'r') as fh:
+            loaded = load_json_lines(fh)
+        assert sorted(loaded["channels"].keys()) == ["11", "12"]
+        assert len(loaded["channels"]["12"]["results"]["1"]) == 2
+        assert loaded["start_time"] <= loaded["end_time"]
@@ -0,0 +1,101 @@
+import pytest
+
+from ..timing import LatencyHistogram, StageTimer
+from .helpers import make_case
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyHistogram(object):
+
+    def test_percentiles_within_precision(self):
+        histogram = LatencyHistogram()
+        for i in range(1, 1001):
+            histogram.record(i / 1000.0)  # 1ms to 1s
+        assert len(histogram) == 1000
+        assert histogram.percentile(50) == pytest.approx(0.5, rel=0.01)
+        assert histogram.percentile(99) == pytest.approx(0.99, rel=0.01)
+        assert histogram.percentile(0) == 0.001
+        assert histogram.percentile(100) == 1.0
+        assert histogram.mean() == pytest.approx(0.5005)
+
+    def test_small_values_exact(self):
+        histogram = LatencyHistogram()
+        for us in [1, 2, 3, 200]:
+            histogram.record(us / 1000000.0)
+        assert histogram.percentile(50) == pytest.approx(2e-6)
+        assert histogram.percentile(75) == pytest.approx(3e-6)
+
+    def test_sparse_buckets(self):
+        histogram = LatencyHistogram()
+        for i in range(10000):
+            histogram.record(0.01)
+        histogram.record(3600.0)
+        assert len(histogram.serializable()["buckets"]) == 2
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        assert histogram.percentile(50) is None
+        assert histogram.mean() is None
+        assert LatencyHistogram.from_serializable(histogram.serializable()).serializable() == \
+            histogram.serializable()
+
+    def test_merge_and_round_trip(self):
+        first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i in range(100):
+            first.record(i / 100.0)
+            combined.record(i / 100.0)
+            second.record(i / 10.0)
+            combined.record(i / 10.0)
+        first.merge(LatencyHistogram.from_serializable(second.serializable()))
+        assert first.serializable() == combined.serializable()
+
+    def test_merge_different_precision(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram(8).merge(LatencyHistogram(4))
+
+
+class TestStageTimer(object):
+
+    def test_stages_and_rate(self):
+        clock = FakeClock()
+        timer = StageTimer(clock=clock)
+        timer.reset()
+        for i in range(4):
+            start = timer.start()
+            clock.now += 0.01
+            start = timer.stop("tx", start)
+            clock.now += 0.1
+            timer.stop("wait", start)
+            timer.case_done()
+        assert timer.cases_per_second() == pytest.approx(4 / 0.44)
+        assert timer.histogram("tx").percentile(50) == pytest.approx(0.01, rel=0.01)
+        assert timer.histogram("wait").percentile(99) == pytest.approx(0.1, rel=0.01)
+        serialized = timer.serializable()
+        assert sorted(serialized["stages"]) == ["tx", "wait"]
+        assert serialized["cases"] == 4
+        assert timer.report().startswith("4 cases, 9.09 cases/s; tx p50=10.0")
+
+    def test_periodic_report(self, capsys):
+        clock = FakeClock()
+        timer = StageTimer(report_interval=5.0, clock=clock)
+        timer.reset()
+        timer.maybe_report()
+        clock.now += 5.0
+        timer.maybe_report()
+        assert capsys.readouterr()[0].count("INFO: Timing:") == 1
+
+    def test_run_records_timing(self):
+        case, target = make_case(["case{}".format(i) for i in range(5)], break_on=["case3"])
+        case.set_control_interval(5)
+        timing = case.run_test(1).serializable()["timing"]
+        assert timing["cases"] == 5
+        for stage in ["generate", "throw", "control", "bisect", "reset", "record"]:
+            assert timing["stages"][stage]["count"] > 0
+        assert timing["stages"]["throw"]["count"] >= 5
@@ -0,0 +1,72 @@
+import json
+
+from ..result_aggregate import iter_results
+from ..triage import SignatureIndex, bucket_file, normalize_evidence, signature
+from .helpers import make_result
+
+
+class TestSignature(object):
+
+    def test_normalize_serial_line(self):
+        first = normalize_evidence({"serial_line": "HardFault at 0x20001f3c, count 12"})
+        second = normalize_evidence({"serial_line": "HardFault at 0x200020a0, count 7"})
+        assert first == second
+
+    def test_normalize_lengths(self):
+        assert normalize_evidence({"unmatched_lengths": [12, 5, 12]}) == {"unmatched_lengths": [5, 12]}
+
+    def test_evidence_splits(self):
+        ps = make_result(0, False, test_case="00",
+                         evidence={"ps_missing": ["zigbeed"], "ps_added": []}).serializable()
+        frame = make_result(1, False, test_case="00",
+                            evidence={"expected_length": 12, "unmatched_lengths": []}).serializable()
+        assert signature(ps)[0] != signature(frame)[0]
+
+    def test_broke_target_splits(self):
+        missed = make_result(0, False, test_case="00").serializable()
+        broke = make_result(0, False, test_case="00", broke_target=True).serializable()
+        assert signature(missed)[0] != signature(broke)[0]
+
+
+class TestSignatureIndex(object):
+
+    def test_buckets(self):
+        index = SignatureIndex()
+        fault = {"serial_line": "fault 1"}
+        assert index.add(make_result(0, True, test_case="00").serializable()) is None
+        sig = index.add(make_result(1, False, test_case="aabbcc", evidence=fault).serializable())
+        other_fault = {"serial_line": "fault 2"}
+        assert index.add(make_result(2, False, test_case="aabb", evidence=other_fault).serializable()) == sig
+        index.add(make_result(3, False, test_case="aa").serializable())
+        assert len(index) == 2
+        buckets = index.buckets()
+        assert buckets[0][0] == sig
+        assert buckets[0][1]["count"] == 2
+        assert buckets[0][1]["representative"] == {"case": 2, "test_case": "aabb"}
+
+    def test_merge_and_save(self, tmpdir):
+        first = SignatureIndex()
+        first.add(make_result(1, False, test_case="aabb").serializable())
+        second = SignatureIndex()
+        second.add(make_result(4, False, test_case="aa").serializable())
+        second.add(make_result(5, None, test_case="cc", broke_target=True).serializable())
+        first.merge(second)
+        path = str(tmpdir.join("index.json"))
+        first.save(path)
+        loaded = SignatureIndex.load(path)
+        assert loaded.serializable() == json.loads(json.dumps(first.serializable()))
+        assert loaded.buckets()[0][1]["count"] == 2
+        assert loaded.buckets()[0][1]["representative"]["test_case"] == "aa"
+
+    def test_bucket_file(self, tmpdir):
+        path = str(tmpdir.join("results.json"))
+        with open(path, 'w') as fh:
+            json.dump({"generator": {"name": "MockGenerator"}, "results": {
+                "0": [make_result(0, True, test_case="00").serializable(),
+                      make_result(0, False, test_case="00").serializable()],
+                "1": [make_result(1, False, test_case="0011").serializable()]
+            }}, fh)
+        assert len(list(iter_results(path, invalid_only=True))) == 2
+        filename, index = bucket_file(path)
+        assert filename == path
+        assert index.buckets()[0][1]["count"] == 2
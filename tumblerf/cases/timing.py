@@ -0,0 +1,245 @@
+"""
+Implements the LatencyHistogram class, an HDR-style histogram of durations, and the StageTimer class, which times
+each stage of a case's hot path into one histogram per stage and reports the rates and percentiles as it runs.
+
+The histogram keeps a fixed number of significant bits of each value, so buckets are exact for small values and
+grow with the value, bounding the relative error (to under 1% by default) across many orders of magnitude while
+only holding counts for the buckets actually hit. Histograms of the same precision merge by adding counts.
+"""
+
+import time
+
+# Durations are recorded as whole microseconds.
+_UNITS_PER_SECOND = 1000000
+
+
+class LatencyHistogram():
+    def __init__(self, significant_bits=8):
+        """
+        :param significant_bits: Bits of each value kept, so the relative error is below 2 ** (1 - significant_bits).
+        """
+        if significant_bits < 1:
+            raise ValueError("Must keep at least one significant bit.")
+        self.__significant_bits = significant_bits
+        self.__counts = {}  # bucket key: count
+        self.__count = 0
+        self.__total = 0
+        self.__min = None
+        self.__max = None
+
+    def __repr__(self):
+        return "{}(count={}, p50={}, p99={})".format(self.__class__.__name__, self.__count,
+                                                     self.percentile(50), self.percentile(99))
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def significant_bits(self):
+        return self.__significant_bits
+
+    def __bucket(self, value):
+        """
+        Returns the key of the bucket holding a value: the value itself while it fits in the significant bits,
+        otherwise the shift needed to make it fit along with the shifted value.
+        """
+        shift = max(value.bit_length() - self.__significant_bits, 0)
+        return (shift << self.__significant_bits) | (value >> shift)
+
+    def __bucket_value(self, key):
+        """
+        Returns the midpoint of the range of values a bucket holds.
+        """
+        shift = key >> self.__significant_bits
+        low = (key & ((1 << self.__significant_bits) - 1)) << shift
+        return low + ((1 << shift) - 1) // 2
+
+    def record(self, seconds, count=1):
+        """
+        Records a duration.
+        :param seconds: The duration, which is clamped to be at least zero.
+        :param count: Number of times the duration occurred.
+        """
+        value = max(int(seconds * _UNITS_PER_SECOND), 0)
+        key = self.__bucket(value)
+        self.__counts[key] = self.__counts.get(key, 0) + count
+        self.__count += count
+        self.__total += value * count
+        self.__min = value if self.__min is None else min(self.__min, value)
+        self.__max = value if self.__max is None else max(self.__max, value)
+
+    @property
+    def total(self):
+        """
+        Sum of the durations recorded, in seconds.
+        """
+        return float(self.__total) / _UNITS_PER_SECOND
+
+    def mean(self):
+        if self.__count == 0:
+            return None
+        return float(self.__total) / self.__count / _UNITS_PER_SECOND
+
+    def percentile(self, percentile):
+        """
+        Returns the given percentile of the durations recorded, in seconds, to within the histogram's precision.
+        The extremes (0 and 100) are exact.
+        :return: float or None if nothing has been recorded.
+        """
+        if self.__count == 0:
+            return None
+        if percentile <= 0:
+            return float(self.__min) / _UNITS_PER_SECOND
+        if percentile >= 100:
+            return float(self.__max) / _UNITS_PER_SECOND
+        rank = max(int(-(-percentile * self.__count // 100)), 1)
+        seen = 0
+        for key in sorted(self.__counts):
+            seen += self.__counts[key]
+            if seen >= rank:
+                value = min(max(self.__bucket_value(key), self.__min), self.__max)
+                return float(value) / _UNITS_PER_SECOND
+
+    def merge(self, other):
+        """
+        Adds the counts of another histogram of the same precision to this one.
+        :return: This histogram.
+        """
+        if other.significant_bits != self.__significant_bits:
+            raise ValueError("Can only merge histograms of the same precision.")
+        data = other.serializable()
+        self.__merge_buckets(data)
+        return self
+
+    def __merge_buckets(self, data):
+        if data["count"] == 0:
+            return
+        for key, count in data["buckets"]:
+            self.__counts[key] = self.__counts.get(key, 0) + count
+        self.__count += data["count"]
+        self.__total += data["total_us"]
+        self.__min = data["min_us"] if self.__min is None else min(self.__min, data["min_us"])
+        self.__max = data["max_us"] if self.__max is None else max(self.__max, data["max_us"])
+
+    def serializable(self):
+        """
+        :return: dict with the count, mean, extremes and common percentiles in seconds, plus the raw bucket counts
+            so the histogram can be rebuilt with from_serializable().
+        """
+        return {
+            "count": self.__count,
+            "mean": self.mean(),
+            "min": self.percentile(0),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.percentile(100),
+            "significant_bits": self.__significant_bits,
+            "total_us": self.__total,
+            "min_us": self.__min,
+            "max_us": self.__max,
+            "buckets": sorted(self.__counts.iteritems())
+        }
+
+    @staticmethod
+    def from_serializable(data):
+        histogram = LatencyHistogram(data["significant_bits"])
+        histogram.__merge_buckets(data)
+        return histogram
+
+
+class StageTimer():
+    def __init__(self, report_interval=30.0, clock=time.time):
+        """
+        :param report_interval: Seconds between progress reports printed by maybe_report(), or None for none.
+        :param clock: Function returning the current time in seconds.
+        """
+        self.__report_interval = report_interval
+        self.__clock = clock
+        self.__histograms = {}  # stage name: LatencyHistogram
+        self.__order = []
+        self.__cases = 0
+        self.__started = None
+        self.__last_report = None
+
+    def __repr__(self):
+        return "{}({} cases, stages={})".format(self.__class__.__name__, self.__cases, self.__order)
+
+    @property
+    def cases(self):
+        return self.__cases
+
+    def histogram(self, stage):
+        """
+        :return: The LatencyHistogram of a stage, or None if the stage hasn't been timed.
+        """
+        return self.__histograms.get(stage)
+
+    def reset(self):
+        self.__histograms = {}
+        self.__order = []
+        self.__cases = 0
+        self.__started = self.__last_report = self.__clock()
+
+    def start(self):
+        """
+        :return: The time a stage starts, to pass to stop().
+        """
+        return self.__clock()
+
+    def stop(self, stage, start):
+        """
+        Records the time from start until now against a stage.
+        :return: The time now, so the next stage can start from it.
+        """
+        now = self.__clock()
+        histogram = self.__histograms.get(stage)
+        if histogram is None:
+            histogram = self.__histograms[stage] = LatencyHistogram()
+            self.__order.append(stage)
+        histogram.record(now - start)
+        return now
+
+    def case_done(self):
+        self.__cases += 1
+
+    def elapsed(self):
+        if self.__started is None:
+            return 0.0
+        return self.__clock() - self.__started
+
+    def cases_per_second(self):
+        elapsed = self.elapsed()
+        return self.__cases / elapsed if elapsed > 0 else None
+
+    def report(self):
+        """
+        :return: One line summary of the case rate and the p50/p99 of each stage, in milliseconds.
+        """
+        rate = self.cases_per_second()
+        parts = ["{} cases, {} cases/s".format(self.__cases, "{:.2f}".format(rate) if rate is not None else "-")]
+        for stage in self.__order:
+            histogram = self.__histograms[stage]
+            parts.append("{} p50={:.3f}ms p99={:.3f}ms".format(stage, histogram.percentile(50) * 1000,
+                                                               histogram.percentile(99) * 1000))
+        return "; ".join(parts)
+
+    def maybe_report(self):
+        """
+        Prints report() if report_interval seconds have passed since the last one.
+        """
+        if self.__report_interval is None or self.__last_report is None:
+            return
+        now = self.__clock()
+        if now - self.__last_report >= self.__report_interval:
+            self.__last_report = now
+            print("INFO: Timing: {}".format(self.report()))
+
+    def serializable(self):
+        return {
+            "cases": self.__cases,
+            "elapsed": self.elapsed(),
+            "cases_per_second": self.cases_per_second(),
+            "stages": dict((stage, histogram.serializable()) for stage, histogram in self.__histograms.iteritems())
+        }
@@ -0,0 +1,128 @@
+"""
+Implements the SignatureIndex class, which buckets invalid results by a signature hashed from the evidence the
+harness recorded for them (see BaseHarness.evidence()), so that thousands of invalid results can be triaged as a
+handful of distinct failures, each with one representative test case.
+
+Evidence is normalized before hashing so that details which differ between occurrences of the same failure, such
+as addresses and counters in a serial line or the order frames arrived in, don't split a bucket.
+"""
+
+import hashlib
+import json
+import re
+
+from .result_aggregate import iter_results
+
+_HEX_NUMBER = re.compile(r'0x[0-9a-fA-F]+')
+_NUMBER = re.compile(r'\d+')
+
+
+def normalize_evidence(evidence):
+    """
+    Returns a copy of a harness evidence dict with run-specific details removed.
+    """
+    normalized = {}
+    for key, value in evidence.iteritems():
+        if key == "serial_line" and isinstance(value, basestring):
+            value = _NUMBER.sub('N', _HEX_NUMBER.sub('0xN', value))
+        elif key == "unmatched_lengths":
+            value = sorted(set(value))
+        elif isinstance(value, list):
+            value = sorted(value)
+        normalized[key] = value
+    return normalized
+
+
+def signature(result):
+    """
+    Hashes the evidence of an invalid result into its signature.
+    :param result: dict from TestResult.serializable().
+    :return: Tuple of the signature (a hex string) and the normalized evidence it was computed from.
+    """
+    raw = result.get("raw", {})
+    basis = {
+        "evidence": normalize_evidence(raw.get("evidence", {})),
+        "control_evidence": normalize_evidence(raw.get("control_evidence", {})),
+        "broke_target": bool(raw.get("broke_target", False))
+    }
+    return hashlib.sha1(json.dumps(basis, sort_keys=True)).hexdigest()[:16], basis
+
+
+class SignatureIndex():
+    def __init__(self):
+        # signature: {"count", "evidence", "representative": {"case", "test_case", and "channel" if swept}}
+        self.__buckets = {}
+
+    def __repr__(self):
+        return "{}({} buckets)".format(self.__class__.__name__, len(self.__buckets))
+
+    def __len__(self):
+        return len(self.__buckets)
+
+    def add(self, result, count=1):
+        """
+        Adds an invalid result to its bucket. The bucket's representative is the shortest test case seen for it,
+        being the simplest reproducer at hand. Valid results are ignored.
+        :param result: dict from TestResult.serializable().
+        :return: The result's signature, or None if it was valid.
+        """
+        if result.get("valid") is True:
+            return None
+        sig, basis = signature(result)
+        representative = {"case": result.get("case"), "test_case": result.get("raw", {}).get("test_case")}
+        if result.get("channel") is not None:
+            representative["channel"] = result["channel"]
+        self.__add_to_bucket(sig, basis, representative, count)
+        return sig
+
+    def __add_to_bucket(self, sig, evidence, representative, count):
+        bucket = self.__buckets.get(sig)
+        if bucket is None:
+            self.__buckets[sig] = {"count": count, "evidence": evidence, "representative": representative}
+            return
+        bucket["count"] += count
+        current = bucket["representative"]
+        if representative["test_case"] is not None and \
+                (current["test_case"] is None or len(representative["test_case"]) < len(current["test_case"])):
+            bucket["representative"] = representative
+
+    def merge(self, other):
+        """
+        Folds the buckets of another SignatureIndex into this one.
+        :return: This SignatureIndex.
+        """
+        for sig, bucket in other.serializable().iteritems():
+            self.__add_to_bucket(sig, bucket["evidence"], bucket["representative"], bucket["count"])
+        return self
+
+    def buckets(self):
+        """
+        :return: List of (signature, bucket dict) tuples, most frequent first.
+        """
+        return sorted(self.__buckets.iteritems(), key=lambda (sig, bucket): (-bucket["count"], sig))
+
+    def serializable(self):
+        return dict((sig, dict(bucket)) for sig, bucket in self.__buckets.iteritems())
+
+    def save(self, path):
+        with open(path, 'w') as fh:
+            json.dump(self.serializable(), fh, indent=4, sort_keys=True)
+
+    @staticmethod
+    def load(path):
+        index = SignatureIndex()
+        with open(path, 'r') as fh:
+            for sig, bucket in json.load(fh).iteritems():
+                index.__add_to_bucket(sig, bucket["evidence"], bucket["representative"], bucket["count"])
+        return index
+
+
+def bucket_file(filename):
+    """
+    Buckets the invalid results of a results file in one streaming pass.
+    :return: Tuple of the filename and a SignatureIndex.
+    """
+    index = SignatureIndex()
+    for result in iter_results(filename, invalid_only=True):
+        index.add(result)
+    return filename, index
@@ -12,15 +12,32 @@
 # LICENSE.md file for more details.
 
 import argparse
+import cProfile
 from pprint import pprint
 import inspect
 import sys
 import signal
 import json
+import shlex
 
 import interfaces
 import generators
 import harnesses
+from cases.alternator import AlternatorCaseRxFrame
+from cases.calibration import LatencyCalibrator
+from cases.checkpoint import Checkpoint
+from cases.minimizer import TestCaseMinimizer
+from cases.parallel import ParallelCampaign
+from cases.profiling import SamplingProfiler, profile_call
+from cases.result import merge_serializable, remap_case_numbers
+from cases.result_stream import JsonLinesResultSink
+from cases.scheduler import FeedbackScheduler
+from cases.sequential import SequentialTest
+from cases.sweep import ChannelSweep, DOT15D4_CHANNELS, assign_channels, merge_channel_results
+from cases.timing import StageTimer
+from dot15d4.layout import Dot15d4FrameLayout
+from generators.prefetch import PrefetchGenerator
+from generators.sharded import ShardedGenerator
 
 __doc__="""
 Command line interface to drive fuzzing cases and measurements.
@@ -45,6 +62,206 @@ def exit_handler(signal, frame):
     print("INFO: Exiting due to interrupt {}".format(signal))
     sys.exit(1)
 
+def open_components(parser, args, argv, tx_interface, generator, harness):
+    """
+    Configures the interface, generator and harness from the command line, and opens the interface and harness.
+    """
+    tx_interface.process_cli(parser, list(argv))
+    tx_interface.open()
+    print("INFO: Transmit Interface is {}".format(tx_interface))
+    generator.process_cli(parser, list(argv))
+    print("INFO: Generator is {}".format(generator))
+    harness.process_cli(parser, list(argv))
+    harness.open()
+    print("INFO: Harness is {}".format(harness))
+
+def make_checkpoint(args, suffix=None):
+    if args.checkpoint is None:
+        return None
+    checkpoint = Checkpoint(args.checkpoint, interval=args.checkpoint_interval)
+    return checkpoint if suffix is None else checkpoint.derive(suffix)
+
+def open_results_file(args, suffix=None):
+    """
+    Opens the results file, or one derived from it with the given suffix, or returns stdout if none was given.
+    A streamed results file is appended to when resuming, so the results from before the interruption are kept.
+    """
+    if args.results_file is None:
+        return sys.stdout
+    path = args.results_file if suffix is None else "{}.{}".format(args.results_file, suffix)
+    return open(path, 'a' if args.stream and args.resume else 'w')
+
+def make_sink(args, suffix=None, case_map=None):
+    if not args.stream:
+        return None
+    return JsonLinesResultSink(open_results_file(args, suffix), case_map=case_map)
+
+def profile_path(args, suffix=None):
+    """
+    Returns the path to write a profile to, next to the results file (or in the working directory if results go to
+    stdout): a pstats file for deterministic profiles, collapsed stacks for sampling ones.
+    """
+    path = args.results_file if args.results_file is not None else "tumblerf"
+    if suffix is not None:
+        path = "{}.{}".format(path, suffix)
+    return "{}.{}".format(path, "folded" if args.profile == 'sampling' else "prof")
+
+def run_profiled(args, run, tx_interface, harness, generator, suffix=None):
+    """
+    Calls run(), under a profiler if --profile was given, and writes the profile out.
+    """
+    if args.profile is None:
+        return run()
+    profiler = SamplingProfiler(args.profile_interval) if args.profile == 'sampling' else cProfile.Profile()
+    components = {
+        "generator": [generator],
+        "interface": [tx_interface],
+        "harness": [harness]
+    }.get(args.profile_component)
+    try:
+        return profile_call(run, profiler, components)
+    finally:
+        path = profile_path(args, suffix)
+        profiler.dump_stats(path)
+        print("INFO: Wrote {} profile of {} to {}.".format(args.profile, args.profile_component, path))
+
+def make_case(args, tx_interface, harness, generator, checkpoint=None, sink=None):
+    if args.feedback:
+        generator = FeedbackScheduler(generator, exploration=args.feedback_exploration)
+    if args.prefetch > 0:
+        generator = PrefetchGenerator(generator, depth=args.prefetch)
+    # TODO: Expose the test cases available as command line flags to remove this hardcoding.
+    case = AlternatorCaseRxFrame(tx_interface, harness, generator, deadline=args.rx_deadline)
+    if args.adaptive_control is not None:
+        case.set_control_interval(args.control_interval, adaptive=True, max_interval=args.adaptive_control)
+    else:
+        case.set_control_interval(args.control_interval)
+    if checkpoint is not None:
+        case.set_checkpoint(checkpoint, resume=args.resume)
+    if sink is not None:
+        case.set_result_sink(sink)
+    if args.early_stop:
+        case.set_early_stopping(SequentialTest(alpha=args.early_stop_error, beta=args.early_stop_error))
+    case.set_timer(StageTimer(report_interval=args.timing_interval if args.timing_interval > 0 else None))
+    return case
+
+def run_case(args, case):
+    if args.calibrate > 0:
+        case.calibrate(args.calibrate, LatencyCalibrator(percentile=args.calibrate_percentile,
+                                                         max_deadline=args.rx_deadline))
+    return case.run_test(args.iterations)
+
+def discover_pair_argv():
+    """
+    Pairs up all attached KillerBee devices, in the order they are listed, as TX interface and RX harness devices.
+    :return: List of extra command line arguments for each pair.
+    """
+    devices = string_to_class(interfaces, 'KillerBeeInterface').list_device_strings()
+    if len(devices) % 2 != 0:
+        print("WARN: Odd number of KillerBee devices found, not using {}.".format(devices[-1]))
+    return [['-i', devices[i], '--rx_iface_device', devices[i+1]] for i in range(0, len(devices) - 1, 2)]
+
+def make_pair_worker(parser, args, argv, run_pair):
+    """
+    Returns the function that each ParallelCampaign worker process runs, which sets up its own interface, generator
+    and harness from the command line plus the pair's extra arguments, then calls
+    run_pair(index, tx_interface, harness, generator) and returns its result.
+    """
+    def worker(index, pair_argv, claim):
+        tx_interface = string_to_class(interfaces, args.tx_iface)()
+        if args.channel is not None:
+            tx_interface.set_channel(args.channel)
+        generator = string_to_class(generators, args.gen)()
+        harness = string_to_class(harnesses, args.harness)()
+        try:
+            open_components(parser, args, argv + pair_argv, tx_interface, generator, harness)
+            unique_ids = [tx_interface.unique_id]
+            rx_interface = getattr(harness, 'interface', None)
+            if rx_interface is not None:
+                unique_ids.append(rx_interface.unique_id)
+            if not claim(unique_ids):
+                return None
+            return run_profiled(args, lambda: run_pair(index, tx_interface, harness, generator),
+                                tx_interface, harness, generator, "pair{}".format(index))
+        finally:
+            tx_interface.close()
+            harness.close()
+    return worker
+
+def make_shard_runner(args, shard_count):
+    """
+    Returns a run_pair function for make_pair_worker() which runs the pair's shard of the test cases.
+    """
+    def run_shard(index, tx_interface, harness, generator):
+        sharded = ShardedGenerator(generator, index, shard_count)
+        checkpoint = make_checkpoint(args, "pair{}".format(index))
+        sink = make_sink(args, "pair{}".format(index), sharded.global_case_num)
+        results = run_case(args, make_case(args, tx_interface, harness, sharded, checkpoint, sink))
+        return remap_case_numbers(results.serializable(), sharded.global_case_num)
+    return run_shard
+
+def make_sweep_runner(args, channel_groups):
+    """
+    Returns a run_pair function for make_pair_worker() which sweeps the pair's group of channels.
+    """
+    def run_sweep(index, tx_interface, harness, generator):
+        channels = channel_groups[index]
+        if len(channels) == 0:
+            return {}
+        sink = make_sink(args, "pair{}".format(index) if len(channel_groups) > 1 else None)
+        sweep = ChannelSweep(make_case(args, tx_interface, harness, generator, sink=sink), channels,
+                             checkpoint=make_checkpoint(args), resume=args.resume)
+        if args.calibrate > 0 and sweep.retune(channels[0]):
+            sweep.case.calibrate(args.calibrate, LatencyCalibrator(percentile=args.calibrate_percentile,
+                                                                   max_deadline=args.rx_deadline))
+        return sweep.run_test(args.iterations)
+    return run_sweep
+
+def run_minimize(parser, args, argv, pairs):
+    """
+    Minimizes the test case given with --minimize, checking variants on each TX/RX pair (all opened in this
+    process) in parallel.
+    :param pairs: List of extra command line arguments for each pair.
+    :return: Exit code.
+    """
+    if len(pairs) == 0:
+        print("ERROR: No TX/RX pairs available.")
+        return -4
+    opened = []
+    try:
+        for pair_argv in pairs:
+            tx_interface = string_to_class(interfaces, args.tx_iface)()
+            if args.channel is not None:
+                tx_interface.set_channel(args.channel)
+            generator = string_to_class(generators, args.gen)()
+            harness = string_to_class(harnesses, args.harness)()
+            opened.append((tx_interface, harness, generator))
+            open_components(parser, args, argv + pair_argv, tx_interface, generator, harness)
+        layout = opened[0][2].get_frame_layout()
+        if layout is None:
+            print("ERROR: Generator {} doesn't support minimizing its test cases.".format(opened[0][2]))
+            return -8
+        if not opened[0][1].implements_reset():
+            print("ERROR: Harness {} must implement reset to minimize test cases.".format(opened[0][1]))
+            return -8
+        oracles = []
+        for tx_interface, harness, generator in opened:
+            case = make_case(args, tx_interface, harness, generator)
+            oracles.append(lambda frame, case=case: case.replay_breaks_target([frame]))
+        minimizer = TestCaseMinimizer(oracles, Dot15d4FrameLayout(includes_phy=opened[0][2].includes_phy, **layout))
+        test_case = args.minimize.decode('hex')
+        minimized = minimizer.minimize(test_case)
+        json.dump({
+            "test_case": args.minimize,
+            "minimized": minimized.encode('hex') if minimized is not None else None,
+            "sent": minimizer.sent_count
+        }, open_results_file(args), indent=4)
+        return 0 if minimized is not None else -9
+    finally:
+        for tx_interface, harness, _ in opened:
+            tx_interface.close()
+            harness.close()
+
 def epilog_text():
     return "Additional arguments exist depending on the -I/-G/-H options selected."
 
@@ -57,7 +274,67 @@ if __name__ == '__main__':
     parser.add_argument('-H', '--harness', action='store', default=None)
     parser.add_argument('-c', '--channel', action='store', type=int, default=None)
     parser.add_argument('--iterations', action='store', type=int, default=1)
-    parser.add_argument('-f', '--results_file', action='store', type=argparse.FileType('w'), default=sys.stdout)
+    parser.add_argument('--rx_deadline', action='store', type=float, default=0.5,
+                        help='Seconds to wait for an expected frame before declaring it missed.')
+    parser.add_argument('--calibrate', action='store', type=int, default=0,
+                        help='Number of control cases to send to calibrate the deadline before the run (0 to disable).')
+    parser.add_argument('--calibrate_percentile', action='store', type=float, default=99.0)
+    parser.add_argument('--control_interval', action='store', type=int, default=1,
+                        help='Number of test cases between control cases.')
+    parser.add_argument('--adaptive_control', action='store', type=int, default=None, metavar='MAX_INTERVAL',
+                        help='Grow the control interval while control cases pass, up to this maximum.')
+    parser.add_argument('--pair', action='append', default=None, metavar='ARGS',
+                        help='Extra arguments for one TX/RX pair, e.g. "-i 1:3 --rx_iface_device 1:4". '
+                             'Give once per pair to shard the test cases across pairs in parallel.')
+    parser.add_argument('--discover_pairs', action='store_true',
+                        help='Use all attached KillerBee devices as TX/RX pairs in parallel.')
+    parser.add_argument('--sweep', action='store', default=None, metavar='CHANNELS', nargs='?', const='all',
+                        help='Run the test cases on each channel (comma separated, default all 802.15.4 channels). '
+                             'With several pairs, the channels are split between them and run concurrently.')
+    parser.add_argument('--checkpoint', action='store', default=None, metavar='FILE',
+                        help='Periodically save progress to this file (per pair/channel files are derived from it).')
+    parser.add_argument('--checkpoint_interval', action='store', type=float, default=60.0,
+                        help='Minimum seconds between checkpoints.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue from the last checkpoint saved to the --checkpoint file.')
+    parser.add_argument('-f', '--results_file', action='store', default=None,
+                        help='File to write results to (default stdout).')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write each result to the results file as JSON lines as soon as it completes, instead '
+                             'of holding all results in memory until the end. With several pairs, each pair '
+                             'writes its own file named after the results file.')
+    parser.add_argument('--feedback', action='store_true',
+                        help='Spend part of the airtime on mutations of test cases that the target missed, that '
+                             'broke it, or that it answered slowly, instead of only the generator\'s own cases.')
+    parser.add_argument('--feedback_exploration', action='store', type=float, default=1.0,
+                        help='With --feedback, weight given to the generator\'s own cases against the seeds\' '
+                             'energy; higher values explore more.')
+    parser.add_argument('--prefetch', action='store', type=int, default=0, metavar='DEPTH',
+                        help='Generate up to this many test cases ahead in a background thread, so generating them '
+                             'overlaps with transmitting and waiting on the target (0 to generate inline).')
+    parser.add_argument('--early_stop', action='store_true',
+                        help='Stop repeating a case in later iterations once a sequential probability ratio test '
+                             'shows it is always received or always missed. Each case\'s confidence is recorded in '
+                             'the results.')
+    parser.add_argument('--early_stop_error', action='store', type=float, default=0.05,
+                        help='With --early_stop, acceptable probability of deciding a case wrongly.')
+    parser.add_argument('--timing_interval', action='store', type=float, default=30.0,
+                        help='Seconds between reports of the case rate and the p50/p99 time of each stage, 0 for '
+                             'none. The timings are always recorded in the results.')
+    parser.add_argument('--profile', action='store', default=None, nargs='?', const='deterministic',
+                        choices=['deterministic', 'sampling'],
+                        help='Profile the campaign, writing a pstats file (deterministic, the default) or collapsed '
+                             'stacks for a flame graph (sampling) next to the results file. With several pairs, '
+                             'each pair writes its own profile.')
+    parser.add_argument('--profile_component', action='store', default='all',
+                        choices=['all', 'generator', 'interface', 'harness'],
+                        help='With --profile, only profile calls into this component.')
+    parser.add_argument('--profile_interval', action='store', type=float, default=0.005,
+                        help='With --profile sampling, seconds of CPU time between samples.')
+    parser.add_argument('--minimize', action='store', default=None, metavar='TEST_CASE_HEX',
+                        help='Instead of running the test cases, shrink this test case, which breaks the target, to '
+                             'the smallest variant that still does. With several pairs, variants are checked on '
+                             'all of them at once.')
     parser.add_argument('-h', '--help', action='store_true')
     args, argv = parser.parse_known_args()
 
@@ -83,42 +360,79 @@ if __name__ == '__main__':
     if args.channel is not None:
         tx_interface.set_channel(args.channel)
     usage_interface = tx_interface.add_subparser(subparsers)
-    if args.help:
-        print(usage_interface)
-    else:
-        tx_interface.process_cli(parser, argv)
-        tx_interface.open()
-        print("INFO: Transmit Interface is {}".format(tx_interface))
-
     generator = string_to_class(generators, args.gen)()
     gen_usage = generator.add_subparser(subparsers)
-    if args.help:
-        print(gen_usage)
-    else:
-        generator.process_cli(parser, argv)
-        print("INFO: Generator is {}".format(generator))
-
     harness = string_to_class(harnesses, args.harness)()
     usage_harness = harness.add_subparser(subparsers)
+
+    # If we are doing help, we will quit without actually running the test:
     if args.help:
+        print(usage_interface)
+        print(gen_usage)
         print(usage_harness)
+        sys.exit(0)
+
+    if args.resume and args.checkpoint is None:
+        print("ERROR: Must give --checkpoint to resume from.")
+        sys.exit(-6)
+    if args.stream and args.results_file is None and (args.pair is not None or args.discover_pairs):
+        print("ERROR: Must give a results file (-f) to stream results from several pairs.")
+        sys.exit(-7)
+    if args.prefetch > 0 and args.profile is not None and args.profile_component == 'generator':
+        # The generator does its work on the prefetch thread, which the profilers don't see.
+        print("ERROR: Can't profile only the generator with --prefetch.")
+        sys.exit(-10)
+
+    if args.sweep is None or args.sweep == 'all':
+        sweep_channels = DOT15D4_CHANNELS
     else:
-        harness.process_cli(parser, argv)
-        harness.open()
-        print("INFO: Harness is {}".format(harness))
+        sweep_channels = [int(channel) for channel in args.sweep.split(',')]
 
-    # If we are doing help, we will quit without actually running the test:
-    if args.help:
+    if args.minimize is not None:
+        if args.pair is not None or args.discover_pairs:
+            pairs = [shlex.split(pair) for pair in args.pair] if args.pair is not None else discover_pair_argv()
+        else:
+            pairs = [[]]
+        sys.exit(run_minimize(parser, args, argv, pairs))
+
+    if args.pair is not None or args.discover_pairs:
+        pairs = [shlex.split(pair) for pair in args.pair] if args.pair is not None else discover_pair_argv()
+        if len(pairs) == 0:
+            print("ERROR: No TX/RX pairs available.")
+            sys.exit(-4)
+        if args.sweep is not None:
+            pairs = pairs[:len(sweep_channels)]  # Any more pairs than channels would sit idle
+            run_pair = make_sweep_runner(args, assign_channels(sweep_channels, len(pairs)))
+        else:
+            run_pair = make_shard_runner(args, len(pairs))
+        print("INFO: Running across {} TX/RX pairs.".format(len(pairs)))
+        campaign = ParallelCampaign(make_pair_worker(parser, args, argv, run_pair), pairs)
+        serialized = [res for res in campaign.run() if res is not None]
+        if len(serialized) == 0:
+            print("ERROR: No pair produced results.")
+            sys.exit(-5)
+        if args.stream:
+            print("INFO: Results were streamed to a file per pair.")
+        elif args.sweep is not None:
+            json.dump(merge_channel_results(serialized), open_results_file(args), indent=4)
+        else:
+            json.dump(merge_serializable(serialized), open_results_file(args), indent=4)
         sys.exit(0)
 
-    # TODO: Expose the test cases available as command line flags to remove this hardcoding.
-    from cases.alternator import AlternatorCaseRxFrame
-    case = AlternatorCaseRxFrame(tx_interface, harness, generator)
-    # /TODO
+    open_components(parser, args, argv, tx_interface, generator, harness)
 
     try:
-        results = case.run_test(args.iterations)
-        json.dump(results.serializable(), args.results_file, indent=4)
+        if args.sweep is not None:
+            run_sweep = make_sweep_runner(args, [sweep_channels])
+            results = run_profiled(args, lambda: run_sweep(0, tx_interface, harness, generator),
+                                   tx_interface, harness, generator)
+            if not args.stream:
+                json.dump(merge_channel_results([results]), open_results_file(args), indent=4)
+        else:
+            case = make_case(args, tx_interface, harness, generator, make_checkpoint(args), make_sink(args))
+            results = run_profiled(args, lambda: run_case(args, case), tx_interface, harness, generator)
+            if not args.stream:
+                json.dump(results.serializable(), open_results_file(args), indent=4)
     except Exception as e:
         # If we get an exception we want to shut things down nicely
         print("ERROR: Exception generated from running test, shutting down test: {}".format(e))
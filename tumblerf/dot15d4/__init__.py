@@ -0,0 +1,4 @@
+"""
+Helpers for building 802.15.4 frames which are shared by the generators, cases, interfaces and targets, so none of
+them need scapy or KillerBee just to put a frame together.
+"""
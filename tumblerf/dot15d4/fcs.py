@@ -0,0 +1,106 @@
+"""
+Implements the 802.15.4 FCS, a CRC-16/ITU-T (in its reflected form with zero initial value, also known as
+CRC-16/KERMIT) sent least significant byte first.
+
+fcs() computes it for one frame with a byte-wise lookup table. fcs_batch() computes it for many frames at once: with
+numpy, the frames are packed into a matrix and the table lookups are done a column at a time across every frame, so
+the Python overhead is per byte position rather than per byte of every frame. numpy is only imported by the first
+batch, so importing this module for fcs() alone costs no more than the table.
+"""
+
+import struct
+
+_NOT_IMPORTED = object()
+numpy = _NOT_IMPORTED  # the module, or None if it isn't installed, once load_numpy() has been called
+
+_POLYNOMIAL = 0x8408  # 0x1021 reflected
+
+
+def _make_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for bit in range(8):
+            crc = (crc >> 1) ^ _POLYNOMIAL if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC_TABLE = _make_table()
+_numpy_table = None
+
+
+def load_numpy():
+    """
+    Imports numpy on first use.
+    :return: The numpy module, or None if it isn't installed.
+    """
+    global numpy
+    if numpy is _NOT_IMPORTED:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+    return numpy
+
+
+def crc16(data, crc=0):
+    """
+    :param data: str or bytearray.
+    :param crc: CRC of any data before this, to continue from.
+    :return: The CRC as an int.
+    """
+    table = CRC_TABLE
+    for byte in bytearray(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xff]
+    return crc
+
+
+def fcs(data):
+    """
+    Computes the FCS of a MAC frame (without its FCS), as a drop-in replacement for killerbee.makeFCS.
+    :return: The two bytes to append to the frame.
+    """
+    return struct.pack('<H', crc16(data))
+
+
+def pack_frames(frames):
+    """
+    Packs frames into a numpy matrix with one row per frame, each right-aligned behind leading zeros. Leading zeros
+    don't change a CRC with zero initial value, so every row can be processed over every column without masking.
+    :return: numpy uint8 array of shape (number of frames, length of the longest frame).
+    """
+    load_numpy()
+    width = max(len(frame) for frame in frames) if len(frames) > 0 else 0
+    matrix = numpy.zeros((len(frames), width), dtype=numpy.uint8)
+    for row, frame in enumerate(frames):
+        if len(frame) > 0:
+            matrix[row, width - len(frame):] = numpy.frombuffer(frame, dtype=numpy.uint8)
+    return matrix
+
+
+def crc16_matrix(matrix):
+    """
+    :param matrix: numpy uint8 array with one frame per row, as returned by pack_frames().
+    :return: numpy uint16 array of the CRC of each row.
+    """
+    global _numpy_table
+    if _numpy_table is None:
+        _numpy_table = load_numpy().array(CRC_TABLE, dtype=numpy.uint16)
+    crcs = numpy.zeros(matrix.shape[0], dtype=numpy.uint16)
+    for column in range(matrix.shape[1]):
+        crcs = (crcs >> 8) ^ _numpy_table[(crcs ^ matrix[:, column]) & 0xff]
+    return crcs
+
+
+def fcs_batch(frames):
+    """
+    Computes the FCS of each of a list of frames, using numpy when it is available.
+    :return: List of the two bytes to append to each frame.
+    """
+    if load_numpy() is None or len(frames) == 0:
+        return [fcs(frame) for frame in frames]
+    crcs = crc16_matrix(pack_frames([str(frame) for frame in frames]))
+    packed = crcs.astype('<u2').tostring()
+    return [packed[i:i + 2] for i in range(0, len(packed), 2)]
@@ -0,0 +1,70 @@
+"""
+Implements the Dot15d4FrameLayout class, which takes an 802.15.4 frame apart into its preamble, MAC header and payload
+and rebuilds it, so the minimizer, the feedback scheduler and the generators can change one part of a frame and
+still send a well formed one.
+"""
+
+import struct
+
+from .fcs import fcs
+from .nibbles import from_nibbles, to_nibbles
+from .phy import SFD, find_sfd
+
+_PAD_NIBBLE = 0xf
+
+
+class Dot15d4FrameLayout():
+    def __init__(self, includes_phy=False, header_length=0, has_fcs=True):
+        """
+        Describes how to take apart and rebuild a test case frame, so its variants stay well formed.
+        :param includes_phy: If True, frames start with a preamble, SFD and PHY length byte, and may be shifted by a
+            nibble (with a trailing pad nibble) if the preamble is an odd number of nibbles.
+        :param header_length: Number of leading MAC bytes which are kept intact.
+        :param has_fcs: If True, the MAC frame ends in an FCS, which is recomputed for each variant.
+        """
+        self.__includes_phy = includes_phy
+        self.__header_length = header_length
+        self.__has_fcs = has_fcs
+
+    def __repr__(self):
+        return "{}(PHY={}, header={}, FCS={})".format(self.__class__.__name__, self.__includes_phy,
+                                                     self.__header_length, self.__has_fcs)
+
+    @property
+    def includes_phy(self):
+        return self.__includes_phy
+
+    def split(self, frame):
+        """
+        Takes a frame apart.
+        :return: Tuple of the preamble (as a list of nibbles, or None without a PHY), the header and the payload.
+        """
+        preamble = None
+        mac = frame
+        if self.__includes_phy:
+            nibbles = to_nibbles(frame)
+            start = find_sfd(nibbles)
+            if start is None:
+                raise ValueError("Frame has no SFD.")
+            preamble = nibbles[:start]
+            # After the SFD and length byte, drop any pad nibble so the rest is whole bytes again.
+            sync = nibbles[start:]
+            sync = sync[:len(sync) - len(sync) % 2]
+            mac = from_nibbles(sync)[2:]
+        if self.__has_fcs:
+            mac = mac[:-2]
+        return preamble, mac[:self.__header_length], mac[self.__header_length:]
+
+    def join(self, preamble, header, payload):
+        """
+        Rebuilds a frame from the parts returned by split(), recomputing the FCS and PHY length.
+        """
+        mac = header + payload
+        if self.__has_fcs:
+            mac += fcs(mac)
+        if not self.__includes_phy:
+            return mac
+        nibbles = list(preamble) + to_nibbles(SFD + struct.pack('B', len(mac)) + mac)
+        if len(nibbles) % 2 != 0:
+            nibbles.append(_PAD_NIBBLE)
+        return from_nibbles(nibbles)
@@ -0,0 +1,23 @@
+"""
+Implements packing of the MAC frames the generators send, so generators which only vary such a frame's framing
+(its preamble, or how it is received) don't need scapy to build it.
+"""
+
+import struct
+
+from .fcs import fcs
+
+# Frame control field of a MAC command frame with acknowledgment requested, a short destination address and PAN ID,
+# and no source address, as scapy's Dot15d4FCS(fcf_ackreq=True) / Dot15d4Cmd(...) builds it.
+BEACON_REQUEST_FCF = 0x0823
+BEACON_REQUEST_CMD_ID = 7
+
+
+def beacon_request(pan_id=0xFFFF, short_addr=0x0000, seqnum=0):
+    """
+    Packs a beacon request MAC command, the same frame as str() of the scapy packet
+    Dot15d4FCS(seqnum=seqnum, fcf_ackreq=True) / Dot15d4Cmd(dest_panid=pan_id, dest_addr=short_addr, cmd_id=7).
+    :return: str of the frame, including its FCS.
+    """
+    frame = struct.pack('<HBHHB', BEACON_REQUEST_FCF, seqnum, pan_id, short_addr, BEACON_REQUEST_CMD_ID)
+    return frame + fcs(frame)
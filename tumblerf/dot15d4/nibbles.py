@@ -0,0 +1,103 @@
+"""
+Implements nibble operations on frames with lookup tables, so shifting a frame by half a byte (as an odd-length
+preamble needs) costs about as much as copying it. to_nibbles() and from_nibbles() convert between a frame and a
+list of its nibbles, for code that works on a frame a nibble at a time.
+
+802.15.4 sends the low nibble of each byte first. insert_first_last() shifts a frame later by one nibble in that
+order, sending a nibble before it and another after it. It does so with two 256-entry tables applied by
+str.translate(): one moving each byte's high nibble down, the other moving its low nibble up. The halves of each
+output byte come from neighbouring input bytes, and are combined by adding the two translations as integers, since
+their nibbles never overlap. insert_first_last_batch() shifts many frames at once with numpy, imported on first use
+as by the fcs module.
+"""
+
+from . import fcs
+
+SWAP_TABLE = "".join(chr(((byte & 0x0f) << 4) | (byte >> 4)) for byte in range(256))
+_HIGH_DOWN_TABLE = "".join(chr(byte >> 4) for byte in range(256))
+_LOW_UP_TABLE = "".join(chr((byte & 0x0f) << 4) for byte in range(256))
+
+
+def to_nibbles(frame):
+    """
+    Splits a frame into nibbles in the order they are sent, low nibble of each byte first.
+    """
+    nibbles = []
+    for byte in bytearray(frame):
+        nibbles.append(byte & 0x0f)
+        nibbles.append(byte >> 4)
+    return nibbles
+
+
+def from_nibbles(nibbles):
+    """
+    Joins nibbles, in the order they are sent, back into a frame. There must be an even number of them.
+    """
+    if len(nibbles) % 2 != 0:
+        raise ValueError("Must provide an even number of nibbles.")
+    return str(bytearray(nibbles[i] | (nibbles[i + 1] << 4) for i in range(0, len(nibbles), 2)))
+
+
+def nibble_swap(data):
+    """
+    Swaps the nibbles of every byte.
+    :param data: str or bytearray.
+    :return: str
+    """
+    return str(data).translate(SWAP_TABLE)
+
+
+def insert_first_last(data, nibbles):
+    """
+    Shifts a frame by half a byte, in the order nibbles are sent: the high nibble of `nibbles` is sent before the
+    frame, and its low nibble after it, so the result is one byte longer.
+    :param data: str of the frame.
+    :param nibbles: str of one byte giving the nibbles to send before and after.
+    :return: str
+    """
+    data = str(data)
+    # Output byte k is the high nibble of byte k-1 in the low half and the low nibble of byte k in the high half,
+    # with `nibbles` standing in for the bytes before the first and after the last.
+    lows = (nibbles + data).translate(_HIGH_DOWN_TABLE)
+    highs = (data + nibbles).translate(_LOW_UP_TABLE)
+    combined = int(lows.encode('hex'), 16) + int(highs.encode('hex'), 16)
+    return ("%0*x" % (2 * len(lows), combined)).decode('hex')
+
+
+def insert_first_last_matrix(matrix, nibbles):
+    """
+    As insert_first_last(), for a batch of equal length frames.
+    :param matrix: numpy uint8 array with one frame per row.
+    :param nibbles: str of one byte, as for insert_first_last().
+    :return: numpy uint8 array with one more column than the matrix.
+    """
+    numpy = fcs.load_numpy()
+    fill = ord(nibbles)
+    rows, width = matrix.shape
+    before = numpy.empty((rows, width + 1), dtype=numpy.uint8)
+    after = numpy.empty((rows, width + 1), dtype=numpy.uint8)
+    before[:, 0] = fill
+    before[:, 1:] = matrix
+    after[:, :width] = matrix
+    after[:, width] = fill
+    return (before >> 4) | ((after & 0x0f) << 4)
+
+
+def insert_first_last_batch(frames, nibbles):
+    """
+    As insert_first_last(), for a list of frames. With numpy, frames of the same length are shifted together.
+    :return: List of the shifted frames, in the order given.
+    """
+    numpy = fcs.load_numpy()
+    if numpy is None:
+        return [insert_first_last(frame, nibbles) for frame in frames]
+    by_length = {}
+    for index, frame in enumerate(frames):
+        by_length.setdefault(len(frame), []).append(index)
+    shifted = [None] * len(frames)
+    for length, indexes in by_length.iteritems():
+        matrix = numpy.frombuffer("".join(str(frames[i]) for i in indexes), dtype=numpy.uint8)
+        rows = insert_first_last_matrix(matrix.reshape(len(indexes), length), nibbles)
+        for index, row in zip(indexes, rows):
+            shifted[index] = row.tostring()
+    return shifted
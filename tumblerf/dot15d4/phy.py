@@ -0,0 +1,39 @@
+"""
+Implements the parts of the 802.15.4 PHY framing which are shared by the generators, cases, interfaces and targets:
+the SFD, and synchronizing on it as a receiver does, which may be mid-byte when the preamble is an odd number of
+nibbles.
+"""
+
+from .nibbles import from_nibbles, to_nibbles
+
+SFD = "\xa7"
+_SFD_NIBBLES = [0x7, 0xa]  # Nibbles go over the air low nibble first
+
+
+def find_sfd(nibbles):
+    """
+    Finds where a receiver would synchronize on a frame: the first SFD with room for the PHY length after it.
+    :param nibbles: List of the frame's nibbles, in the order they are sent (see to_nibbles()).
+    :return: Index of the SFD's first nibble, or None if the frame has no SFD and PHY length.
+    """
+    for start in range(len(nibbles) - 3):
+        if nibbles[start:start + 2] == _SFD_NIBBLES:
+            return start
+    return None
+
+
+def split_phy(frame):
+    """
+    Emulates a receiver synchronizing on a frame: it looks for the SFD, and takes the PSDU that follows it, of the
+    length given by the PHY header.
+    :return: Tuple of the nibbles before the SFD and the PSDU, which may be truncated if the frame is shorter than
+        its PHY header says, or None if the frame has no SFD and PHY header.
+    """
+    nibbles = to_nibbles(frame)
+    start = find_sfd(nibbles)
+    if start is None:
+        return None
+    body = nibbles[start + 2:]
+    body = from_nibbles(body[:len(body) - len(body) % 2])
+    length = ord(body[0]) & 0x7f
+    return nibbles[:start], body[1:1 + length]
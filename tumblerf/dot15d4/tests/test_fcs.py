@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from .. import fcs as fcs_module
+from ..fcs import crc16, fcs, fcs_batch
+
+
+class TestFcs(object):
+
+    def test_check_value(self):
+        # The standard check value of CRC-16/KERMIT.
+        assert crc16("123456789") == 0x2189
+        assert fcs("123456789") == "\x89\x21"
+        assert fcs("") == "\x00\x00"
+
+    def test_continues(self):
+        assert crc16("6789", crc16("12345")) == crc16("123456789")
+
+    def test_matches_scapy(self):
+        dot15d4 = pytest.importorskip("scapy.layers.dot15d4")
+        pkt = dot15d4.Dot15d4FCS(seqnum=42, fcf_ackreq=True) / dot15d4.Dot15d4Cmd(dest_panid=0xABCD, cmd_id=7)
+        frame = str(pkt)
+        assert fcs(frame[:-2]) == frame[-2:]
+
+    def test_batch(self):
+        rng = random.Random(1)
+        frames = ["", "\x00", "123456789"] + \
+                 ["".join(chr(rng.randint(0, 255)) for _ in range(rng.randint(1, 127))) for _ in range(50)]
+        assert fcs_batch(frames) == [fcs(frame) for frame in frames]
+        assert fcs_batch([bytearray("123456789")]) == ["\x89\x21"]
+        assert fcs_batch([]) == []
+
+    def test_batch_without_numpy(self, monkeypatch):
+        monkeypatch.setattr(fcs_module, "numpy", None)
+        assert fcs_batch(["123456789", "\x00"]) == ["\x89\x21", "\x00\x00"]
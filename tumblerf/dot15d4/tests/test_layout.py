@@ -0,0 +1,25 @@
+import pytest
+
+from ..layout import Dot15d4FrameLayout
+
+HEADER = "\x41\x88\x01\x34\x12\xff\xff\x00\x00"
+
+
+class TestDot15d4FrameLayout(object):
+
+    def test_mac_layout(self):
+        layout = Dot15d4FrameLayout(header_length=len(HEADER))
+        frame = layout.join(None, HEADER, "\x01\x02\x03")
+        assert frame[:-2] == HEADER + "\x01\x02\x03"
+        assert layout.split(frame) == (None, HEADER, "\x01\x02\x03")
+
+    def test_phy_layout(self):
+        layout = Dot15d4FrameLayout(includes_phy=True, header_length=len(HEADER))
+        for preamble in ([0] * 8, [0] * 7, [], [0xf]):
+            frame = layout.join(preamble, HEADER, "\xaa")
+            assert layout.split(frame) == (preamble, HEADER, "\xaa")
+
+    def test_no_sfd(self):
+        layout = Dot15d4FrameLayout(includes_phy=True, header_length=len(HEADER))
+        with pytest.raises(ValueError):
+            layout.split("\x00\x00" + HEADER)
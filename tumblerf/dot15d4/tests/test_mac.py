@@ -0,0 +1,19 @@
+import pytest
+
+from ..fcs import fcs
+from ..mac import beacon_request
+
+
+class TestMac(object):
+
+    def test_beacon_request(self):
+        frame = beacon_request(0xFFFF, 0x0000, 0)
+        assert frame[:-2] == "\x23\x08\x00\xff\xff\x00\x00\x07"
+        assert fcs(frame[:-2]) == frame[-2:]
+
+    def test_matches_scapy(self):
+        dot15d4 = pytest.importorskip("scapy.layers.dot15d4")
+        for pan_id, short_addr, seqnum in [(0xFFFF, 0x0000, 0), (0xABCD, 0xBEEF, 42), (0x1234, 0xFFFF, 255)]:
+            pkt = dot15d4.Dot15d4FCS(seqnum=seqnum, fcf_ackreq=True) / \
+                  dot15d4.Dot15d4Cmd(dest_panid=pan_id, dest_addr=short_addr, cmd_id=7)
+            assert beacon_request(pan_id, short_addr, seqnum) == str(pkt)
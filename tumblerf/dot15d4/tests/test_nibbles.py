@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from .. import fcs as fcs_module
+from ..nibbles import from_nibbles, insert_first_last, insert_first_last_batch, nibble_swap, to_nibbles
+
+
+def reference_insert_first_last(data, fill):
+    # Nibble by nibble, in the order they are sent.
+    fill = ord(fill)
+    return from_nibbles([fill >> 4] + to_nibbles(data) + [fill & 0x0f])
+
+
+def random_frames(count, seed=1):
+    rng = random.Random(seed)
+    return ["".join(chr(rng.randint(0, 255)) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+class TestNibbles(object):
+
+    def test_to_from_nibbles(self):
+        assert to_nibbles("\xa7\x01") == [0x7, 0xa, 0x1, 0x0]
+        assert from_nibbles(to_nibbles("\x00\xa7\x10")) == "\x00\xa7\x10"
+        with pytest.raises(ValueError):
+            from_nibbles([1, 2, 3])
+
+    def test_nibble_swap(self):
+        assert nibble_swap("\x12\xab\x00") == "\x21\xba\x00"
+        assert nibble_swap(bytearray("\xf0")) == "\x0f"
+
+    def test_insert_first_last(self):
+        assert insert_first_last("\xa7\x0a", "\x0f") == "\x70\xaa\xf0"
+        assert insert_first_last("", "\x5a") == "\xa5"
+        for frame in random_frames(50):
+            assert insert_first_last(frame, "\x0f") == reference_insert_first_last(frame, "\x0f")
+
+    def test_batch(self):
+        frames = random_frames(50) + ["\xa7\x0a"] * 3
+        assert insert_first_last_batch(frames, "\x0f") == [reference_insert_first_last(f, "\x0f") for f in frames]
+        assert insert_first_last_batch([], "\x0f") == []
+
+    def test_batch_without_numpy(self, monkeypatch):
+        monkeypatch.setattr(fcs_module, "numpy", None)
+        assert insert_first_last_batch(["\xa7\x0a"], "\x0f") == ["\x70\xaa\xf0"]
@@ -0,0 +1,20 @@
+from ..nibbles import to_nibbles
+from ..phy import SFD, find_sfd, split_phy
+
+PSDU = "\x03\x08\x01\xff\xff\xff\xff\x07"
+
+
+class TestPhy(object):
+
+    def test_find_sfd(self):
+        assert find_sfd(to_nibbles("\x00\x00" + SFD + "\x08")) == 4
+        # After a preamble of an odd number of nibbles, the SFD starts mid-byte
+        assert find_sfd(to_nibbles("\x00\x70\x8a\x00")) == 3
+        # The SFD needs the PHY length after it
+        assert find_sfd(to_nibbles("\x00\x00" + SFD)) is None
+        assert find_sfd(to_nibbles(PSDU)) is None
+
+    def test_split_phy(self):
+        assert split_phy("\x00\x00" + SFD + chr(len(PSDU)) + PSDU) == ([0] * 4, PSDU)
+        assert split_phy("\x00\x00" + SFD + chr(len(PSDU)) + PSDU[:-2]) == ([0] * 4, PSDU[:-2])
+        assert split_phy(PSDU) is None
@@ -1,3 +1,8 @@
+import itertools
+
+from .frame_batch import DEFAULT_BATCH_SIZE, FrameBatch
+
+
 
 class BaseTestCaseGenerator():
     def __init__(self, includes_phy=False, includes_mac=False):
@@ -109,6 +114,96 @@ class BaseTestCaseGenerator():
         """
         raise NotImplementedError
 
+    def yield_test_case_from(self, start, count, constraints=None):
+        """
+        Yields the same test cases as yield_test_case(), but starting from the one at index `start`, for example
+        to resume an interrupted run. Any state from get_state() is left as it was when iteration began, so it
+        carries on from where it was restored to rather than from after the skipped cases.
+        By default the skipped cases are still generated (but not returned); generators which can compute their
+        cases by position should override this to jump straight to `start`.
+        :param start: Index of the first test case to yield.
+        """
+        cases = self.yield_test_case(count, constraints=constraints)
+        state = self.get_state()
+        for i in range(start):
+            if next(cases, None) is None:
+                return
+        self.set_state(state)
+        for tc in cases:
+            yield tc
+
+    def yield_test_case_batch(self, count, batch_size=DEFAULT_BATCH_SIZE, constraints=None):
+        """
+        Yields the same test cases as yield_test_case(), packed into FrameBatch objects of up to `batch_size` test
+        cases each, for code which works on many frames at once.
+        By default the test cases are taken one at a time from yield_test_case(); generators which can build a
+        batch more cheaply should override this.
+        :param batch_size: Maximum number of test cases per batch.
+        :yield: FrameBatch
+        """
+        cases = self.yield_test_case(count, constraints=constraints)
+        while True:
+            batch = FrameBatch.from_frames(itertools.islice(cases, batch_size))
+            if len(batch) == 0:
+                return
+            yield batch
+
+    def get_state(self):
+        """
+        Returns a JSON-serializable dict of any state the generator carries between test cases, such as sequence
+        numbers, so a checkpoint can later restore it with set_state(). Generators without such state need not
+        override this.
+        :return: dict
+        """
+        return {}
+
+    def set_state(self, state):
+        """
+        Restores state previously returned by get_state().
+        :param state: dict
+        """
+        pass
+
+    def renumber_test_case(self, test_case):
+        """
+        Gives a test case the next sequence number (or other per-case state) this generator would have used, and
+        advances it, as if the test case had only just been generated. This lets test cases be generated ahead of
+        when they are sent (see PrefetchGenerator) while the numbers still follow the order they are sent in,
+        interleaved with control cases. Generators whose test cases don't depend on state carried between them
+        return the test case unchanged.
+        :param test_case: A test case string from this generator.
+        :return: The renumbered test case string.
+        """
+        return test_case
+
+    def get_frame_layout(self):
+        """
+        Describes the structure of the test cases, so that a test case which breaks the target can be minimized
+        without producing malformed frames. Generators whose test cases can't be minimized return None.
+        :return: dict with "header_length", the number of leading MAC bytes to keep intact, and "has_fcs", whether
+            the MAC frame ends in an FCS; or None.
+        """
+        return None
+
+    def describe_extra_case(self, test_case):
+        """
+        Describes a test case yielded in addition to this generator's own numbered sequence, such as a mutant
+        inserted by FeedbackScheduler. The case records such test cases without a case number, so their outcomes
+        aren't mixed with those of the numbered cases, and adds the raw data returned to their TestResult.
+        :param test_case: A test case string yielded by this generator.
+        :return: dict of raw data, or None if it is one of the generator's own cases.
+        """
+        return None
+
+    def record_outcome(self, test_case, test_result):
+        """
+        Called by the case with the result of each test case this generator produced, once it is final, so that
+        generators which adapt to the target's behavior can do so. By default outcomes are ignored.
+        :param test_case: The test case string.
+        :param test_result: Its TestResult.
+        """
+        pass
+
     def get_test_case(self, constraints=None):
         """
         Returns a single test case string.
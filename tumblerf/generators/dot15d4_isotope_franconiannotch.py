@@ -1,9 +1,15 @@
 from .base import BaseTestCaseGenerator
 from .dot15d4_isotope_preamblelength import Dot15d4PreambleLengthGenerator
-from scapy.layers.dot15d4 import Dot15d4FCS, Dot15d4Cmd
+from .frame_batch import DEFAULT_BATCH_SIZE, FrameBatch
+from .frame_template import FrameTemplate, renumber_frame
 import struct
-
-SFD = "\xa7"
+# TODO: Clean up this import:
+try:
+    from ..dot15d4.layout import Dot15d4FrameLayout
+    from ..dot15d4.mac import beacon_request
+except ValueError:
+    from dot15d4.layout import Dot15d4FrameLayout
+    from dot15d4.mac import beacon_request
 
 
 class Dot15d4FranconianNotchGenerator(Dot15d4PreambleLengthGenerator, BaseTestCaseGenerator):
@@ -12,6 +18,8 @@ class Dot15d4FranconianNotchGenerator(Dot15d4PreambleLengthGenerator, BaseTestCa
         self.__target_pan_id = 0xFFFF
         self.__target_short_addr = 0x0000
         self.__start_seqnum = 0
+        self.__template = None
+        self.__layout = None
 
     # The following should be able to be provided by Dot15d4PreambleLengthGenerator:
     # set_target(self, pan_id, short_addr)
@@ -19,6 +27,7 @@ class Dot15d4FranconianNotchGenerator(Dot15d4PreambleLengthGenerator, BaseTestCa
     def set_target(self, pan_id, short_addr):
         self.__target_pan_id = pan_id
         self.__target_short_addr = short_addr
+        self.__template = None
 
     def set_start_seqnum(self, value):
         if value >= 0 and value <= 0xff:
@@ -29,8 +38,32 @@ class Dot15d4FranconianNotchGenerator(Dot15d4PreambleLengthGenerator, BaseTestCa
     def get_target_pan_id(self):
         return self.__target_pan_id
 
+    def get_state(self):
+        return {'seqnum': self.__start_seqnum}
+
+    def set_state(self, state):
+        if 'seqnum' in state:
+            self.set_start_seqnum(state['seqnum'])
+
+    def renumber_test_case(self, test_case):
+        if self.__layout is None:
+            self.__layout = Dot15d4FrameLayout(includes_phy=True, **self.get_frame_layout())
+        seqnum = self.__start_seqnum
+        self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
+        return renumber_frame(test_case, self.__layout, seqnum)
+
     # TODO: Debug and remove the above from this class as they should not need duplication.
 
+    def __get_template(self):
+        """
+        The beacon request is built once, with its SFD and PHY length, and rendered from that template with each
+        test case's sequence number.
+        """
+        if self.__template is None:
+            self.__template = FrameTemplate(beacon_request(self.__target_pan_id, self.__target_short_addr),
+                                            phy_header=True)
+        return self.__template
+
     def yield_control_case(self, count=1):
         for case in self.yield_test_case(count, {
             'max_fill': 0  # we want 0 nibbles filled
@@ -46,6 +79,14 @@ class Dot15d4FranconianNotchGenerator(Dot15d4PreambleLengthGenerator, BaseTestCa
             Optionally have the key 'fill_byte' to specify a byte (as a string) to fill with. Default="\xff"
         :yield: A byte array generated as a possible test case.
         """
+        return self.yield_test_case_from(0, count, constraints=constraints)
+
+    @staticmethod
+    def __get_fill(constraints):
+        """
+        :return: Tuple of the minimum and maximum number of nibbles to fill, and the fill byte, from the constraints
+            or the defaults.
+        """
         if constraints is None:
             max_fill = 8
             min_fill = 0
@@ -60,27 +101,48 @@ class Dot15d4FranconianNotchGenerator(Dot15d4PreambleLengthGenerator, BaseTestCa
             fill_byte = constraints.get('fill_byte', "\xff")
             if type(fill_byte) is not str or len(fill_byte) != 1:
                 raise ValueError("If provide a constraint with key 'fill_byte', it must be an single-byte string.")
+        return min_fill, max_fill, fill_byte
 
-        for i in range(count):
-            for f_len in range(min_fill, max_fill+1):
-                # Create a beacon request frame:
-                pkt = Dot15d4FCS(seqnum=self.__start_seqnum, fcf_ackreq=True) / \
-                      Dot15d4Cmd(dest_panid=self.__target_pan_id, dest_addr=self.__target_short_addr, cmd_id=7)
+    @staticmethod
+    def __make_preamble(f_len, fill_byte):
+        """
+        :return: The four byte preamble with its last `f_len` nibbles turned to fill.
+        """
+        if (f_len%2) != 0:
+            fb = ord(fill_byte)
+            fb = (((fb >> 4)) << 4)  # move symbol to high nibble so sent last, clear low
+            fb = struct.pack('B', fb)
+            return ("\x00" * ((8 - f_len - 1) / 2)) + fb + (fill_byte * (f_len/2))
+        else:
+            return ("\x00" * ((8 - f_len) / 2)) + (fill_byte * (f_len/2))
+
+    def yield_test_case_from(self, start, count, constraints=None):
+        """
+        As yield_test_case(), but starting at the test case with index `start`, without generating those before it.
+        """
+        min_fill, max_fill, fill_byte = self.__get_fill(constraints)
+        fills_per_count = max_fill + 1 - min_fill
+        template = self.__get_template()
+        for index in range(start, count * fills_per_count):
+            f_len = min_fill + index % fills_per_count
+            # The beacon request, with the SFD and length of the packet at the front as we provide the PHY items:
+            syncpkt = template.render(self.__start_seqnum)
+            self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
+            yield self.__make_preamble(f_len, fill_byte) + syncpkt
+
+    def yield_test_case_batch(self, count, batch_size=DEFAULT_BATCH_SIZE, constraints=None):
+        """
+        As yield_test_case(), packed into FrameBatch objects. There are only as many preambles as fill lengths, so
+        they are made once and each test case is written into the batch as its preamble and beacon request.
+        """
+        min_fill, max_fill, fill_byte = self.__get_fill(constraints)
+        preambles = [self.__make_preamble(f_len, fill_byte) for f_len in range(min_fill, max_fill + 1)]
+        template = self.__get_template()
+        total = count * len(preambles)
+        for first in range(0, total, batch_size):
+            batch = FrameBatch()
+            for index in range(first, min(first + batch_size, total)):
+                batch.append(preambles[index % len(preambles)], template.render(self.__start_seqnum))
                 self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
-                # This will contain the FCS due to Dot15d4FCS:
-                syncpkt = str(pkt)
-                # As we are providing the PHY items, we add the SFD and length of the packet to the front:
-                syncpkt = SFD + struct.pack('b', len(syncpkt)) + syncpkt
-                #print("Beacon Request Formed: {}".format(syncpkt.encode('hex')))
-                #Dot15d4FCS(syncpkt).show()
-
-                if (f_len%2) != 0:
-                    fb = ord(fill_byte)
-                    fb = (((fb >> 4)) << 4)  # move symbol to high nibble so sent last, clear low
-                    fb = struct.pack('B', fb)
-                    preamble = ("\x00" * ((8 - f_len - 1) / 2)) + fb + (fill_byte * (f_len/2))
-                else:
-                    preamble = ("\x00" * ((8 - f_len) / 2)) + (fill_byte * (f_len/2))
-
-                yield preamble+syncpkt
+            yield batch
 
@@ -1,10 +1,15 @@
-import bitstring
-import struct
-from scapy.layers.dot15d4 import Dot15d4FCS, Dot15d4Cmd
-
 from .base import BaseTestCaseGenerator
-
-SFD = "\xa7"
+from .frame_batch import DEFAULT_BATCH_SIZE, FrameBatch
+from .frame_template import FrameTemplate, renumber_frame
+# TODO: Clean up this import:
+try:
+    from ..dot15d4 import nibbles
+    from ..dot15d4.layout import Dot15d4FrameLayout
+    from ..dot15d4.mac import beacon_request
+except ValueError:
+    from dot15d4 import nibbles
+    from dot15d4.layout import Dot15d4FrameLayout
+    from dot15d4.mac import beacon_request
 
 
 class Dot15d4PreambleLengthGenerator(BaseTestCaseGenerator):
@@ -13,10 +18,13 @@ class Dot15d4PreambleLengthGenerator(BaseTestCaseGenerator):
         self.__target_pan_id = 0xFFFF
         self.__target_short_addr = 0x0000
         self.__start_seqnum = 0
+        self.__template = None
+        self.__layout = None
 
     def set_target(self, pan_id, short_addr):
         self.__target_pan_id = pan_id
         self.__target_short_addr = short_addr
+        self.__template = None
 
     def set_start_seqnum(self, value):
         if value >= 0 and value <= 0xff:
@@ -24,6 +32,36 @@ class Dot15d4PreambleLengthGenerator(BaseTestCaseGenerator):
         else:
             raise ValueError("Sequence number must be between 0x00 and 0xFF.")
 
+    def get_state(self):
+        return {'seqnum': self.__start_seqnum}
+
+    def set_state(self, state):
+        if 'seqnum' in state:
+            self.set_start_seqnum(state['seqnum'])
+
+    def __get_template(self):
+        """
+        The beacon request only differs between test cases by its sequence number (and so FCS), so it is built
+        once, with its SFD and PHY length, and rendered from that template for each test case.
+        """
+        if self.__template is None:
+            self.__template = FrameTemplate(beacon_request(self.__target_pan_id, self.__target_short_addr),
+                                            phy_header=True)
+        return self.__template
+
+    def get_frame_layout(self):
+        """
+        The beacon request is kept whole, so only the preamble is minimized.
+        """
+        return {"header_length": len(beacon_request()) - 2, "has_fcs": True}
+
+    def renumber_test_case(self, test_case):
+        if self.__layout is None:
+            self.__layout = Dot15d4FrameLayout(includes_phy=True, **self.get_frame_layout())
+        seqnum = self.__start_seqnum
+        self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
+        return renumber_frame(test_case, self.__layout, seqnum)
+
     def add_subparser(self, subparsers):
         parser = subparsers.add_parser(self.__class__.__name__, help='Argument parser for generator')
         parser.add_argument('--max_preamb_len', action='store', type=int, default=10)
@@ -52,6 +90,12 @@ class Dot15d4PreambleLengthGenerator(BaseTestCaseGenerator):
             Optionally the key 'min_preamb_len' to fix a minimum length of the preamble.
         :yield: A byte array generated as a possible test case.
         """
+        return self.yield_test_case_from(0, count, constraints=constraints)
+
+    def __get_preamble_lengths(self, constraints):
+        """
+        :return: Tuple of the minimum and maximum preamble lengths, from the constraints or the defaults.
+        """
         max_preamb_len = constraints.get('preamb_len') if constraints is not None else None
         if max_preamb_len is not None and type(max_preamb_len) is not int:
             raise ValueError("If provide a constraint with key 'preamb_len', it must be an integer.")
@@ -67,46 +111,62 @@ class Dot15d4PreambleLengthGenerator(BaseTestCaseGenerator):
             min_preamb_len = self.get_default_constraint('min_preamb_len', int)
         if min_preamb_len is None:
             min_preamb_len = 0 # default value
+        return min_preamb_len, max_preamb_len
 
-        for i in range(count):
-            for preamb_len in range(min_preamb_len, max_preamb_len):
-                # Create a beacon request frame:
-                pkt = Dot15d4FCS(seqnum=self.__start_seqnum, fcf_ackreq=True) / \
-                      Dot15d4Cmd(dest_panid=self.__target_pan_id, dest_addr=self.__target_short_addr, cmd_id=7)
+    def yield_test_case_from(self, start, count, constraints=None):
+        """
+        As yield_test_case(), but starting at the test case with index `start`, without generating those before it.
+        """
+        min_preamb_len, max_preamb_len = self.__get_preamble_lengths(constraints)
+        lengths_per_count = max_preamb_len - min_preamb_len
+        template = self.__get_template()
+        for index in range(start, count * lengths_per_count):
+            preamb_len = min_preamb_len + index % lengths_per_count
+            # The beacon request, with the SFD and length of the packet at the front as we provide the PHY items:
+            syncpkt = template.render(self.__start_seqnum)
+            self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
+            if (preamb_len % 2) != 0:
+                pkt_bytes = ("\x00" * (preamb_len / 2)) + nibbles.insert_first_last(syncpkt, "\x0f")
+            else:
+                pkt_bytes = ("\x00" * (preamb_len / 2)) + syncpkt
+            yield pkt_bytes
+
+    def yield_test_case_batch(self, count, batch_size=DEFAULT_BATCH_SIZE, constraints=None):
+        """
+        As yield_test_case(), packed into FrameBatch objects. The beacon requests of each batch which follow an odd
+        number of preamble nibbles are shifted together.
+        """
+        min_preamb_len, max_preamb_len = self.__get_preamble_lengths(constraints)
+        lengths_per_count = max_preamb_len - min_preamb_len
+        template = self.__get_template()
+        total = count * lengths_per_count
+        for first in range(0, total, batch_size):
+            preamb_lens = [min_preamb_len + index % lengths_per_count
+                           for index in range(first, min(first + batch_size, total))]
+            syncpkts = []
+            for _ in preamb_lens:
+                syncpkts.append(template.render(self.__start_seqnum))
                 self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
-                # This will contain the FCS due to Dot15d4FCS:
-                syncpkt = str(pkt)
-                # As we are providing the PHY items, we add the SFD and length of the packet to the front:
-                syncpkt = SFD + struct.pack('b', len(syncpkt)) + syncpkt
-                #print("Beacon Request Formed: {}".format(syncpkt.encode('hex')))
-                #Dot15d4FCS(syncpkt).show()
-                if (preamb_len % 2) != 0:
-                    pkt_bytes = ("\x00" * (preamb_len / 2)) + NibbleTools.insert_first_last(syncpkt, "\x0f")
-                else:
-                    pkt_bytes = ("\x00" * (preamb_len / 2)) + syncpkt
-                yield pkt_bytes
+            odd = [i for i, preamb_len in enumerate(preamb_lens) if (preamb_len % 2) != 0]
+            shifted = nibbles.insert_first_last_batch([syncpkts[i] for i in odd], "\x0f")
+            for i, syncpkt in zip(odd, shifted):
+                syncpkts[i] = syncpkt
+            batch = FrameBatch()
+            for preamb_len, syncpkt in zip(preamb_lens, syncpkts):
+                batch.append("\x00" * (preamb_len / 2), syncpkt)
+            yield batch
 
 
 class NibbleTools():
+    """
+    Kept for existing callers; the work is done with lookup tables by tumblerf.dot15d4.nibbles.
+    """
     @staticmethod
     def insert_first_last(s, i):
         #first nibble of i goes at beginning
         #last nibble of i goes at end
-        b = bitstring.BitArray(bytes=s)
-
-        #swap
-        swapped = NibbleTools.nibble_swap(b)
-        i = bitstring.BitArray(bytes=i)
-        swapped.prepend(i[0:4])
-        swapped.append(i[4:8])
-        return NibbleTools.nibble_swap(swapped).tobytes()
+        return nibbles.insert_first_last(s, i)
 
     @staticmethod
     def nibble_swap(b):
-        # assumes b is a bitstring
-        l = len(b)
-        for i in [n*8 for n in range(0,l/8)]:
-            first = b[i:i+4]
-            b[i:i+4] = b[i+4:i+8]
-            b[i+4:i+8] = first
-        return b
+        return nibbles.nibble_swap(b)
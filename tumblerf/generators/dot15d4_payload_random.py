@@ -1,7 +1,17 @@
 from .base import BaseTestCaseGenerator
-from scapy.layers.dot15d4 import Dot15d4FCS, Dot15d4Data
+from .frame_batch import DEFAULT_BATCH_SIZE, FrameBatch
+from .frame_template import FrameTemplate, renumber_frame
+# TODO: Clean up this import:
+try:
+    from ..dot15d4.fcs import fcs, fcs_batch
+    from ..dot15d4.layout import Dot15d4FrameLayout
+except ValueError:
+    from dot15d4.fcs import fcs, fcs_batch
+    from dot15d4.layout import Dot15d4FrameLayout
+from scapy.layers.dot15d4 import Dot15d4, Dot15d4FCS, Dot15d4Data
 from scapy.packet import fuzz, Packet, bind_layers
 from scapy.fields import StrFixedLenField
+import itertools
 import random
 
 MAX_DOT15D4_LENGTH=120
@@ -36,14 +46,18 @@ class Dot15d4RandomPayloadGenerator(BaseTestCaseGenerator):
         self.__target_short_addr = None
         self.__src_short_addr = None
         self.__start_seqnum = 0
+        self.__control_template = None
+        self.__layout = None
 
     def set_target(self, pan_id, short_addr):
         self.__target_pan_id = pan_id
         self.__target_short_addr = short_addr
+        self.__control_template = None
 
     def set_source(self, short_addr):
         #TODO: Add long addresses
         self.__src_short_addr = short_addr
+        self.__control_template = None
 
     def set_start_seqnum(self, value):
         if value >= 0 and value <= 0xff:
@@ -51,20 +65,52 @@ class Dot15d4RandomPayloadGenerator(BaseTestCaseGenerator):
         else:
             raise ValueError("Sequence number must be between 0x00 and 0xFF.")
 
+    def get_state(self):
+        return {'seqnum': self.__start_seqnum}
+
+    def set_state(self, state):
+        if 'seqnum' in state:
+            self.set_start_seqnum(state['seqnum'])
+
     #TODO: Add set of values from a sample Scapy packet
 
     #def load_samples_from_pcap(self, pcap_filename):
     #    self.add_sample()
 
     def yield_control_case(self, count=1):
-        pkt = Dot15d4FCS(fcf_srcaddrmode=2, fcf_ackreq=True, fcf_destaddrmode=2, fcf_panidcompress=True) / \
-              Dot15d4Data(dest_panid=self.__target_pan_id, dest_addr=self.__target_short_addr, src_addr=self.__src_short_addr)
+        # The control case only differs by its sequence number, so it is built through scapy once and rendered
+        # from that template after.
+        if self.__control_template is None:
+            pkt = Dot15d4FCS(fcf_srcaddrmode=2, fcf_ackreq=True, fcf_destaddrmode=2, fcf_panidcompress=True) / \
+                  Dot15d4Data(dest_panid=self.__target_pan_id, dest_addr=self.__target_short_addr, src_addr=self.__src_short_addr)
+            self.__control_template = FrameTemplate.from_packet(pkt)
         for i in range(count):
-            pkt.seqnum = self.__start_seqnum
-            result = str(pkt)
+            result = self.__control_template.render(self.__start_seqnum)
             self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
             yield result
 
+    def get_frame_layout(self):
+        """
+        The frame control, sequence number, PAN ID and addresses are kept, so only the random payload is minimized.
+        """
+        header = Dot15d4FCS(fcf_srcaddrmode=2, fcf_destaddrmode=2, fcf_panidcompress=True) / \
+                 Dot15d4Data(dest_panid=self.__target_pan_id, dest_addr=self.__target_short_addr, src_addr=self.__src_short_addr)
+        return {"header_length": len(str(header)) - 2, "has_fcs": True}
+
+    def renumber_test_case(self, test_case):
+        # The header is the same length whatever the addresses, so the layout needn't be rebuilt when they change.
+        if self.__layout is None:
+            self.__layout = Dot15d4FrameLayout(includes_phy=False, **self.get_frame_layout())
+        seqnum = self.__start_seqnum
+        self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
+        return renumber_frame(test_case, self.__layout, seqnum)
+
+    def yield_test_case_from(self, start, count, constraints=None):
+        """
+        As each test case is independently random, resuming at `start` only needs the remaining count of them.
+        """
+        return self.yield_test_case(max(count - start, 0), constraints=constraints)
+
     def yield_test_case(self, count, constraints=None):
         """
         Is a Python generator which yields potential test cases to use.
@@ -72,26 +118,54 @@ class Dot15d4RandomPayloadGenerator(BaseTestCaseGenerator):
         :yield: A byte array generated as a possible test case.
         """
         check_valid = constraints.get('check_valid', True) if constraints is not None else True
+        for pb, pb_fcs in self.__yield_frames(count, check_valid):
+            yield pb + (pb_fcs if pb_fcs is not None else fcs(pb))
+
+    def yield_test_case_batch(self, count, batch_size=DEFAULT_BATCH_SIZE, constraints=None):
+        """
+        As yield_test_case(), packed into FrameBatch objects. The FCSs which weren't already computed to check the
+        frames' validity are computed a batch at a time.
+        """
+        check_valid = constraints.get('check_valid', True) if constraints is not None else True
+        frames = self.__yield_frames(count, check_valid)
+        for first in range(0, count, batch_size):
+            built = list(itertools.islice(frames, batch_size))
+            missing = [i for i, (pb, pb_fcs) in enumerate(built) if pb_fcs is None]
+            computed = dict(zip(missing, fcs_batch([built[i][0] for i in missing])))
+            batch = FrameBatch()
+            for i, (pb, pb_fcs) in enumerate(built):
+                batch.append(pb, pb_fcs if pb_fcs is not None else computed[i])
+            yield batch
+
+    def __yield_frames(self, count, check_valid):
+        """
+        Builds the test cases without their FCS, which is left to the caller unless it had to be computed here to
+        check the frame's validity.
+        :yield: Tuple of the frame without its FCS, and its FCS or None.
+        """
         #print("*** Validity check status {}".format(check_valid))
         for i in range(count):
-            pkt = Dot15d4FCS(seqnum=self.__start_seqnum, fcf_srcaddrmode=2, fcf_ackreq=True, fcf_destaddrmode=2, fcf_panidcompress=True) / \
+            # The FCS is appended by us rather than by scapy's Dot15d4FCS, which computes it bit by bit.
+            pkt = Dot15d4(seqnum=self.__start_seqnum, fcf_srcaddrmode=2, fcf_ackreq=True, fcf_destaddrmode=2, fcf_panidcompress=True) / \
                   Dot15d4Data(dest_panid=self.__target_pan_id, dest_addr=self.__target_short_addr, src_addr=self.__src_short_addr)
-            base_pkt_length = len(pkt)
+            base_pkt_length = len(pkt) + 2  # Including the FCS
             pkt = pkt / fuzz(LengthRaw(max_length=MAX_DOT15D4_LENGTH-base_pkt_length))
             self.__start_seqnum = (self.__start_seqnum + 1) % (0xFF + 1)
             #pkt.show2()
             if not check_valid:
-                yield str(pkt)
+                yield str(pkt), None
             else:
                 # Due to use of fuzz(), each call to str(pkt) produces different values, and some of these aren't
                 # seen as valid by Scapy. Thus we optionally retry till we get a "good" one.
                 pb = str(pkt)
-                is_valid = Dot15d4FCS(pb).haslayer(Dot15d4Data)
+                pb_fcs = fcs(pb)
+                is_valid = Dot15d4FCS(pb + pb_fcs).haslayer(Dot15d4Data)
                 while not is_valid:
                     print("Trying again as initial packet didn't pass validity check.")
                     #print("Initial pkt that failed - formed:", pkt.summary())
                     #print("Initial pkt that failed - parsed:", Dot15d4FCS(pb).summary())
                     pb = str(pkt)
-                    is_valid = Dot15d4FCS(pb).haslayer(Dot15d4Data)
+                    pb_fcs = fcs(pb)
+                    is_valid = Dot15d4FCS(pb + pb_fcs).haslayer(Dot15d4Data)
                     #print("New pkt - parsed:", Dot15d4FCS(pb).summary())
-                yield pb
+                yield pb, pb_fcs
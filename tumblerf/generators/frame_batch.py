@@ -0,0 +1,108 @@
+"""
+Implements the FrameBatch class, which holds a batch of test cases packed one after the other in a single buffer,
+with arrays giving where each starts and how long it is. Generators return these from yield_test_case_batch(), so
+code that works on many frames at once (computing FCSs, storing results, batched interfaces) can take the whole
+buffer without a Python string per frame.
+"""
+
+import array
+
+# TODO: Clean up this import:
+try:
+    from ..dot15d4.fcs import load_numpy
+except ValueError:
+    from dot15d4.fcs import load_numpy
+
+DEFAULT_BATCH_SIZE = 256
+
+
+class FrameBatch():
+    def __init__(self):
+        self.__buffer = bytearray()
+        self.__offsets = array.array('I')
+        self.__lengths = array.array('I')
+        self.__shared = False  # set once the buffer or arrays are handed out, after which they mustn't be resized
+
+    def __repr__(self):
+        return "{}({} frames, {} bytes)".format(self.__class__.__name__, len(self), len(self.__buffer))
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    def __getitem__(self, index):
+        """
+        :return: The frame at `index` as a str, e.g. to pass to an interface which sends one frame at a time.
+        """
+        offset = self.__offsets[index]
+        return str(self.__buffer[offset:offset + self.__lengths[index]])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @staticmethod
+    def from_frames(frames):
+        """
+        :param frames: Iterable of frames, as str or bytearray.
+        """
+        batch = FrameBatch()
+        for frame in frames:
+            batch.append(frame)
+        return batch
+
+    def append(self, *parts):
+        """
+        Adds a frame to the end of the batch.
+        :param parts: The frame, or several parts of it which are concatenated, e.g. a preamble and the frame.
+        """
+        if self.__shared:
+            raise ValueError("Frames can't be appended once the batch's buffer has been shared.")
+        self.__offsets.append(len(self.__buffer))
+        for part in parts:
+            self.__buffer.extend(part)
+        self.__lengths.append(len(self.__buffer) - self.__offsets[-1])
+
+    @property
+    def buffer(self):
+        """
+        memoryview of the packed frames.
+        """
+        self.__shared = True
+        return memoryview(self.__buffer)
+
+    @property
+    def offsets(self):
+        """
+        array.array of unsigned ints, where each frame starts in the buffer.
+        """
+        self.__shared = True
+        return self.__offsets
+
+    @property
+    def lengths(self):
+        """
+        array.array of unsigned ints, the length of each frame.
+        """
+        self.__shared = True
+        return self.__lengths
+
+    def frame_view(self, index):
+        """
+        :return: memoryview of the frame at `index`, without copying it out of the buffer.
+        """
+        offset = self.__offsets[index]
+        return memoryview(self.__buffer)[offset:offset + self.__lengths[index]]
+
+    def as_numpy(self):
+        """
+        Returns the buffer, offsets and lengths as numpy arrays which share memory with the batch. As for the
+        buffer property, no more frames can be appended after.
+        :return: Tuple of (uint8 array, uint32 array, uint32 array).
+        """
+        numpy = load_numpy()
+        if numpy is None:
+            raise ImportError("numpy is required for FrameBatch.as_numpy().")
+        self.__shared = True
+        return (numpy.frombuffer(self.__buffer, dtype=numpy.uint8),
+                numpy.frombuffer(self.__offsets, dtype=numpy.uint32),
+                numpy.frombuffer(self.__lengths, dtype=numpy.uint32))
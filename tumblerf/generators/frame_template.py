@@ -0,0 +1,70 @@
+"""
+Implements the FrameTemplate class, which lets a generator build a frame once (through scapy, or packed directly as
+by tumblerf.dot15d4.mac) and then produce the frames that differ from it only by sequence number without building
+them again.
+"""
+
+import struct
+
+# TODO: Clean up this import:
+try:
+    from ..dot15d4.fcs import fcs
+    from ..dot15d4.phy import SFD
+except ValueError:
+    from dot15d4.fcs import fcs
+    from dot15d4.phy import SFD
+SEQNUM_OFFSET = 2  # The sequence number follows the two byte frame control field
+
+
+class FrameTemplate():
+    def __init__(self, frame, phy_header=False):
+        """
+        :param frame: The MAC frame to render from, including its FCS, e.g. str() of a scapy Dot15d4FCS packet.
+        :param phy_header: If True, rendered frames start with the SFD and PHY length, as generators providing the
+            PHY send them (the preamble is left to the generator, as it is what typically varies).
+        """
+        if len(frame) < SEQNUM_OFFSET + 3:
+            raise ValueError("Frame is too short to have a sequence number and FCS.")
+        header = SFD + struct.pack('b', len(frame)) if phy_header else ""
+        self.__mac_start = len(header)
+        self.__seqnum_index = self.__mac_start + SEQNUM_OFFSET
+        self.__buffer = bytearray(header + frame)
+        self.__rendered = [None] * 256  # frame by sequence number, as each is first rendered
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, str(self.__buffer).encode('hex'))
+
+    @staticmethod
+    def from_packet(packet, phy_header=False):
+        """
+        Builds the template from a scapy packet, which should have an FCS (i.e. be a Dot15d4FCS).
+        """
+        return FrameTemplate(str(packet), phy_header=phy_header)
+
+    def render(self, seqnum):
+        """
+        Returns the template's frame with the sequence number and FCS replaced. Only the first rendering of each
+        sequence number patches the buffer; the frame is kept for the next time that sequence number comes around.
+        :param seqnum: Sequence number, 0 to 255.
+        :return: str
+        """
+        frame = self.__rendered[seqnum]
+        if frame is None:
+            buf = self.__buffer
+            buf[self.__seqnum_index] = seqnum
+            buf[-2:] = fcs(buf[self.__mac_start:-2])
+            frame = self.__rendered[seqnum] = str(buf)
+        return frame
+
+
+def renumber_frame(frame, layout, seqnum):
+    """
+    Replaces the sequence number of a test case, and so its FCS, however its preamble and PHY header are framed.
+    :param frame: The test case string.
+    :param layout: Dot15d4FrameLayout of the test case, whose header must include the sequence number.
+    :param seqnum: Sequence number, 0 to 255.
+    :return: str
+    """
+    preamble, header, payload = layout.split(frame)
+    header = header[:SEQNUM_OFFSET] + chr(seqnum) + header[SEQNUM_OFFSET + 1:]
+    return layout.join(preamble, header, payload)
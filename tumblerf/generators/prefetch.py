@@ -0,0 +1,153 @@
+"""
+Implements the PrefetchGenerator class, which runs another generator's test cases ahead of the case in a
+background thread, so the time spent building them (e.g. in scapy) overlaps with transmitting the previous ones
+and waiting for the target instead of adding to it.
+"""
+
+import threading
+from Queue import Queue, Empty, Full
+
+from .base import BaseTestCaseGenerator
+
+_DONE = object()
+_POLL_INTERVAL = 0.1  # seconds between checks for shutdown while blocked on the queue
+
+
+class PrefetchGenerator(BaseTestCaseGenerator):
+    """
+    Wraps another generator, filling a queue of up to `depth` test cases from it in a worker thread. The worker
+    blocks while the queue is full, so it never runs more than `depth` test cases ahead.
+
+    Sequence numbers are given out as test cases are handed to the caller, not as they are generated: the worker
+    restores the wrapped generator's state after building each test case, and each is then renumbered with
+    renumber_test_case() as it leaves the queue. Test cases and the control cases between them so number in the
+    order they are sent, get_state() always describes the test cases handed out, and test cases left in the queue
+    when iteration stops have used no numbers. The wrapped generator must implement renumber_test_case() if its
+    test cases depend on state carried between them.
+
+    A thread is used rather than a process so the wrapped generator is shared with its control cases, which are
+    generated on demand in the caller's thread, and with checkpoints; the two threads take turns through a lock.
+    Generation and TX still overlap, as interfaces and harnesses release the GIL while they wait on the radio.
+
+    Waits on the queue are bounded, so an interrupt (e.g. SIGINT handled by cli.exit_handler) is delivered promptly
+    to the caller's thread. The generator of test cases then closes as the exception unwinds, which stops the
+    worker.
+    """
+    def __init__(self, generator, depth=64):
+        """
+        :param generator: The generator to prefetch test cases from.
+        :param depth: Maximum number of test cases generated ahead of those handed out.
+        """
+        if depth < 1:
+            raise ValueError("Prefetch depth must be at least 1.")
+        BaseTestCaseGenerator.__init__(self, includes_phy=generator.includes_phy, includes_mac=generator.includes_mac)
+        self.__generator = generator
+        self.__depth = depth
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return "{}({}, depth {})".format(self.__class__.__name__, self.__generator, self.__depth)
+
+    @property
+    def name(self):
+        return self.__generator.name
+
+    @property
+    def generator(self):
+        return self.__generator
+
+    @property
+    def depth(self):
+        return self.__depth
+
+    def get_state(self):
+        with self.__lock:
+            return self.__generator.get_state()
+
+    def set_state(self, state):
+        with self.__lock:
+            self.__generator.set_state(state)
+
+    def get_frame_layout(self):
+        return self.__generator.get_frame_layout()
+
+    def describe_extra_case(self, test_case):
+        with self.__lock:
+            return self.__generator.describe_extra_case(test_case)
+
+    def record_outcome(self, test_case, test_result):
+        """
+        Passed to the wrapped generator, which only sees it after up to `depth` more of its test cases are queued.
+        """
+        with self.__lock:
+            self.__generator.record_outcome(test_case, test_result)
+
+    def renumber_test_case(self, test_case):
+        with self.__lock:
+            return self.__generator.renumber_test_case(test_case)
+
+    def yield_control_case(self, count=1):
+        with self.__lock:
+            control_cases = list(self.__generator.yield_control_case(count))
+        for cc in control_cases:
+            yield cc
+
+    def yield_test_case(self, count, constraints=None):
+        """
+        Yields the wrapped generator's test cases, generated ahead in the worker thread.
+        """
+        return self.yield_test_case_from(0, count, constraints=constraints)
+
+    def yield_test_case_from(self, start, count, constraints=None):
+        return self.__prefetch(lambda: self.__generator.yield_test_case_from(start, count, constraints=constraints))
+
+    def __prefetch(self, make_cases):
+        queue = Queue(maxsize=self.__depth)
+        shutdown = threading.Event()
+        worker = threading.Thread(target=self.__worker_thread, args=(make_cases, queue, shutdown))
+        worker.daemon = True
+        worker.start()
+        try:
+            while True:
+                try:
+                    tc = queue.get(timeout=_POLL_INTERVAL)
+                except Empty:
+                    continue
+                if tc is _DONE:
+                    return
+                if isinstance(tc, Exception):
+                    raise tc
+                yield self.renumber_test_case(tc)
+        finally:
+            shutdown.set()
+            worker.join()
+
+    def __worker_thread(self, make_cases, queue, shutdown):
+        item = _DONE
+        try:
+            with self.__lock:
+                cases = make_cases()
+            while not shutdown.is_set():
+                with self.__lock:
+                    # Generating doesn't use up any state, as that is left to renumber_test_case().
+                    state = self.__generator.get_state()
+                    tc = next(cases, _DONE)
+                    self.__generator.set_state(state)
+                if tc is _DONE:
+                    break
+                self.__put(queue, tc, shutdown)
+        except Exception as e:
+            item = e
+        self.__put(queue, item, shutdown)
+
+    @staticmethod
+    def __put(queue, item, shutdown):
+        """
+        Puts an item on the queue, blocking while it is full unless shutdown is set.
+        """
+        while not shutdown.is_set():
+            try:
+                queue.put(item, timeout=_POLL_INTERVAL)
+                return
+            except Full:
+                continue
@@ -0,0 +1,94 @@
+from .base import BaseTestCaseGenerator
+
+
+class ShardedGenerator(BaseTestCaseGenerator):
+    """
+    Wraps another generator and yields only every shard_count-th of its test cases, starting at shard_index.
+    Running one ShardedGenerator per radio pair, with the same wrapped generator configuration and shard_count and
+    each pair taking a different shard_index, splits the case space between the pairs without overlap.
+    Control cases are passed straight through from the wrapped generator.
+
+    Generators have no general way to skip a test case without building it (a random one, for one, has to draw it to
+    keep its random stream in step), so every shard still builds all of the wrapped generator's test cases and
+    discards the others' shares. Sharding across N pairs divides the airtime and waiting of a campaign by N, but each
+    pair spends as long generating as a single pair running the whole campaign would. Where generation rather than
+    airtime is the bottleneck (see tumblerf.benchmarks.generator_rate), more pairs won't make the campaign faster.
+    """
+    def __init__(self, generator, shard_index, shard_count):
+        if shard_count < 1 or not 0 <= shard_index < shard_count:
+            raise ValueError("Shard index must be in the range [0, shard_count).")
+        BaseTestCaseGenerator.__init__(self, includes_phy=generator.includes_phy, includes_mac=generator.includes_mac)
+        self.__generator = generator
+        self.__shard_index = shard_index
+        self.__shard_count = shard_count
+
+    def __repr__(self):
+        return "{}({}, shard {}/{})".format(self.__class__.__name__, self.__generator, self.__shard_index,
+                                            self.__shard_count)
+
+    @property
+    def name(self):
+        return self.__generator.name
+
+    @property
+    def generator(self):
+        return self.__generator
+
+    @property
+    def shard_index(self):
+        return self.__shard_index
+
+    @property
+    def shard_count(self):
+        return self.__shard_count
+
+    def global_case_num(self, case_num):
+        """
+        Maps the number of a case within this shard back to its number within the wrapped generator's sequence.
+        :param case_num: Index of the case as yielded by this generator, or None for a case outside the sequence.
+        :return: int, or None
+        """
+        if case_num is None:
+            return None
+        return case_num * self.__shard_count + self.__shard_index
+
+    def get_state(self):
+        return self.__generator.get_state()
+
+    def set_state(self, state):
+        self.__generator.set_state(state)
+
+    def get_frame_layout(self):
+        return self.__generator.get_frame_layout()
+
+    def describe_extra_case(self, test_case):
+        return self.__generator.describe_extra_case(test_case)
+
+    def record_outcome(self, test_case, test_result):
+        self.__generator.record_outcome(test_case, test_result)
+
+    def renumber_test_case(self, test_case):
+        return self.__generator.renumber_test_case(test_case)
+
+    def yield_control_case(self, count=1):
+        return self.__generator.yield_control_case(count)
+
+    def yield_test_case(self, count, constraints=None):
+        """
+        Yields this shard's portion of the wrapped generator's test cases. The skipped cases are still produced by
+        the wrapped generator, so any state it keeps (such as sequence numbers) advances identically in every shard.
+        """
+        for i, tc in enumerate(self.__generator.yield_test_case(count, constraints=constraints)):
+            if i % self.__shard_count == self.__shard_index:
+                yield tc
+
+    def yield_test_case_from(self, start, count, constraints=None):
+        """
+        Yields this shard's portion starting at its local case index `start`, letting the wrapped generator skip
+        the cases of every shard before that point.
+        """
+        first = start * self.__shard_count
+        cases = self.__generator.yield_test_case_from(first, count, constraints=constraints)
+        for i, tc in enumerate(cases, first):
+            if i % self.__shard_count == self.__shard_index:
+                yield tc
@@ -75,3 +75,10 @@ class TestDot15d4FranconianNotchGenerator(object):
         assert cases[3][:4] == "\x00\x00\xf0\xff"
         # Using case 4 as a sample to ensure preamble is "00 00 ff ff"
         assert cases[4][:4] == "\x00\x00\xff\xff"
+
+    def test_batch(self, dot15d4_generator):
+        cases = dot15d4_generator.get_test_cases(3, {'max_fill': 4})
+        dot15d4_generator.set_start_seqnum(0)
+        batches = list(dot15d4_generator.yield_test_case_batch(3, batch_size=4, constraints={'max_fill': 4}))
+        assert [len(batch) for batch in batches] == [4, 4, 4, 3]
+        assert [case for batch in batches for case in batch] == cases
@@ -9,6 +9,7 @@ except ImportError:
     print "This tool requires Scapy to be installed, including dot15d4 support."
 
 from ..dot15d4_isotope_preamblelength import Dot15d4PreambleLengthGenerator
+from ...dot15d4.layout import Dot15d4FrameLayout
 
 
 class TestDot15d4IsotopePreambleLengthGenerator(object):
@@ -86,3 +87,45 @@ class TestDot15d4IsotopePreambleLengthGenerator(object):
         # Using case 8 as a sample to ensure 8 nibbles of leading 0s were inserted:
         assert len(cases[0]) == len(cases[8][4:])
         assert cases[8][:4] == "\x00"*4
+
+    def test_yield_from(self, dot15d4_generator):
+        cases = dot15d4_generator.get_test_cases(2, {
+            'preamb_len': 6
+        })
+        dot15d4_generator.set_start_seqnum(0)
+        resumed = list(dot15d4_generator.yield_test_case_from(7, 2, {
+            'preamb_len': 6
+        }))
+        assert len(resumed) == len(cases) - 7
+        # The same preamble lengths follow, with sequence numbers carrying on from the generator's state:
+        for i, case in enumerate(resumed):
+            assert len(case) == len(cases[7 + i])
+            preamb_len = (7 + i) % 6
+            if preamb_len % 2 == 0:
+                # Byte 4 after the preamble is the 802.15.4 seq num given leading SFD & len:
+                assert ord(case[preamb_len / 2 + 4]) == i
+
+    def test_state(self, dot15d4_generator):
+        dot15d4_generator.set_start_seqnum(0x42)
+        state = dot15d4_generator.get_state()
+        dot15d4_generator.get_test_cases(1, {'preamb_len': 4})
+        assert dot15d4_generator.get_state() != state
+        dot15d4_generator.set_state(state)
+        assert dot15d4_generator.get_state() == state
+
+    def test_frame_layout(self, dot15d4_generator):
+        layout = Dot15d4FrameLayout(includes_phy=True, **dot15d4_generator.get_frame_layout())
+        for preamb_len, tc in enumerate(dot15d4_generator.yield_test_case(1, {'preamb_len': 10})):
+            preamble, header, payload = layout.split(tc)
+            assert preamble == [0] * preamb_len
+            assert payload == ""
+            assert layout.join(preamble, header, payload) == tc
+
+    def test_batch(self, dot15d4_generator):
+        cases = dot15d4_generator.get_test_cases(3, {'preamb_len': 5, 'min_preamb_len': 1})
+        dot15d4_generator.set_start_seqnum(0)
+        batches = list(dot15d4_generator.yield_test_case_batch(3, batch_size=5, constraints={
+            'preamb_len': 5, 'min_preamb_len': 1
+        }))
+        assert [len(batch) for batch in batches] == [5, 5, 2]
+        assert [case for batch in batches for case in batch] == cases
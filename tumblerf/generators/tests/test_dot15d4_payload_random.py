@@ -4,6 +4,7 @@ import pytest
 from scapy.all import *
 #from scapy.layers.dot15d4 import Dot15d4FCS, Dot15d4, Dot15d4Data
 
+from ...dot15d4.fcs import fcs
 from ..dot15d4_payload_random import Dot15d4RandomPayloadGenerator, LengthRaw
 
 class TestDot15d4RandomPayloadGenerator(object):
@@ -54,3 +55,21 @@ class TestDot15d4RandomPayloadGenerator(object):
         assert ord(cases[1][2]) == 0xFF
         assert ord(cases[2][2]) == 0x00
         assert ord(cases[3][2]) == 0x01
+
+    def test_renumber(self, dot15d4_generator):
+        case = dot15d4_generator.get_test_case({'check_valid': False})
+        dot15d4_generator.set_start_seqnum(0x42)
+        renumbered = dot15d4_generator.renumber_test_case(case)
+        assert ord(renumbered[2]) == 0x42
+        assert renumbered[:2] == case[:2] and renumbered[3:-2] == case[3:-2]
+        assert fcs(renumbered[:-2]) == renumbered[-2:]
+        assert dot15d4_generator.get_state() == {'seqnum': 0x43}
+
+    def test_batch(self, dot15d4_generator):
+        dot15d4_generator.set_start_seqnum(0xFF - 1)
+        batches = list(dot15d4_generator.yield_test_case_batch(5, batch_size=2, constraints={'check_valid': False}))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        cases = [case for batch in batches for case in batch]
+        assert [ord(case[2]) for case in cases] == [0xFF - 1, 0xFF, 0x00, 0x01, 0x02]
+        for case in cases:
+            assert fcs(case[:-2]) == case[-2:]
@@ -0,0 +1,53 @@
+import pytest
+
+from ...dot15d4 import fcs as fcs_module
+from ..base import BaseTestCaseGenerator
+from ..frame_batch import FrameBatch
+
+
+class CountingGenerator(BaseTestCaseGenerator):
+    def yield_test_case(self, count, constraints=None):
+        for i in range(count):
+            yield chr(i) * i
+
+
+class TestFrameBatch(object):
+
+    def test_packs_frames(self):
+        batch = FrameBatch.from_frames(["ab", "", bytearray("cde")])
+        assert len(batch) == 3
+        assert list(batch) == ["ab", "", "cde"]
+        assert batch.buffer.tobytes() == "abcde"
+        assert list(batch.offsets) == [0, 2, 2]
+        assert list(batch.lengths) == [2, 0, 3]
+        assert batch.frame_view(2).tobytes() == "cde"
+
+    def test_append_parts(self):
+        batch = FrameBatch()
+        batch.append("\x00\x00", "\xa7")
+        assert batch[0] == "\x00\x00\xa7"
+
+    def test_shared_buffer_is_not_resized(self):
+        batch = FrameBatch.from_frames(["ab"])
+        batch.buffer
+        with pytest.raises(ValueError):
+            batch.append("c")
+
+    def test_as_numpy(self):
+        pytest.importorskip("numpy")
+        buf, offsets, lengths = FrameBatch.from_frames(["ab", "cde"]).as_numpy()
+        assert buf.tostring() == "abcde"
+        assert list(offsets) == [0, 2]
+        assert list(lengths) == [2, 3]
+
+    def test_as_numpy_without_numpy(self, monkeypatch):
+        monkeypatch.setattr(fcs_module, "numpy", None)
+        with pytest.raises(ImportError):
+            FrameBatch.from_frames(["ab"]).as_numpy()
+
+    def test_default_batches(self):
+        gen = CountingGenerator()
+        batches = list(gen.yield_test_case_batch(10, batch_size=4))
+        assert [len(batch) for batch in batches] == [4, 4, 2]
+        assert [frame for batch in batches for frame in batch] == gen.get_test_cases(10)
+        assert list(gen.yield_test_case_batch(0)) == []
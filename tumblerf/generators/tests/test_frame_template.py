@@ -0,0 +1,59 @@
+import struct
+
+import pytest
+
+from scapy.layers.dot15d4 import Dot15d4FCS, Dot15d4Cmd, Dot15d4Data
+
+from ..frame_template import FrameTemplate
+from ...dot15d4.phy import SFD
+from ..dot15d4_isotope_preamblelength import Dot15d4PreambleLengthGenerator
+from ..dot15d4_payload_random import Dot15d4RandomPayloadGenerator
+
+
+def beacon_request(seqnum, pan_id=0xFFFF, short_addr=0x0000):
+    return Dot15d4FCS(seqnum=seqnum, fcf_ackreq=True) / Dot15d4Cmd(dest_panid=pan_id, dest_addr=short_addr, cmd_id=7)
+
+
+class TestFrameTemplate(object):
+
+    def test_renders_as_scapy_builds(self):
+        template = FrameTemplate.from_packet(beacon_request(0))
+        for seqnum in range(256):
+            assert template.render(seqnum) == str(beacon_request(seqnum))
+
+    def test_phy_header(self):
+        template = FrameTemplate.from_packet(beacon_request(0, 0xABCD, 0xBEEF), phy_header=True)
+        mac = str(beacon_request(42, 0xABCD, 0xBEEF))
+        assert template.render(42) == SFD + struct.pack('b', len(mac)) + mac
+
+    def test_rendered_frames_are_kept(self):
+        template = FrameTemplate.from_packet(beacon_request(0))
+        first = template.render(7)
+        template.render(8)
+        assert template.render(7) is first
+        assert first == str(beacon_request(7))
+
+    def test_too_short(self):
+        with pytest.raises(ValueError):
+            FrameTemplate("\x03\x08\x01\xff")
+
+    def test_generators_match_scapy(self):
+        generator = Dot15d4PreambleLengthGenerator()
+        generator.set_target(0xABCD, 0xBEEF)
+        generator.set_start_seqnum(250)
+        cases = list(generator.yield_test_case(4, {'min_preamb_len': 8, 'preamb_len': 9}))
+        for seqnum, case in zip([250, 251, 252, 253], cases):
+            assert case[6:] == str(beacon_request(seqnum, 0xABCD, 0xBEEF))
+
+    def test_random_payload_control_case(self):
+        generator = Dot15d4RandomPayloadGenerator()
+        generator.set_target(0x1234, 0xFFFF)
+        generator.set_source(0x0001)
+        generator.set_start_seqnum(255)
+        cases = list(generator.yield_control_case(2))
+        for seqnum, case in zip([255, 0], cases):
+            pkt = Dot15d4FCS(seqnum=seqnum, fcf_srcaddrmode=2, fcf_ackreq=True, fcf_destaddrmode=2,
+                             fcf_panidcompress=True) / Dot15d4Data(dest_panid=0x1234, dest_addr=0xFFFF, src_addr=0x0001)
+            assert case == str(pkt)
+        generator.set_target(0x4321, 0xFFFF)
+        assert Dot15d4FCS(generator.get_control_case()).dest_panid == 0x4321
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from ..base import BaseTestCaseGenerator
+from ..dot15d4_isotope_franconiannotch import Dot15d4FranconianNotchGenerator
+from ..dot15d4_isotope_preamblelength import Dot15d4PreambleLengthGenerator
+from ..prefetch import PrefetchGenerator
+
+
+class NumberingGenerator(BaseTestCaseGenerator):
+    """
+    Numbers its test and control cases from one counter, which it keeps as its state.
+    """
+    def __init__(self, fail_at=None):
+        BaseTestCaseGenerator.__init__(self, includes_phy=True, includes_mac=False)
+        self.next_num = 0
+        self.fail_at = fail_at
+
+    def yield_control_case(self, count=1):
+        for i in range(count):
+            self.next_num += 1
+            yield "control{}".format(self.next_num - 1)
+
+    def yield_test_case(self, count, constraints=None):
+        for i in range(count):
+            if i == self.fail_at:
+                raise ValueError("Failed at {}.".format(i))
+            self.next_num += 1
+            yield "case{}".format(self.next_num - 1)
+
+    def renumber_test_case(self, test_case):
+        self.next_num += 1
+        return "case{}".format(self.next_num - 1)
+
+    def get_state(self):
+        return {'next_num': self.next_num}
+
+    def set_state(self, state):
+        self.next_num = state['next_num']
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.time() + timeout
+    while not condition() and time.time() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestPrefetchGenerator(object):
+
+    def test_passthrough(self):
+        gen = PrefetchGenerator(NumberingGenerator(), depth=4)
+        assert gen.name == "NumberingGenerator"
+        assert gen.includes_phy == True
+        assert gen.includes_mac == False
+        assert gen.get_control_case() == "control0"
+        with pytest.raises(ValueError):
+            PrefetchGenerator(NumberingGenerator(), depth=0)
+
+    def test_same_cases(self):
+        gen = PrefetchGenerator(NumberingGenerator(), depth=4)
+        assert gen.get_test_cases(20) == NumberingGenerator().get_test_cases(20)
+        gen = PrefetchGenerator(NumberingGenerator(), depth=4)
+        assert list(gen.yield_test_case_from(18, 20)) == NumberingGenerator().get_test_cases(2)
+
+    def test_backpressure(self):
+        generated = []
+        wrapped = NumberingGenerator()
+        original = wrapped.yield_test_case
+        wrapped.yield_test_case = lambda count, constraints=None: (generated.append(tc) or tc
+                                                                  for tc in original(count, constraints))
+        cases = PrefetchGenerator(wrapped, depth=4).yield_test_case(100)
+        assert next(cases) == "case0"
+        # The worker fills the queue, then has at most one more case waiting to go on it.
+        assert wait_for(lambda: len(generated) >= 5)
+        time.sleep(0.3)
+        assert len(generated) <= 6
+        cases.close()
+
+    def test_numbered_when_handed_out(self):
+        wrapped = NumberingGenerator()
+        gen = PrefetchGenerator(wrapped, depth=8)
+        cases = gen.yield_test_case(100)
+        assert [next(cases), gen.get_control_case(), next(cases), next(cases)] == \
+            ["case0", "control1", "case2", "case3"]
+        assert gen.get_state() == {'next_num': 4}
+        cases.close()
+        # The cases left in the queue used no numbers.
+        assert wrapped.get_state() == {'next_num': 4}
+        assert gen.get_test_case() == "case4"
+
+    def test_same_frames_as_inline(self):
+        for generator_class in (Dot15d4PreambleLengthGenerator, Dot15d4FranconianNotchGenerator):
+            inline, prefetched = [], []
+            for frames, prefetch in ((inline, False), (prefetched, True)):
+                gen = generator_class()
+                gen.set_default_constraint('preamb_len', 5)
+                if prefetch:
+                    gen = PrefetchGenerator(gen)
+                for i, tc in enumerate(gen.yield_test_case(4)):
+                    frames.append(tc)
+                    if i % 3 == 0:
+                        frames.append(gen.get_control_case())
+            assert prefetched == inline
+
+    def test_close_stops_worker(self):
+        threads = threading.active_count()
+        cases = PrefetchGenerator(NumberingGenerator(), depth=2).yield_test_case(1000)
+        next(cases)
+        assert threading.active_count() == threads + 1
+        cases.close()
+        assert threading.active_count() == threads
+
+    def test_worker_error(self):
+        gen = PrefetchGenerator(NumberingGenerator(fail_at=2), depth=4)
+        cases = gen.yield_test_case(10)
+        assert next(cases) == "case0"
+        assert next(cases) == "case1"
+        with pytest.raises(ValueError):
+            next(cases)
@@ -0,0 +1,46 @@
+import pytest
+
+from ..base import BaseTestCaseGenerator
+from ..sharded import ShardedGenerator
+
+
+class CountingGenerator(BaseTestCaseGenerator):
+    def __init__(self, case_count):
+        BaseTestCaseGenerator.__init__(self, includes_phy=True, includes_mac=False)
+        self.case_count = case_count
+
+    def yield_control_case(self, count=1):
+        for i in range(count):
+            yield "control"
+
+    def yield_test_case(self, count, constraints=None):
+        for i in range(count):
+            for n in range(self.case_count):
+                yield "case{}".format(n)
+
+
+class TestShardedGenerator(object):
+
+    def test_passthrough(self):
+        gen = ShardedGenerator(CountingGenerator(10), 0, 3)
+        assert gen.name == "CountingGenerator"
+        assert gen.includes_phy == True
+        assert gen.includes_mac == False
+        assert gen.get_control_case() == "control"
+
+    def test_shards_cover_cases(self):
+        all_cases = CountingGenerator(10).get_test_cases(1)
+        seen = {}
+        for shard in range(3):
+            gen = ShardedGenerator(CountingGenerator(10), shard, 3)
+            for local_num, tc in enumerate(gen.yield_test_case(1)):
+                seen[gen.global_case_num(local_num)] = tc
+        assert sorted(seen.keys()) == range(10)
+        for case_num, tc in seen.iteritems():
+            assert all_cases[case_num] == tc
+
+    def test_invalid_shard(self):
+        with pytest.raises(ValueError):
+            ShardedGenerator(CountingGenerator(1), 3, 3)
+        with pytest.raises(ValueError):
+            ShardedGenerator(CountingGenerator(1), 0, 0)
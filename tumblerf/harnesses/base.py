@@ -1,3 +1,5 @@
+import time
+
 
 class BaseHarness():
     def __init__(self):
@@ -37,6 +39,14 @@ class BaseHarness():
         args, _ = parser.parse_known_args(argv)  # We may have options in argv meant for other tools, so we allow ignoring.
         # TODO: In your harness, override this function and use args to set internal state.
 
+    def set_channel(self, channel):
+        """
+        Moves any RF monitoring the harness does to the given channel. Harnesses which don't monitor over RF have
+        nothing to retune, so by default this succeeds without doing anything.
+        :return: bool
+        """
+        return True
+
     def do_reset(self):
         """
         Reset the device to a clean state via reboot or other means. Returns True if succeeded, otherwise False.
@@ -62,6 +72,26 @@ class BaseHarness():
         """
         raise NotImplementedError
 
+    def wait_valid(self, timeout):
+        """
+        Waits up to timeout seconds for the device to be in a valid state, returning as soon as that is known.
+        Harnesses that are notified of new input should override this to return early; this default simply waits
+        out the full timeout and then checks is_valid().
+        :param timeout: Maximum time to wait, in seconds.
+        :return: boolean or None
+        """
+        time.sleep(timeout)
+        return self.is_valid()
+
+    def evidence(self):
+        """
+        Returns details of what the harness observed at its last is_valid() check, such as the serial line that
+        matched, for triaging invalid results. Values must be JSON serializable. Harnesses with nothing to report
+        return an empty dict.
+        :return: dict
+        """
+        return {}
+
     def is_invalid(self):
         """
         This function returns True if the device is in an invalid state, indicating a potential
@@ -1,18 +1,15 @@
 import threading
+import time
 from collections import deque
 
 from .base import BaseHarness
 # TODO: Clean up this import:
 try:
     from ..interfaces.base import BaseInterface
+    from .. import interfaces
 except ValueError:
     from interfaces.base import BaseInterface
-
-# TODO: Make it more flexible as to what the RX interface type could be:
-try:
-    from ..interfaces.interface_killerbee import KillerBeeInterface
-except ValueError:
-    from interfaces.interface_killerbee import KillerBeeInterface
+    import interfaces
 
 
 class ReceivedFrameHarness(BaseHarness):
@@ -25,6 +22,9 @@ class ReceivedFrameHarness(BaseHarness):
         self.__interface = None
         self.__expectation = None
         self.__pending_packets = deque()
+        self.__unmatched_lengths = deque(maxlen=8)
+        self.poll_interval = 0.002  # seconds between interface polls while waiting in wait_valid()
+        self.received_event = threading.Event()
         self.access_interface_event = threading.Event()
         self.processing_thread_shutdown = threading.Event()
         self.processing_thread = threading.Thread(target=self.__process_input_thread,
@@ -38,7 +38,12 @@ class ReceivedFrameHarness(BaseHarness):
     def close(self):
         self.__interface.rx_stop()
         self.processing_thread_shutdown.set()
-        self.processing_thread.join()
+        if self.processing_thread.ident is not None:  # i.e. open() started it
+            self.processing_thread.join()
+
+    @property
+    def interface(self):
+        return self.__interface
 
     def set_interface(self, interface):
         """
@@ -59,13 +64,18 @@ class ReceivedFrameHarness(BaseHarness):
 
     def add_subparser(self, subparsers):
         parser = subparsers.add_parser(self.__class__.__name__, help='Argument parser for interface')
+        parser.add_argument('--rx_iface', action='store', default='KillerBeeInterface',
+                            help='Interface class to receive with.')
         parser.add_argument('--rx_iface_device', action='store', default=None)
         return self.make_simple_help(parser)
 
     def process_cli(self, parser, argv):
         argv.insert(0, self.__class__.__name__)  # We add this as a convention to get the data to the right subparser.
         args, _ = parser.parse_known_args(argv)  # We may have options in argv meant for other tools, so we allow ignoring.
-        rx_interface = KillerBeeInterface()
+        rx_class = getattr(interfaces, args.rx_iface, None)
+        if rx_class is None:
+            raise Exception("ERROR: Receive interface {} isn't available.".format(args.rx_iface))
+        rx_interface = rx_class()
         rx_interface.set_device_string(args.rx_iface_device)
         if args.channel is not None:
             rx_interface.set_channel(args.channel)
@@ -87,9 +97,25 @@ class ReceivedFrameHarness(BaseHarness):
                 return True
         return False
 
+    def set_channel(self, channel):
+        """
+        Retunes the receive interface. Packets received on the previous channel are discarded.
+        :return: bool
+        """
+        # As in a reset, we lock the thread out of the interface while retuning.
+        self.access_interface_event.set()
+        try:
+            if self.__interface.set_channel(channel) != channel:
+                return False
+            self.__pending_packets.clear()
+            return True
+        finally:
+            self.access_interface_event.clear()
+
     def set_expected_packet(self, packet):
         print("Setting expected packet to:\t{}".format(packet.encode('hex')))
         self.__expectation = packet
+        self.__unmatched_lengths.clear()
 
     def __process_input_thread(self, shutdown_event):
         print("Thread started up.")
@@ -119,6 +145,7 @@ class ReceivedFrameHarness(BaseHarness):
                 print("Got packet: {}".format(pkt.encode('hex')))
             while pkt is not None:
                 self.__pending_packets.append(pkt)
+                self.received_event.set()
                 pkt = self.__interface.rx_poll()
                 if pkt is not None:
                     print("Loop got packet: {}".format(pkt.encode('hex') if pkt is not None else None))
@@ -147,6 +174,7 @@ class ReceivedFrameHarness(BaseHarness):
                 if pkt in self.__expectation:  # Substring check to get around presence of PHY
                     # We return when we find a match, leaving other pending packets in the queue for future use
                     return True
+                self.__unmatched_lengths.append(len(pkt))
                 #else:
                 #    print("DEBUG: Compared to:\t\t{}".format(pkt.encode('hex')))
         except IndexError:
@@ -154,6 +182,37 @@ class ReceivedFrameHarness(BaseHarness):
             pass
         return False
 
+    def wait_valid(self, timeout):
+        """
+        Waits until a packet matching the expectation is received, or until timeout seconds have passed.
+        This returns as soon as the match is seen, so the timeout only has to be paid in full when the frame is missed.
+        :param timeout: Maximum time to wait, in seconds.
+        :return: boolean
+        """
+        deadline = time.time() + timeout
+        while True:
+            # Clear before checking so that a packet arriving after the check wakes the wait below.
+            self.received_event.clear()
+            if self.is_valid():
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            self.received_event.wait(min(remaining, self.poll_interval))
+
+    def evidence(self):
+        """
+        Returns the shape of the frame that was expected, and the lengths of the last few frames received since
+        which didn't match it (none if nothing was received at all).
+        :return: dict
+        """
+        if self.__expectation is None:
+            return {}
+        return {
+            "expected_length": len(self.__expectation),
+            "unmatched_lengths": list(self.__unmatched_lengths)
+        }
+
     def is_invalid(self):
         """
         In this simple harness, this is simply the inverse of is_valid() as the check is reliable.
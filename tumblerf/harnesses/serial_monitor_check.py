@@ -32,7 +32,9 @@ class SerialCheckHarness(BaseHarness):
         self.status_valid_regex = None
         self.status_invalid_regex = None
         self.last_seen_valid = None
+        self.last_invalid_line = None
         self.access_serial_event = threading.Event()
+        self.serial_lock = threading.Lock()  # held while reading, so a reply is never split between two readers
         self.processing_thread_shutdown = threading.Event()
         self.processing_thread = threading.Thread(target=self.__process_input_thread,
                                                   args=(self.processing_thread_shutdown,))
@@ -50,11 +52,25 @@ class SerialCheckHarness(BaseHarness):
         Reset the device to a clean state via reboot or other means. Returns True if succeeded, otherwise False.
         :return: boolean
         """
-        self.serial.write(b'\x01')
-        self.serial.flushOutput()
-        print("Reset requested.")
-        print(self.serial.read(255))
+        # The processing thread is kept out while the reply is read here, so the lines in it are still processed.
+        self.access_serial_event.set()
+        try:
+            with self.serial_lock:
+                self.serial.write(b'\x01')
+                # Wait for the request to be sent; flushOutput() would discard it if it was still buffered.
+                self.serial.flush()
+                print("Reset requested.")
+                data = self.serial.read(255)
+        except serial.SerialException as e:
+            print(e)
+            return False
+        finally:
+            self.access_serial_event.clear()
+        print(data)
+        if self.__regexs_ready():
+            self.__process_lines(data)
         print("Reset completed.")
+        return len(data) > 0
 
     def set_is_valid_regex(self, regex):
         """
@@ -111,40 +127,46 @@ class SerialCheckHarness(BaseHarness):
             self.access_serial_event.set()
             if verbose:
                 print("Read start with {} bytes waiting".format(self.serial.in_waiting))
-            data = self.serial.read(max(255, self.serial.in_waiting))
+            with self.serial_lock:
+                data = self.serial.read(max(255, self.serial.in_waiting))
             #print("Read done, got:", type(data), data)
             self.access_serial_event.clear()
-            data = data.split(b'\n')
-            #print("Read done, got:", data)
             if verbose:
                 print("Cleared serial event")
-            for line in data:
-                # Try to get text, skip the data if it isn't decodable as UTF-8
-                try:
-                    line = line.strip().decode("utf-8")
-                except UnicodeDecodeError as e:
-                    print("Issue decoding line ({}), skipping: {}".format(e, line))
-                    continue
-                # Skip lines that are harness output:
-                if line.find("[HARNESS]") == 0:
-                    if verbose:
-                        print("Skip:", line)
-                    continue
-                # Evaluate to see if we have info from the target we want to act on:
-                print("Processing:\t{}\t{}".format(hexlify(line.encode('utf-8'))[:8], line))
-                if self.status_valid_regex.search(line) is not None:
-                    self.last_seen_valid = True
-                    if verbose:
-                        print("State set: {}".format(self.last_seen_valid))
-                elif self.status_invalid_regex.search(line) is not None:
-                    self.last_seen_valid = False
-                    if verbose:
-                        print("State set: {}".format(self.last_seen_valid))
+            self.__process_lines(data, verbose)
         except serial.SerialException as e:
             print(e)
             self.access_serial_event.clear()
             return False
 
+    def __process_lines(self, data, verbose=False):
+        """
+        Updates the internal state from the lines of data read from the serial port.
+        """
+        for line in data.split(b'\n'):
+            # Try to get text, skip the data if it isn't decodable as UTF-8
+            try:
+                line = line.strip().decode("utf-8")
+            except UnicodeDecodeError as e:
+                print("Issue decoding line ({}), skipping: {}".format(e, line))
+                continue
+            # Skip lines that are harness output:
+            if line.find("[HARNESS]") == 0:
+                if verbose:
+                    print("Skip:", line)
+                continue
+            # Evaluate to see if we have info from the target we want to act on:
+            print("Processing:\t{}\t{}".format(hexlify(line.encode('utf-8'))[:8], line))
+            if self.status_valid_regex.search(line) is not None:
+                self.last_seen_valid = True
+                if verbose:
+                    print("State set: {}".format(self.last_seen_valid))
+            elif self.status_invalid_regex.search(line) is not None:
+                self.last_seen_valid = False
+                self.last_invalid_line = line
+                if verbose:
+                    print("State set: {}".format(self.last_seen_valid))
+
     def is_valid(self):
         """
         This function connects to the device via SSH and checks to see if the expected process is running.
@@ -156,6 +178,15 @@ class SerialCheckHarness(BaseHarness):
         # TODO: Consider what to return as state if last message hasn't been seen for a while and is thus stale.
         return self.last_seen_valid
 
+    def evidence(self):
+        """
+        Returns the serial line which last matched the invalid regex, if the device is currently seen as invalid.
+        :return: dict
+        """
+        if self.last_seen_valid is False and self.last_invalid_line is not None:
+            return {"serial_line": self.last_invalid_line}
+        return {}
+
     def is_invalid(self):
         """
         In this simple harness, this is simply the inverse of is_valid() as the check is reliable.
@@ -4,6 +4,22 @@ from re import _pattern_type as RE_PATTERN_TYPE
 
 from .base import BaseHarness
 
+def ps_commands(ps_output):
+    """
+    Returns the set of commands listed in the output of ps, without the PIDs, times, etc. that change between runs.
+    The commands are taken from the COMMAND (or CMD) column if the header has one, else the last field of each line.
+    """
+    lines = [line.rstrip() for line in ps_output.splitlines() if line.strip()]
+    if len(lines) == 0:
+        return set()
+    header = lines[0]
+    for column_name in ("COMMAND", "CMD"):
+        column = header.find(column_name)
+        if column >= 0:
+            return set(line[column:].strip() for line in lines[1:])
+    return set(line.split()[-1] for line in lines[1:])
+
+
 class SshProcessCheckHarness(BaseHarness):
     def __init__(self, ssh_host=None, ssh_user=None, ssh_pass=None):
         BaseHarness.__init__(self)
@@ -11,6 +27,8 @@ class SshProcessCheckHarness(BaseHarness):
         self.set_pass(ssh_pass)
         self.ps_cmd = None
         self.ps_regex = None
+        self.baseline_ps = None
+        self.last_ps = None
 
     def set_host(self, hostname, username):
         """
@@ -77,7 +95,26 @@ class SshProcessCheckHarness(BaseHarness):
             raise ValueError("Must call set_process_regex() on harness.")
         ps_res = self.__connect_and_run(self.ps_cmd)
         print(ps_res)
-        return self.ps_regex.search(ps_res) is not None
+        self.last_ps = ps_res
+        is_valid = self.ps_regex.search(ps_res) is not None
+        if is_valid and self.baseline_ps is None:
+            self.baseline_ps = ps_res
+        return is_valid
+
+    def evidence(self):
+        """
+        Returns the difference between the commands in the process list from the last check and those in the first
+        valid one, e.g. the daemon that died and the crash handler that started in its place.
+        :return: dict
+        """
+        if self.baseline_ps is None or self.last_ps is None:
+            return {}
+        baseline = ps_commands(self.baseline_ps)
+        current = ps_commands(self.last_ps)
+        return {
+            "ps_missing": sorted(baseline - current),
+            "ps_added": sorted(current - baseline)
+        }
 
     def is_invalid(self):
         """
@@ -93,6 +93,7 @@ class TestReceivedFrameHarness(object):
         interface = MockRxInterface()
         harness = ReceivedFrameHarness()
         harness.set_interface(interface)
+        harness.open()
         yield (interface, harness)
         print("=== Shutdown ReceivedFrameHarness (for {})".format(request.function.__name__))
         harness.do_reset()
@@ -145,3 +146,34 @@ class TestReceivedFrameHarness(object):
         rx_harness.set_expected_packet(next_packet_bytes)
         test_interface.test_set_packets_to_produce(1)
         assert not rx_harness.is_valid()
+
+    def test_wait_valid_returns_on_match(self, if_harness):
+        test_interface, rx_harness = if_harness
+        next_is_control_case, next_packet_bytes = test_interface.test_will_return_packet()
+        assert next_is_control_case is True
+        rx_harness.set_expected_packet(next_packet_bytes)
+        test_interface.test_set_packets_to_produce(1)
+        start = time.time()
+        assert rx_harness.wait_valid(5)
+        assert time.time() - start < 1  # Should wake on the match, not wait out the deadline
+
+    def test_wait_valid_deadline_on_miss(self, if_harness):
+        test_interface, rx_harness = if_harness
+        next_is_control_case, next_packet_bytes = test_interface.test_will_return_packet()
+        rx_harness.set_expected_packet(next_packet_bytes)
+        # No packets are let out, so this must time out:
+        start = time.time()
+        assert not rx_harness.wait_valid(0.2)
+        assert time.time() - start >= 0.2
+
+    def test_evidence_on_miss(self, if_harness):
+        test_interface, rx_harness = if_harness
+        next_is_control_case, next_packet_bytes = test_interface.test_will_return_packet()
+        rx_harness.set_expected_packet(next_packet_bytes)
+        assert not rx_harness.wait_valid(0.2)
+        assert rx_harness.evidence() == {"expected_length": len(next_packet_bytes), "unmatched_lengths": []}
+
+    def test_close_without_open(self):
+        harness = ReceivedFrameHarness()
+        harness.set_interface(MockRxInterface())
+        harness.close()
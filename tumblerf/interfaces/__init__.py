@@ -7,3 +7,5 @@ try:
     from interface_gr_ieee802_15_4 import GR_IEEE802_15_4
 except ImportError as e:
     print("WARN: Unable to load GR_IEEE802_15_4 due to {}.".format(e))
+
+from interface_loopback import LoopbackInterface
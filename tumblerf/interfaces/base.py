@@ -28,7 +28,7 @@ class BaseInterface():
     #    self.close()
 
     def __repr__(self):
-        return self.name + ", Status=", + self._running
+        return "{}(Status={})".format(self.name, self._running)
 
     @property
     def unique_id(self):
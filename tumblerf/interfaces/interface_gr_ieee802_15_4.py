@@ -1,8 +1,12 @@
 import socket
-from killerbee import makeFCS
 
 from gr_ieee802_15_4.transceiver_OQPSK_headerless import transceiver_OQPSK_headerless
 from .base import BaseInterface
+# TODO: Clean up this import:
+try:
+    from ..dot15d4.fcs import fcs
+except ValueError:
+    from dot15d4.fcs import fcs
 
 
 class GR_IEEE802_15_4(BaseInterface):
@@ -111,7 +115,7 @@ class GR_IEEE802_15_4(BaseInterface):
         # Make PHY and MAC
         if self._generate_phy and self._generate_mac:
             # Compose 802.15.4 PHY frame using software-configured header values
-            frame = self.preamble + self.sfd + chr(len(packet) + 2) + packet + makeFCS(packet)
+            frame = self.preamble + self.sfd + chr(len(packet) + 2) + packet + fcs(packet)
 
         # Make MAC, but not PHY
         elif not self._generate_phy and self._generate_mac:
@@ -1,6 +1,11 @@
 import killerbee
 
 from .base import BaseInterface
+# TODO: Clean up this import:
+try:
+    from ..dot15d4.fcs import fcs
+except ValueError:
+    from dot15d4.fcs import fcs
 
 
 class KillerBeeInterface(BaseInterface):
@@ -20,6 +25,14 @@ class KillerBeeInterface(BaseInterface):
         self.set_channel(self.channel)
         self._running = False
 
+    @staticmethod
+    def list_device_strings():
+        """
+        Returns the device strings of all attached KillerBee devices, as seen in the first column of `sudo zbid`.
+        :return: list of str
+        """
+        return [dev[0] for dev in killerbee.kbutils.devlist()]
+
     def set_device_string(self, device_string):
         """
         Set which interface should be used, which can be seen from the first column of running `sudo zbid`.
@@ -139,11 +152,11 @@ class KillerBeeInterface(BaseInterface):
             padding = '\xff\xff\xff\xff\xff\xff\xff\xff\xff\xff' # MAGIC 
 
             # Compose 802.15.4 PHY frame using software-configured header values
-            frame = padding + preamble + sync + chr(len(packet) + 2) + packet + killerbee.makeFCS(packet)
+            frame = padding + preamble + sync + chr(len(packet) + 2) + packet + fcs(packet)
             self.driver.inject(frame)
             self.driver.set_sync('\xa700')
         else:
-            frame = packet + killerbee.makeFCS(packet)
+            frame = packet + fcs(packet)
             self.driver.inject(frame)
 
         return True
@@ -0,0 +1,233 @@
+import heapq
+import random
+import threading
+import time
+
+from .base import BaseInterface
+# TODO: Clean up this import:
+try:
+    from ..dot15d4.phy import split_phy
+except ValueError:
+    from dot15d4.phy import split_phy
+
+
+class LoopbackMedium():
+    """
+    A simulated RF medium connecting LoopbackInterfaces in the same process. Frames transmitted by one interface are
+    delivered to every other attached interface which is receiving on the same channel.
+    """
+    def __init__(self, name="default"):
+        self.name = name
+        self.__interfaces = []
+        self.__lock = threading.Lock()
+
+    def __repr__(self):
+        return "{}({}, {} interfaces)".format(self.__class__.__name__, self.name, len(self.__interfaces))
+
+    def attach(self, interface):
+        with self.__lock:
+            if interface not in self.__interfaces:
+                self.__interfaces.append(interface)
+
+    def detach(self, interface):
+        with self.__lock:
+            if interface in self.__interfaces:
+                self.__interfaces.remove(interface)
+
+    def listeners(self, sender):
+        """
+        Returns every attached interface other than the sender, which may receive what it transmits.
+        """
+        with self.__lock:
+            return [i for i in self.__interfaces if i is not sender]
+
+
+_MEDIA = {}
+_MEDIA_LOCK = threading.Lock()
+
+
+def get_medium(name="default"):
+    """
+    Returns the LoopbackMedium of the given name, creating it if needed, so interfaces created separately (such as
+    the TX interface and a harness's RX interface) can share one by name.
+    """
+    with _MEDIA_LOCK:
+        if name not in _MEDIA:
+            _MEDIA[name] = LoopbackMedium(name)
+        return _MEDIA[name]
+
+
+def extract_psdu(frame):
+    """
+    Returns the PSDU a receiver would get from a frame, or None if it can't synchronize on it. See split_phy().
+    """
+    split = split_phy(frame)
+    return split[1] if split is not None else None
+
+
+class LoopbackInterface(BaseInterface):
+    """
+    An interface that needs no hardware: frames go over a LoopbackMedium to other LoopbackInterfaces in the same
+    process, with configurable latency, jitter and loss, so cases and harnesses can run end-to-end at full speed.
+    Latency, jitter and loss describe the link from a transmitting interface, so they are set on the TX side;
+    PHY stripping describes a receiving radio, so it is set on the RX side.
+    """
+    def __init__(self, log_name="Loopback Interface", generate_phy=False, generate_mac=True, medium=None,
+                 latency=0.0, jitter=0.0, loss=0.0, strip_phy=False, seed=None):
+        """
+        :param medium: LoopbackMedium to join; by default the shared medium named "default".
+        :param latency: Seconds from transmission until a frame can be polled by receivers.
+        :param jitter: Up to this many seconds are randomly added to or taken from the latency of each frame.
+        :param loss: Probability of each receiver missing each frame transmitted.
+        :param strip_phy: If True, frames received are synchronized on their SFD and only the PSDU is delivered, as
+            a radio would, so frames sent with a PHY header lose it and frames without an SFD are not received.
+        :param seed: Optional seed for the loss and jitter, to make them reproducible.
+        """
+        BaseInterface.__init__(self, log_name=log_name, generate_phy=generate_phy, generate_mac=generate_mac)
+        self.name = "802.15.4 Loopback Interface"
+        self.driver = "loopback"
+        self.__medium = medium if medium is not None else get_medium()
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.strip_phy = strip_phy
+        self.__rng = random.Random(seed)
+        self.__rx_on = False
+        self.__queue = []  # heap of (time frame can be polled, sequence, frame)
+        self.__sequence = 0
+        self.__lock = threading.Lock()
+        self.tx_count = 0
+        self.rx_count = 0
+
+        self.channel = 11
+        self.freq = 2405e6
+        self.preamble = '\x00\x00\x00\x00'
+        self.sfd = '\xA7'
+
+    def __repr__(self):
+        return "{}(medium={}, channel={}, latency={}, loss={})".format(self.name, self.__medium.name, self.channel,
+                                                                      self.latency, self.loss)
+
+    @property
+    def unique_id(self):
+        return "loopback/{}/{}".format(self.__medium.name, id(self))
+
+    @property
+    def medium(self):
+        return self.__medium
+
+    def set_device_string(self, device_string):
+        """
+        Selects the shared medium to join by name, in place of a device, so a TX interface and a harness's RX
+        interface given the same name (or none) can hear each other.
+        """
+        if self._running:
+            raise ValueError("Can't change the medium of an open interface.")
+        self.__medium = get_medium(device_string if device_string is not None else "default")
+
+    def add_subparser(self, subparsers):
+        parser = subparsers.add_parser(self.__class__.__name__, help='Argument parser for interface')
+        parser.add_argument('-i', '--tx_iface_device', action='store', default=None,
+                            help='Name of the simulated medium to transmit on.')
+        parser.add_argument('--loopback_latency', action='store', type=float, default=0.0)
+        parser.add_argument('--loopback_jitter', action='store', type=float, default=0.0)
+        parser.add_argument('--loopback_loss', action='store', type=float, default=0.0)
+        return self.make_simple_help(parser)
+
+    def process_cli(self, parser, argv):
+        argv.insert(0, self.__class__.__name__)  # We add this as a convention to get the data to the right subparser.
+        args, _ = parser.parse_known_args(argv)  # We may have options in argv meant for other tools, so we allow ignoring.
+        self.set_device_string(args.tx_iface_device)
+        self.latency = args.loopback_latency
+        self.jitter = args.loopback_jitter
+        self.loss = args.loopback_loss
+
+    def open(self):
+        self.__medium.attach(self)
+        self._running = True
+        return True
+
+    def close(self):
+        self.__medium.detach(self)
+        self._running = False
+        with self.__lock:
+            self.__queue = []
+        return True
+
+    def is_valid_channel(self, channel):
+        if not channel:
+            return False
+        if (channel < 11) or (channel > 26):
+            return False
+        return True
+
+    def set_channel(self, channel):
+        if not self.is_valid_channel(channel):
+            return NotImplementedError
+        self.channel = channel
+        self.freq = (2400 + 5 * (channel - 10)) * 1e6
+        with self.__lock:
+            self.__queue = []  # Frames still in flight were on the old channel
+        return channel
+
+    def get_channel(self):
+        return self.channel
+
+    def tx(self, packet, channel=None, count=1, delay=0):
+        """
+        Puts the packet on the medium, count times, delay seconds apart. This doesn't block: repeats are scheduled
+        at their times rather than waited for.
+        """
+        if not self._running:
+            return False
+        if channel is not None and channel != self.channel:
+            self.set_channel(channel)
+        now = time.time()
+        listeners = self.__medium.listeners(self)
+        for i in range(count):
+            on_air = now + i * delay
+            for listener in listeners:
+                if self.loss > 0 and self.__rng.random() < self.loss:
+                    continue
+                ready = on_air + self.latency
+                if self.jitter > 0:
+                    ready = max(ready + self.__rng.uniform(-self.jitter, self.jitter), on_air)
+                listener.deliver(packet, self.channel, ready)
+            self.tx_count += 1
+        return True
+
+    def deliver(self, frame, channel, ready):
+        """
+        Called for each frame transmitted by another interface on the medium.
+        :param ready: Time from which the frame can be polled, in seconds.
+        :return: True if the interface was listening on the channel and synchronized on the frame.
+        """
+        if not self.__rx_on or channel != self.channel:
+            return False
+        if self.strip_phy:
+            frame = extract_psdu(frame)
+            if frame is None:
+                return False
+        with self.__lock:
+            heapq.heappush(self.__queue, (ready, self.__sequence, frame))
+            self.__sequence += 1
+        return True
+
+    def rx_start(self):
+        self.__rx_on = True
+        return True
+
+    def rx_stop(self):
+        self.__rx_on = False
+        return True
+
+    def rx_poll(self):
+        """
+        Returns the next frame whose latency has elapsed, in the order they become ready, or None.
+        """
+        with self.__lock:
+            if len(self.__queue) == 0 or self.__queue[0][0] > time.time():
+                return None
+            frame = heapq.heappop(self.__queue)[2]
+        self.rx_count += 1
+        return frame
@@ -0,0 +1,137 @@
+import time
+
+import pytest
+
+from ..interface_loopback import LoopbackInterface, LoopbackMedium, extract_psdu, get_medium
+from ...cases.alternator import AlternatorCaseRxFrame
+from ...cases.tests.helpers import MockGenerator
+from ...harnesses.received_frame_check import ReceivedFrameHarness
+
+PSDU = "\x03\x08\x01\xff\xff\xff\xff\x07"
+PHY_FRAME = "\x00\x00\x00\x00\xa7" + chr(len(PSDU)) + PSDU
+
+
+def drain(interface):
+    frames = []
+    frame = interface.rx_poll()
+    while frame is not None:
+        frames.append(frame)
+        frame = interface.rx_poll()
+    return frames
+
+
+class TestLoopbackInterface(object):
+
+    @pytest.fixture
+    def pair(self):
+        medium = LoopbackMedium("test")
+        tx = LoopbackInterface(medium=medium, seed=1)
+        rx = LoopbackInterface(medium=medium)
+        tx.open()
+        rx.open()
+        rx.rx_start()
+        yield tx, rx
+        tx.close()
+        rx.close()
+
+    def test_implements_rx(self, pair):
+        tx, rx = pair
+        assert rx.implements_rx() is True
+
+    def test_delivers_in_order(self, pair):
+        tx, rx = pair
+        for i in range(3):
+            tx.tx("frame{}".format(i))
+        assert drain(rx) == ["frame0", "frame1", "frame2"]
+        assert tx.tx_count == 3 and rx.rx_count == 3
+
+    def test_not_received_when_off_or_other_channel(self, pair):
+        tx, rx = pair
+        rx.rx_stop()
+        tx.tx("off")
+        rx.rx_start()
+        rx.set_channel(12)
+        tx.tx("other channel")
+        tx.tx("tuned", channel=12)
+        assert drain(rx) == ["tuned"]
+
+    def test_latency(self, pair):
+        tx, rx = pair
+        tx.latency = 0.05
+        tx.tx("late")
+        assert rx.rx_poll() is None
+        time.sleep(0.06)
+        assert rx.rx_poll() == "late"
+
+    def test_loss(self, pair):
+        tx, rx = pair
+        tx.loss = 0.5
+        tx.tx("frame", count=1000)
+        received = len(drain(rx))
+        assert 400 < received < 600
+
+    def test_jitter_reorders(self, pair):
+        tx, rx = pair
+        tx.jitter = 0.01
+        tx.latency = 0.01
+        for i in range(50):
+            tx.tx(str(i))
+        time.sleep(0.03)
+        frames = drain(rx)
+        assert sorted(frames) == sorted(str(i) for i in range(50))
+        assert frames != [str(i) for i in range(50)]
+
+    def test_strip_phy(self, pair):
+        tx, rx = pair
+        rx.strip_phy = True
+        tx.tx(PHY_FRAME)
+        tx.tx(PSDU)  # No SFD to synchronize on
+        assert drain(rx) == [PSDU]
+
+    def test_extract_psdu_odd_preamble(self):
+        # A preamble of 7 nibbles shifts the SFD and everything after it by a nibble.
+        nibbles = [0] * 7 + [0x7, 0xa]
+        for byte in bytearray(chr(len(PSDU)) + PSDU):
+            nibbles.extend([byte & 0x0f, byte >> 4])
+        nibbles.append(0xf)
+        frame = str(bytearray(nibbles[i] | (nibbles[i + 1] << 4) for i in range(0, len(nibbles), 2)))
+        assert extract_psdu(frame) == PSDU
+        assert extract_psdu(PHY_FRAME[:-2]) == PSDU[:-2]
+
+    def test_shared_medium_by_name(self):
+        first = LoopbackInterface()
+        first.set_device_string("shared")
+        second = LoopbackInterface()
+        second.set_device_string("shared")
+        assert first.medium is second.medium is get_medium("shared")
+
+
+class TestLoopbackEndToEnd(object):
+
+    @pytest.fixture
+    def campaign(self):
+        medium = LoopbackMedium("end to end")
+        tx = LoopbackInterface(medium=medium, seed=1)
+        tx.open()
+        harness = ReceivedFrameHarness()
+        harness.set_interface(LoopbackInterface(medium=medium))
+        harness.open()
+        yield tx, harness
+        tx.close()
+        harness.close()
+
+    def test_all_received(self, campaign):
+        tx, harness = campaign
+        case = AlternatorCaseRxFrame(tx, harness, MockGenerator(["case{}".format(i) for i in range(20)]))
+        results = case.run_test(1).serializable()["results"]
+        assert len(results) == 20
+        assert all(tr["valid"] for trs in results.values() for tr in trs)
+
+    def test_unsynchronized_lost(self, campaign):
+        tx, harness = campaign
+        harness.interface.strip_phy = True
+        generator = MockGenerator([PHY_FRAME, PSDU])
+        generator.yield_control_case = lambda count=1: iter([PHY_FRAME] * count)
+        case = AlternatorCaseRxFrame(tx, harness, generator, deadline=0.01)
+        results = case.run_test(1).serializable()["results"]
+        assert [results[i][0]["valid"] for i in range(2)] == [True, False]
@@ -13,14 +13,22 @@
 
 import argparse
 import glob
-import os.path
 import json
+import os.path
+import multiprocessing
+import sys
+
+from cases.result_aggregate import CaseCounts, count_file
+from cases.result_columnar import convert_to_columnar
+from cases.triage import SignatureIndex, bucket_file
 
 __doc__ = """
 Command line interface to analyze/view measurements.
 Copyright (C) 2018 Ryan Speers & Matt Knight
 """
 
+COLUMNAR_EXTENSION = ".trfc"
+
 
 def files_from_arg(args_path):
     full_paths = [os.path.join(os.getcwd(), path) for path in args_path]
@@ -33,30 +41,83 @@ def files_from_arg(args_path):
     return files
 
 
+def print_counts(title, counts):
+    print(title)
+    for casenum, count_valid, count_invalid, example in counts.rows():
+        print("\tCase {}: {} valid, {} invalid\texample case: {}".format(casenum, count_valid, count_invalid, example))
+
+
+def run_title(filename, channel):
+    title = os.path.basename(filename)
+    return title if channel is None else "{} channel {}".format(title, channel)
+
+
+def print_buckets(index):
+    print("{} signature buckets of invalid results:".format(len(index)))
+    for sig, bucket in index.buckets():
+        representative = bucket["representative"]
+        case = representative["case"]
+        if representative.get("channel") is not None:
+            case = "{} on channel {}".format(case, representative["channel"])
+        print("\tBucket {}: {} results\tcase {}: {}\t{}".format(
+            sig, bucket["count"], case, representative["test_case"],
+            json.dumps(bucket["evidence"], sort_keys=True)
+        ))
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument('path', nargs='+', help='Path of a file or a folder of result files.')
+    parser.add_argument('--convert', action='store_true',
+                        help='Convert each JSON results file to the binary columnar format, written alongside it '
+                             'with a {} extension (one file per channel of a sweep), instead of analyzing it.'
+                             .format(COLUMNAR_EXTENSION))
+    parser.add_argument('-j', '--jobs', action='store', type=int, default=multiprocessing.cpu_count(),
+                        help='Number of files to analyze at once (default: number of CPUs).')
+    parser.add_argument('--total', action='store_true',
+                        help='Also print the counts of all files combined.')
+    parser.add_argument('--triage', action='store_true',
+                        help='Instead of per-case counts, bucket the invalid results of all files by the signature '
+                             'of the harness evidence recorded with them, and print each bucket.')
+    parser.add_argument('--index', action='store', default=None,
+                        help='With --triage, also save the signature buckets to this JSON file.')
     args = parser.parse_args()
 
-    data_set = {}
-    for filename in files_from_arg(args.path):
-        testname = os.path.basename(filename)
-        print("Loading from {} as {}.".format(filename, testname))
-        with open(filename, 'r') as fh:
-            data_set[testname] = json.load(fh)
-
-    for testname, data in data_set.iteritems():
-        print("Test: {} (using {})".format(testname, data.get("generator").get("name")))
-        sorted_results = sorted(data.get('results').iteritems(), key=lambda (k, v): (v, k))
-        for casenum, case in sorted_results:
-            count_valid = 0
-            count_invalid = 0
-            for result in case:
-                if result.get("valid", False):
-                    count_valid += 1
-                else:
-                    count_invalid += 1
-            print("\tCase {}: {} valid, {} invalid\texample case: {}".format(
-                casenum, count_valid, count_invalid, case[0].get('raw').get('test_case')
-            ))
+    filenames = sorted(files_from_arg(args.path))
+    if args.convert:
+        for filename in filenames:
+            if filename.endswith(COLUMNAR_EXTENSION):
+                continue
+            for path, count in convert_to_columnar(filename, filename + COLUMNAR_EXTENSION):
+                print("Converted {} results from {} to {}.".format(count, filename, path))
+        sys.exit(0)
+
+    if args.triage:
+        index = SignatureIndex()
+        pool = multiprocessing.Pool(max(1, args.jobs))
+        try:
+            for filename, file_index in pool.imap_unordered(bucket_file, filenames):
+                print("Bucketed {} into {} signatures.".format(os.path.basename(filename), len(file_index)))
+                index.merge(file_index)
+        finally:
+            pool.terminate()
+        print_buckets(index)
+        if args.index is not None:
+            index.save(args.index)
+        sys.exit(0)
 
+    # Each file is counted in a worker process and printed as soon as it's done, so only the combined counts,
+    # which have one entry per distinct case, are held for the whole run.
+    total = CaseCounts()
+    pool = multiprocessing.Pool(max(1, args.jobs))
+    try:
+        for filename, runs in pool.imap_unordered(count_file, filenames):
+            # A channel sweep gives a run per channel, each with its own case numbers.
+            for channel, generator_name, counts in runs:
+                print_counts("Test: {} (using {})".format(run_title(filename, channel), generator_name), counts)
+                if args.total:
+                    total.merge(counts)
+    finally:
+        pool.terminate()
+    if args.total:
+        print_counts("Total of {} files".format(len(filenames)), total)
@@ -0,0 +1,7 @@
+"""
+Targets are software stand-ins for the devices under test, so campaigns can be run and benchmarked end-to-end
+without hardware, over the LoopbackInterface.
+"""
+
+from dot15d4_emulator import Dot15d4TargetEmulator, PreambleToleranceModel, CrashOnPatternModel, \
+    WedgeUntilResetModel
@@ -0,0 +1,359 @@
+import fcntl
+import os
+import pty
+import select
+import tempfile
+import threading
+import time
+import tty
+
+# TODO: Clean up this import:
+try:
+    from ..interfaces.interface_loopback import LoopbackInterface, get_medium
+    from ..dot15d4.fcs import fcs
+    from ..dot15d4.phy import split_phy
+except ValueError:
+    from interfaces.interface_loopback import LoopbackInterface, get_medium
+    from dot15d4.fcs import fcs
+    from dot15d4.phy import split_phy
+
+RUNNING = "running"
+CRASHED = "crashed"
+WEDGED = "wedged"
+
+# What a failure model can make of a frame, besides having no objection to it (None).
+DROP = "drop"
+CRASH = "crash"
+WEDGE = "wedge"
+
+# Regexes matching the target's serial lines, for SerialCheckHarness.set_is_valid_regex / set_is_invalid_regex.
+SERIAL_VALID_PATTERN = r"^(BOOT|RX)"
+SERIAL_INVALID_PATTERN = r"^FAULT"
+_RESET_REQUEST = '\x01'  # As sent by SerialCheckHarness.do_reset()
+
+
+class ReceivedFrame():
+    """
+    What a target made of a transmitted frame, as passed to each failure model.
+    """
+    def __init__(self, frame, preamble, psdu):
+        """
+        :param frame: The frame as transmitted.
+        :param preamble: List of the nibbles before the SFD, or None if the frame was sent without a PHY header.
+        :param psdu: The PSDU, or None if the target couldn't synchronize on the frame.
+        """
+        self.frame = frame
+        self.preamble = preamble
+        self.psdu = psdu
+
+    @property
+    def preamble_zeros(self):
+        """
+        Number of zero nibbles immediately before the SFD, which is what a receiver's correlator locks on to.
+        """
+        if self.preamble is None:
+            return None
+        count = 0
+        for nibble in reversed(self.preamble):
+            if nibble != 0:
+                break
+            count += 1
+        return count
+
+
+class FailureModel():
+    def check(self, received):
+        """
+        Decides what the target makes of a frame.
+        :param received: ReceivedFrame
+        :return: DROP, CRASH or WEDGE, or None if the model has no objection to the frame.
+        """
+        raise NotImplementedError
+
+
+class PreambleToleranceModel(FailureModel):
+    """
+    Drops frames whose preamble is outside the range the target's radio synchronizes on, as Isotope fingerprints
+    radios by. Frames sent without a PHY header aren't affected.
+    """
+    def __init__(self, min_nibbles=2, max_nibbles=None):
+        self.min_nibbles = min_nibbles
+        self.max_nibbles = max_nibbles
+
+    def __repr__(self):
+        return "{}({}, {})".format(self.__class__.__name__, self.min_nibbles, self.max_nibbles)
+
+    def check(self, received):
+        zeros = received.preamble_zeros
+        if zeros is None:
+            return None
+        if zeros < self.min_nibbles or (self.max_nibbles is not None and zeros > self.max_nibbles):
+            return DROP
+        return None
+
+
+class CrashOnPatternModel(FailureModel):
+    """
+    Crashes the target when a PSDU contains the pattern: its process dies and a fault is printed on the serial
+    console, until it is reset.
+    """
+    def __init__(self, pattern, message="Hard fault"):
+        self.pattern = pattern
+        self.message = message
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.pattern.encode('hex'))
+
+    def check(self, received):
+        if received.psdu is not None and self.pattern in received.psdu:
+            return CRASH
+        return None
+
+
+class WedgeUntilResetModel(FailureModel):
+    """
+    Wedges the target when a PSDU contains the pattern: it stays listed as running and prints nothing, but stops
+    responding to frames until it is reset.
+    """
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.pattern.encode('hex'))
+
+    def check(self, received):
+        if received.psdu is not None and self.pattern in received.psdu:
+            return WEDGE
+        return None
+
+
+class Dot15d4TargetEmulator():
+    """
+    A software 802.15.4 target which listens on a LoopbackMedium. Each frame transmitted on its channel is parsed
+    and run past the failure models: a frame no model objects to is answered (by echoing its PSDU, or with an ACK),
+    while a model may instead have it dropped, or crash or wedge the target until it is reset.
+
+    Responses can go out on a separate medium, so a receiver there (such as a ReceivedFrameHarness's interface)
+    hears only what the target received, rather than also hearing every frame transmitted to it.
+
+    Frames are handled as they are transmitted, in the transmitting thread, so a campaign against the emulator is
+    deterministic. The target can be watched and reset through a pseudo-terminal serial console that a
+    SerialCheckHarness can open, and its process list (in `ps` format) is kept in a file that a
+    SshProcessCheckHarness can read with ps_command.
+    """
+    def __init__(self, models=None, medium=None, response_medium=None, channel=11, response="echo", phy=True,
+                 latency=0.0, reset_time=0.0, process_name="zigbee-daemon"):
+        """
+        :param models: List of FailureModels, consulted in order for each frame.
+        :param medium: LoopbackMedium to listen on; by default the shared "default" medium.
+        :param response_medium: LoopbackMedium to respond on; by default the one listened on.
+        :param response: "echo" to retransmit the PSDU of each frame handled, "ack" to send an 802.15.4 ACK for its
+            sequence number, or None to stay silent.
+        :param phy: If True, frames are expected with a PHY header and are synchronized on as a radio would;
+            otherwise each frame is taken to be a PSDU.
+        :param latency: Seconds before a response can be received.
+        :param reset_time: Seconds a reset takes, blocking whoever asked for it, to model the target booting.
+        :param process_name: Command of the target's process in its process list.
+        """
+        if response not in ("echo", "ack", None):
+            raise ValueError("Response must be \"echo\", \"ack\" or None.")
+        self.models = list(models) if models is not None else []
+        self.response = response
+        self.phy = phy
+        self.reset_time = reset_time
+        self.process_name = process_name
+        self.__medium = medium if medium is not None else get_medium()
+        self.__radio = LoopbackInterface(log_name=None, medium=response_medium or self.__medium, latency=latency)
+        self.__radio.set_channel(channel)
+        self.__state = RUNNING
+        self.__lock = threading.RLock()
+        self.__responding = False
+        self.frame_count = 0
+        self.handled_count = 0
+        self.dropped_count = 0
+        self.reset_count = 0
+        self.__serial_master = None
+        self.__serial_slave = None
+        self.__serial_thread = None
+        self.__serial_shutdown = threading.Event()
+        self.__ps_path = None
+
+    def __repr__(self):
+        return "{}({}, {}, models={})".format(self.__class__.__name__, self.__state, self.__medium.name,
+                                              self.models)
+
+    @property
+    def state(self):
+        return self.__state
+
+    @property
+    def channel(self):
+        return self.__radio.channel
+
+    def set_channel(self, channel):
+        self.__radio.set_channel(channel)
+
+    @property
+    def serial_port(self):
+        """
+        Path of the serial console's pseudo-terminal, to open with SerialCheckHarness, or None until start().
+        """
+        return os.ttyname(self.__serial_slave) if self.__serial_slave is not None else None
+
+    @property
+    def ps_command(self):
+        """
+        Command which prints the target's process list, for SshProcessCheckHarness.set_process_regex().
+        """
+        return "cat {}".format(self.__ps_path) if self.__ps_path is not None else None
+
+    def start(self):
+        """
+        Joins the medium and opens the serial console and process list.
+        """
+        self.__radio.open()
+        self.__medium.attach(self)
+        self.__serial_master, self.__serial_slave = pty.openpty()
+        tty.setraw(self.__serial_slave)
+        # Console output is dropped rather than blocking the radio when nobody is reading it.
+        flags = fcntl.fcntl(self.__serial_master, fcntl.F_GETFL)
+        fcntl.fcntl(self.__serial_master, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        ps_fd, self.__ps_path = tempfile.mkstemp(prefix="tumblerf-target-", suffix=".ps")
+        os.close(ps_fd)
+        self.__serial_shutdown.clear()
+        self.__serial_thread = threading.Thread(target=self.__serial_thread_main)
+        self.__serial_thread.daemon = True
+        self.__serial_thread.start()
+        self.__boot()
+
+    def stop(self):
+        if self.__serial_thread is not None:
+            self.__serial_shutdown.set()
+            self.__serial_thread.join()
+            self.__serial_thread = None
+        self.__medium.detach(self)
+        self.__radio.close()
+        for fd in (self.__serial_master, self.__serial_slave):
+            if fd is not None:
+                os.close(fd)
+        self.__serial_master = self.__serial_slave = None
+        if self.__ps_path is not None:
+            os.remove(self.__ps_path)
+            self.__ps_path = None
+
+    def reset(self):
+        """
+        Reboots the target, clearing any crash or wedge.
+        """
+        with self.__lock:
+            if self.reset_time > 0:
+                time.sleep(self.reset_time)
+            self.reset_count += 1
+            self.__boot()
+
+    def __boot(self):
+        with self.__lock:
+            self.__state = RUNNING
+            self.__write_ps()
+            self.__serial_line("BOOT: target ready")
+
+    def __serial_line(self, line):
+        if self.__serial_master is None:
+            return
+        try:
+            os.write(self.__serial_master, line + "\n")
+        except OSError:
+            pass  # The console's buffer is full, as nobody is reading it
+
+    def __write_ps(self):
+        if self.__ps_path is None:
+            return
+        lines = ["  PID TTY          TIME CMD", "    1 ?        00:00:01 init"]
+        if self.__state == CRASHED:
+            lines.append("  {:3d} ?        00:00:00 crash-handler".format(100 + self.reset_count))
+        else:
+            lines.append("  {:3d} ?        00:00:00 {}".format(100 + self.reset_count, self.process_name))
+        temp_path = self.__ps_path + ".tmp"
+        with open(temp_path, 'w') as fh:
+            fh.write("\n".join(lines) + "\n")
+        os.rename(temp_path, self.__ps_path)  # So a reader never sees a partial list
+
+    def ps_output(self):
+        """
+        :return: The target's process list, in the format of `ps`.
+        """
+        with open(self.__ps_path) as fh:
+            return fh.read()
+
+    def __serial_thread_main(self):
+        while not self.__serial_shutdown.is_set():
+            readable, _, _ = select.select([self.__serial_master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                data = os.read(self.__serial_master, 256)
+            except OSError:
+                continue
+            if _RESET_REQUEST in data:
+                self.__serial_line("[HARNESS] Reset requested")
+                self.reset()
+
+    def parse(self, frame):
+        """
+        :return: ReceivedFrame of what the target makes of a transmitted frame.
+        """
+        if not self.phy:
+            return ReceivedFrame(frame, None, frame)
+        split = split_phy(frame)
+        if split is None:
+            return ReceivedFrame(frame, [], None)
+        return ReceivedFrame(frame, split[0], split[1])
+
+    def deliver(self, frame, channel, ready):
+        """
+        Called by the medium for each frame transmitted on it.
+        :return: True if the target was listening on the channel.
+        """
+        if channel != self.__radio.channel:
+            return False
+        with self.__lock:
+            if self.__responding:
+                return False  # The target's own response, which it doesn't hear
+            self.frame_count += 1
+            if self.__state != RUNNING:
+                return True
+            received = self.parse(frame)
+            outcome = DROP if received.psdu is None else None
+            culprit = None
+            for model in self.models:
+                if outcome is not None:
+                    break
+                outcome = model.check(received)
+                culprit = model
+            if outcome == DROP:
+                self.dropped_count += 1
+            elif outcome == CRASH:
+                self.__state = CRASHED
+                self.__write_ps()
+                self.__serial_line("FAULT: {}".format(getattr(culprit, "message", "crash")))
+            elif outcome == WEDGE:
+                self.__state = WEDGED
+            else:
+                self.handled_count += 1
+                self.__serial_line("RX len={}".format(len(received.psdu)))
+                self.__respond(received.psdu)
+        return True
+
+    def __respond(self, psdu):
+        if self.response == "echo":
+            response = psdu
+        elif self.response == "ack" and len(psdu) >= 3:
+            response = "\x02\x00" + psdu[2]
+            response += fcs(response)
+        else:
+            return
+        self.__responding = True
+        try:
+            self.__radio.tx(response)
+        finally:
+            self.__responding = False
@@ -0,0 +1,146 @@
+import re
+import time
+
+import pytest
+
+from ..dot15d4_emulator import Dot15d4TargetEmulator, PreambleToleranceModel, CrashOnPatternModel, \
+    WedgeUntilResetModel, RUNNING, CRASHED, WEDGED, SERIAL_VALID_PATTERN, SERIAL_INVALID_PATTERN
+from ...interfaces.interface_loopback import LoopbackInterface, LoopbackMedium
+from ...dot15d4.fcs import fcs as dot15d4_fcs
+
+PSDU = "\x41\x88\x05\x34\x12\xff\xff\x00\x00\x01"
+
+
+def phy_frame(psdu, preamble_bytes=4):
+    return "\x00" * preamble_bytes + "\xa7" + chr(len(psdu)) + psdu
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def drain(interface):
+    frames = []
+    frame = interface.rx_poll()
+    while frame is not None:
+        frames.append(frame)
+        frame = interface.rx_poll()
+    return frames
+
+
+class TestDot15d4TargetEmulator(object):
+
+    @pytest.fixture
+    def setup(self):
+        medium, response_medium = LoopbackMedium("emulator test"), LoopbackMedium("emulator response")
+        tx = LoopbackInterface(medium=medium)
+        rx = LoopbackInterface(medium=response_medium)
+        tx.open()
+        rx.open()
+        rx.rx_start()
+        target = Dot15d4TargetEmulator([
+            PreambleToleranceModel(min_nibbles=4, max_nibbles=12),
+            CrashOnPatternModel("\xde\xad"),
+            WedgeUntilResetModel("\xbe\xef")
+        ], medium=medium, response_medium=response_medium)
+        target.start()
+        yield tx, rx, target
+        target.stop()
+        tx.close()
+        rx.close()
+
+    def test_echo(self, setup):
+        tx, rx, target = setup
+        tx.tx(phy_frame(PSDU))
+        assert drain(rx) == [PSDU]
+        assert target.handled_count == 1
+
+    def test_preamble_tolerance(self, setup):
+        tx, rx, target = setup
+        for preamble_bytes in range(8):
+            tx.tx(phy_frame(PSDU, preamble_bytes))
+        # Only 2 to 6 bytes (4 to 12 nibbles) of preamble are synchronized on.
+        assert len(drain(rx)) == 5
+        assert target.dropped_count == 3
+
+    def test_crash_until_reset(self, setup):
+        tx, rx, target = setup
+        assert "zigbee-daemon" in target.ps_output()
+        tx.tx(phy_frame(PSDU + "\xde\xad"))
+        tx.tx(phy_frame(PSDU))
+        assert drain(rx) == []
+        assert target.state == CRASHED
+        assert "zigbee-daemon" not in target.ps_output()
+        target.reset()
+        assert target.state == RUNNING
+        assert "zigbee-daemon" in target.ps_output()
+        tx.tx(phy_frame(PSDU))
+        assert drain(rx) == [PSDU]
+
+    def test_wedge_until_reset(self, setup):
+        tx, rx, target = setup
+        tx.tx(phy_frame(PSDU + "\xbe\xef"))
+        tx.tx(phy_frame(PSDU))
+        assert drain(rx) == []
+        assert target.state == WEDGED
+        assert "zigbee-daemon" in target.ps_output()
+        target.reset()
+        tx.tx(phy_frame(PSDU))
+        assert drain(rx) == [PSDU]
+        assert target.reset_count == 1
+
+    def test_ack(self, setup):
+        tx, rx, target = setup
+        target.response = "ack"
+        tx.tx(phy_frame(PSDU))
+        ack = "\x02\x00\x05"
+        assert drain(rx) == [ack + dot15d4_fcs(ack)]
+
+    def test_other_channel(self, setup):
+        tx, rx, target = setup
+        target.set_channel(20)
+        tx.tx(phy_frame(PSDU))
+        assert target.frame_count == 0
+
+    def test_responds_on_same_medium(self):
+        medium = LoopbackMedium("emulator no phy")
+        tx, rx = LoopbackInterface(medium=medium), LoopbackInterface(medium=medium)
+        tx.open()
+        rx.open()
+        rx.rx_start()
+        target = Dot15d4TargetEmulator([PreambleToleranceModel(min_nibbles=4)], medium=medium, phy=False)
+        target.start()
+        try:
+            tx.tx(PSDU)
+            assert drain(rx) == [PSDU, PSDU]  # What was transmitted, then the target's echo
+        finally:
+            target.stop()
+
+    def test_serial_console(self, setup):
+        serial_check = pytest.importorskip("tumblerf.harnesses.serial_monitor_check")
+        tx, rx, target = setup
+        harness = serial_check.SerialCheckHarness(target.serial_port)
+        harness.set_timeout(50)
+        harness.set_is_valid_regex(re.compile(SERIAL_VALID_PATTERN))
+        harness.set_is_invalid_regex(re.compile(SERIAL_INVALID_PATTERN))
+        try:
+            # The harness's own thread also reads the console, so each check is retried until it has seen the line.
+            tx.tx(phy_frame(PSDU))
+            assert wait_for(lambda: harness.is_valid() is True)
+            tx.tx(phy_frame(PSDU + "\xde\xad"))
+            assert wait_for(lambda: harness.is_valid() is False)
+            assert harness.evidence() == {"serial_line": "FAULT: Hard fault"}
+            # do_reset() reads the reply to its request itself, including the boot message.
+            assert harness.do_reset()
+            assert target.reset_count == 1
+            assert target.state == RUNNING
+            assert harness.is_valid() is True
+            tx.tx(phy_frame(PSDU))
+            assert wait_for(lambda: harness.is_valid() is True)
+        finally:
+            harness.close()